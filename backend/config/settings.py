@@ -98,3 +98,50 @@ MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Correo de alertas (core.alertas). Por defecto un servidor SMTP local de pruebas,
+# p. ej. `python -m aiosmtpd -n -l localhost:1025`
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "1025"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "false").lower() == "true"
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "alertas@vyc-predictivo.local")
+
+# Caché (core.cache_sucursal, core.rutas). Con varios procesos la caché debe ser
+# compartida para que la versión de una sucursal suba en todos: Redis en producción
+# (REDIS_URL, requiere el paquete redis) o un directorio común (CACHE_DIR).
+# Sin ninguna de las dos: memoria local solo con DEBUG (un proceso, runserver); en
+# producción, archivos en BASE_DIR/cache, compartidos por los workers del servidor.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "KEY_PREFIX": "vyc",
+        }
+    }
+elif os.getenv("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR"),
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+else:
+    # Memoria local por proceso serviría páginas viejas en los demás workers
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "cache",
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
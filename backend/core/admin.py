@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cliente, Sucursal, Area, Equipo, Activo
+from .models import Cliente, Sucursal, Area, Equipo, Activo, Rodamiento, ReglaAlerta, NotificacionAlerta, EventoAlerta, ArchivoContenido, PuntoPlano
 
 
 @admin.register(Cliente)
@@ -82,6 +82,9 @@ class EquipoAdmin(admin.ModelAdmin):
         ('Información General', {
             'fields': ('area', 'nombre', 'descripcion', 'activo')
         }),
+        ('Vibraciones', {
+            'fields': ('clase_maquina',)
+        }),
         ('Observaciones', {
             'fields': ('observaciones',),
             'classes': ('collapse',)
@@ -93,17 +96,30 @@ class EquipoAdmin(admin.ModelAdmin):
     )
 
 
+class RodamientoInline(admin.TabularInline):
+    model = Rodamiento
+    extra = 0
+    fields = ('designacion', 'ubicacion', 'num_elementos', 'diametro_elemento', 'diametro_primitivo', 'angulo_contacto')
+
+
 @admin.register(Activo)
 class ActivoAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'equipo', 'activo', 'creado')
     list_filter = ('activo', 'creado', 'equipo__area__nombre', 'equipo__area__sucursal__cliente')
     search_fields = ('nombre', 'equipo__nombre', 'equipo__area__sucursal__nombre')
     readonly_fields = ('creado', 'actualizado')
+    inlines = [RodamientoInline]
     
     fieldsets = (
         ('Información General', {
             'fields': ('equipo', 'nombre', 'descripcion', 'activo')
         }),
+        ('Vibraciones', {
+            'fields': ('clase_maquina', 'rpm')
+        }),
+        ('Muestreo', {
+            'fields': ('intervalo_muestreo_dias',)
+        }),
         ('Observaciones', {
             'fields': ('observaciones',),
             'classes': ('collapse',)
@@ -113,3 +129,59 @@ class ActivoAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ReglaAlerta)
+class ReglaAlertaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'cliente', 'tipo', 'activa', 'minutos_antirrebote')
+    list_filter = ('activa', 'tipo', 'cliente')
+    search_fields = ('nombre', 'cliente__nombre')
+    readonly_fields = ('creado', 'actualizado')
+    
+    fieldsets = (
+        ('Información General', {
+            'fields': ('cliente', 'nombre', 'tipo', 'activa')
+        }),
+        ('Condición', {
+            'fields': ('estado_origen', 'estado_destino', 'metrica', 'serie', 'valor')
+        }),
+        ('Notificación', {
+            'fields': ('destinatarios', 'minutos_antirrebote')
+        }),
+        ('Auditoría', {
+            'fields': ('creado', 'actualizado'),
+            'classes': ('collapse',)
+        }),
+    )
+
+
+class EventoAlertaInline(admin.TabularInline):
+    model = EventoAlerta
+    extra = 0
+    fields = ('creado', 'activo', 'mensaje')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(NotificacionAlerta)
+class NotificacionAlertaAdmin(admin.ModelAdmin):
+    list_display = ('regla', 'estado', 'intentos', 'enviar_despues', 'enviado', 'creado')
+    list_filter = ('estado', 'regla__cliente')
+    readonly_fields = ('creado', 'enviado', 'ultimo_error')
+    inlines = [EventoAlertaInline]
+
+
+@admin.register(ArchivoContenido)
+class ArchivoContenidoAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'tamano', 'referencias', 'ultimo_uso', 'creado')
+    list_filter = ('referencias',)
+    search_fields = ('hash', 'nombre')
+    readonly_fields = ('hash', 'nombre', 'tamano', 'referencias', 'ultimo_uso', 'creado')
+
+
+@admin.register(PuntoPlano)
+class PuntoPlanoAdmin(admin.ModelAdmin):
+    list_display = ('activo', 'sucursal', 'x', 'y', 'actualizado')
+    list_filter = ('sucursal',)
+    search_fields = ('activo__nombre', 'sucursal__nombre')
+    readonly_fields = ('creado', 'actualizado')
@@ -0,0 +1,260 @@
+"""
+Motor de reglas de alerta
+Las vistas que escriben estados o mediciones de un activo llaman a
+evaluar_alertas() con lo que cambió (estado anterior, valores nuevos, series
+recalculadas). Solo se evalúan las reglas del cliente afectadas por ese cambio,
+comparando contra el último estado guardado por regla y activo
+(EstadoReglaActivo), sin recorrer el historial:
+
+    - umbral y pendiente disparan en el flanco (la condición pasa de falsa a verdadera)
+    - antirrebote: el mismo activo no vuelve a disparar la regla dentro de
+      minutos_antirrebote
+    - agrupación: los eventos de una regla se acumulan en una sola notificación
+      pendiente (outbox) durante AGRUPACION
+
+entregar_notificaciones() envía por correo las notificaciones vencidas; lo
+ejecuta el comando entregar_alertas (una vez o en modo continuo).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.utils import timezone
+
+from .models import (
+    Activo, EstadoReglaActivo, EventoAlerta, NotificacionAlerta, ReglaAlerta, TendenciaActivo,
+    VibracionesAnalisis,
+)
+
+
+# Ventana en que los eventos de una regla se agrupan en un mismo correo
+AGRUPACION = timedelta(minutes=5)
+
+# Reintentos de entrega (espera REINTENTO_BASE · 2^intentos entre cada uno)
+MAX_INTENTOS = 5
+REINTENTO_BASE = timedelta(minutes=1)
+
+# Notificaciones por ciclo del worker
+LOTE_ENTREGA = 50
+
+# Plazo de un worker para enviar lo que reclamó; vencido, otro puede retomarlo
+PLAZO_ENVIO = timedelta(minutes=10)
+
+
+def reglas_activo(activo):
+    """Reglas activas del cliente dueño del activo (una consulta)"""
+    return list(ReglaAlerta.objects.filter(
+        activa=True,
+        cliente__sucursales__areas__equipos__activos=activo
+    ))
+
+
+def evaluar_regla(regla, activo, estado_anterior, valores, tendencias):
+    """
+    Evalúa una regla contra el cambio recibido.
+    Retorna None si el cambio no afecta a la regla, o (cumple, valor, mensaje).
+    """
+    if regla.tipo == 'cambio_estado':
+        if estado_anterior is None or estado_anterior == activo.estado:
+            return None
+        cumple = activo.estado == regla.estado_destino and regla.estado_origen in ('', estado_anterior)
+        estados = dict(activo.ESTADO_CHOICES)
+        mensaje = f"Estado {estados.get(estado_anterior, estado_anterior)} → {activo.get_estado_display()}"
+        return cumple, None, mensaje
+
+    if regla.tipo == 'umbral':
+        valor = valores.get(regla.metrica)
+        if valor is None:
+            return None
+        mensaje = f"{regla.get_metrica_display()}: {valor:.2f} (umbral {regla.valor:g})"
+        return valor >= regla.valor, valor, mensaje
+
+    if regla.tipo == 'pendiente':
+        tendencia = tendencias.get(regla.serie)
+        if tendencia is None:
+            return None
+        cambio = tendencia.cambio_mensual
+        mensaje = f"Tendencia {regla.get_serie_display()}: {cambio:+.2f} por mes (límite {regla.valor:g})"
+        return cambio >= regla.valor, cambio, mensaje
+
+    return None
+
+
+def encolar_evento(evento, ahora):
+    """Agrega el evento a la notificación abierta de su regla o abre una nueva"""
+    notificacion = NotificacionAlerta.objects.filter(
+        regla=evento.regla,
+        estado='pendiente',
+        intentos=0,
+        enviar_despues__gt=ahora
+    ).order_by('-creado').first()
+    if notificacion is None:
+        notificacion = NotificacionAlerta.objects.create(
+            regla=evento.regla,
+            destinatarios=', '.join(evento.regla.lista_destinatarios()),
+            enviar_despues=ahora + AGRUPACION
+        )
+    evento.notificacion = notificacion
+    evento.save()
+
+
+def evaluar_alertas(activo, estado_anterior=None, valores=None, series=()):
+    """
+    Evalúa las reglas del cliente ante un cambio en un activo.
+    estado_anterior: estado previo si el estado pudo cambiar (activo.estado ya es el nuevo).
+    valores: métricas recién escritas, p. ej. {'velocidad_rms': 4.2}.
+    series: tipos de TendenciaActivo recalculados ('vibraciones', 'termografia').
+    Retorna la lista de eventos generados.
+    """
+    reglas = reglas_activo(activo)
+    if not reglas:
+        return []
+
+    valores = valores or {}
+    tendencias = {}
+    if series and any(regla.tipo == 'pendiente' for regla in reglas):
+        tendencias = {
+            tendencia.tipo: tendencia
+            for tendencia in TendenciaActivo.objects.filter(activo=activo, tipo__in=series)
+        }
+
+    estados = {
+        estado.regla_id: estado
+        for estado in EstadoReglaActivo.objects.filter(activo=activo, regla__in=reglas)
+    }
+
+    ahora = timezone.now()
+    eventos = []
+    with transaction.atomic():
+        for regla in reglas:
+            evaluacion = evaluar_regla(regla, activo, estado_anterior, valores, tendencias)
+            if evaluacion is None:
+                continue
+            cumple, valor, mensaje = evaluacion
+
+            estado = estados.get(regla.id) or EstadoReglaActivo(regla=regla, activo=activo)
+            # Cambio de estado es un evento en sí mismo; umbral y pendiente disparan en el flanco
+            dispara = cumple and (regla.tipo == 'cambio_estado' or not estado.condicion)
+            if dispara and estado.ultimo_disparo and ahora - estado.ultimo_disparo < timedelta(minutes=regla.minutos_antirrebote):
+                dispara = False
+
+            if dispara:
+                evento = EventoAlerta(regla=regla, activo=activo, mensaje=mensaje[:300], valor=valor)
+                encolar_evento(evento, ahora)
+                eventos.append(evento)
+                estado.ultimo_disparo = ahora
+
+            if estado.pk is None or dispara or estado.condicion != cumple:
+                estado.condicion = cumple
+                estado.save()
+    return eventos
+
+
+def evaluar_alertas_vibraciones(activos_ids):
+    """
+    Evalúa las reglas tras una escritura masiva de muestras de vibraciones
+    (ingesta o formas de onda), una vez por activo con su última muestra.
+    Llamar después del commit y de recalcular tendencias.
+    """
+    if not activos_ids:
+        return []
+    ultima = VibracionesAnalisis.objects.filter(activo=OuterRef('pk')).order_by(
+        '-fecha_muestreo', '-hora_muestreo', '-id'
+    )
+    activos = Activo.objects.filter(id__in=activos_ids).annotate(
+        ultima_velocidad_rms=Subquery(ultima.values('velocidad_rms')[:1]),
+        ultima_aceleracion=Subquery(ultima.values('aceleracion')[:1]),
+    )
+    eventos = []
+    for activo in activos:
+        eventos += evaluar_alertas(
+            activo,
+            valores={'velocidad_rms': activo.ultima_velocidad_rms, 'aceleracion': activo.ultima_aceleracion},
+            series=['vibraciones']
+        )
+    return eventos
+
+
+def componer_mensaje(notificacion):
+    """Asunto y cuerpo del correo de una notificación"""
+    eventos = notificacion.eventos.all()
+    asunto = f"[VYC Predictivo] {notificacion.regla.nombre}: {len(eventos)} alerta(s)"
+    lineas = [
+        f"{evento.creado:%Y-%m-%d %H:%M} UTC | {evento.activo.equipo.area.get_nombre_display()} / "
+        f"{evento.activo.equipo.nombre} / {evento.activo.nombre} | {evento.mensaje}"
+        for evento in eventos
+    ]
+    cuerpo = f"Regla: {notificacion.regla.nombre}\n\n" + "\n".join(lineas)
+    return asunto, cuerpo
+
+
+def reclamar_notificaciones(ahora, limite=LOTE_ENTREGA):
+    """
+    Toma hasta `limite` notificaciones vencidas marcándolas 'enviando' hasta
+    ahora + PLAZO_ENVIO, en una transacción corta. Con varios workers cada uno
+    toma filas distintas (SELECT ... FOR UPDATE SKIP LOCKED donde la base lo
+    soporta); si un worker muere a mitad de un envío, sus filas vuelven a
+    tomarse al vencer el plazo.
+    """
+    with transaction.atomic():
+        pendientes = NotificacionAlerta.objects.filter(
+            estado__in=('pendiente', 'enviando'),
+            enviar_despues__lte=ahora
+        ).order_by('enviar_despues')
+        if connection.features.has_select_for_update_skip_locked:
+            pendientes = pendientes.select_for_update(skip_locked=True)
+        ids = list(pendientes.values_list('id', flat=True)[:limite])
+        NotificacionAlerta.objects.filter(id__in=ids).update(estado='enviando', enviar_despues=ahora + PLAZO_ENVIO)
+
+    return list(NotificacionAlerta.objects.filter(id__in=ids).prefetch_related(
+        'regla',
+        Prefetch('eventos', queryset=EventoAlerta.objects.select_related(
+            'activo__equipo__area'
+        ).order_by('creado'))
+    ).order_by('enviar_despues', 'id'))
+
+
+def entregar_notificaciones(conexion=None, ahora=None, limite=LOTE_ENTREGA):
+    """
+    Envía las notificaciones pendientes cuyo plazo venció. Las filas se
+    reclaman antes de enviar (reclamar_notificaciones) y el envío ocurre fuera
+    de la transacción: un servidor SMTP lento no mantiene bloqueos.
+    Retorna dict con enviadas y fallidas.
+    """
+    ahora = ahora or timezone.now()
+    enviadas = fallidas = 0
+
+    lote = reclamar_notificaciones(ahora, limite)
+    if not lote:
+        return {'enviadas': 0, 'fallidas': 0}
+
+    conexion = conexion or get_connection()
+    try:
+        for notificacion in lote:
+            asunto, cuerpo = componer_mensaje(notificacion)
+            correo = EmailMessage(
+                asunto,
+                cuerpo,
+                settings.DEFAULT_FROM_EMAIL,
+                [c.strip() for c in notificacion.destinatarios.split(',') if c.strip()],
+                connection=conexion
+            )
+            try:
+                correo.send()
+            except Exception as e:
+                notificacion.intentos += 1
+                notificacion.ultimo_error = str(e)
+                notificacion.enviar_despues = ahora + REINTENTO_BASE * 2 ** notificacion.intentos
+                notificacion.estado = 'error' if notificacion.intentos >= MAX_INTENTOS else 'pendiente'
+                fallidas += 1
+            else:
+                notificacion.estado = 'enviada'
+                notificacion.enviado = timezone.now()
+                enviadas += 1
+            notificacion.save(update_fields=['estado', 'intentos', 'ultimo_error', 'enviar_despues', 'enviado'])
+    finally:
+        conexion.close()
+
+    return {'enviadas': enviadas, 'fallidas': fallidas}
@@ -0,0 +1,291 @@
+"""
+Almacenamiento de media direccionado por contenido
+Las imágenes (fotos térmicas, logos, planos, fotos de perfil e históricos
+termográficos) se guardan con el sha256 de su contenido como nombre:
+
+    contenido/3f/a2/3fa2...e9.jpg
+
+Subir la misma imagen a varios activos no ocupa disco adicional: el archivo ya
+existe y solo se suma una referencia en ArchivoContenido. Eliminar el archivo
+de un campo (FieldFile.delete) resta la referencia en vez de borrar el archivo;
+el comando recolectar_media recuenta las referencias reales de la base de datos
+y borra los archivos sin uso pasado un período de gracia.
+
+Los nombres anteriores (upload_to) siguen funcionando y se borran como antes.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+# Directorio raíz del almacenamiento por contenido (dentro de MEDIA_ROOT)
+PREFIJO = 'contenido'
+
+# Antigüedad mínima de un archivo sin referencias antes de borrarlo: cubre
+# subidas cuya fila aún no se confirma
+GRACIA = timedelta(hours=24)
+
+# contenido/ab/cd/<sha256>.<ext>
+PATRON_NOMBRE = re.compile(rf'^{PREFIJO}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<hash>[0-9a-f]{{64}})(\.[a-z0-9]+)?$')
+
+
+def ruta_contenido(digest, extension=''):
+    return f'{PREFIJO}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def hash_nombre(nombre):
+    """sha256 de un nombre direccionado por contenido, o None si es un nombre anterior"""
+    coincidencia = PATRON_NOMBRE.match(nombre or '')
+    return coincidencia.group('hash') if coincidencia else None
+
+
+def hash_contenido(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def retener(nombre, tamano=None):
+    """Suma una referencia al archivo (crea el registro si no existe)"""
+    from .models import ArchivoContenido
+
+    digest = hash_nombre(nombre)
+    if digest is None:
+        return
+    actualizacion = {'referencias': F('referencias') + 1, 'ultimo_uso': timezone.now()}
+    if ArchivoContenido.objects.filter(hash=digest).update(**actualizacion):
+        return
+    try:
+        with transaction.atomic():
+            ArchivoContenido.objects.create(hash=digest, nombre=nombre, tamano=tamano or 0, referencias=1)
+    except IntegrityError:
+        # Otra subida del mismo contenido creó el registro entretanto
+        ArchivoContenido.objects.filter(hash=digest).update(**actualizacion)
+
+
+def liberar(nombre):
+    """Resta una referencia al archivo; el borrado queda para recolectar_media"""
+    from .models import ArchivoContenido
+
+    digest = hash_nombre(nombre)
+    if digest is None:
+        return
+    ArchivoContenido.objects.filter(hash=digest, referencias__gt=0).update(
+        referencias=F('referencias') - 1,
+        ultimo_uso=timezone.now()
+    )
+
+
+def enlazar(nombre):
+    """
+    Nueva referencia a un archivo ya guardado, sin copiar bytes. Un nombre por
+    contenido solo suma la referencia; un nombre anterior se enlaza (hard link)
+    en su ruta por contenido. Retorna el nombre a guardar en el campo.
+    """
+    if hash_nombre(nombre):
+        retener(nombre)
+        return nombre
+
+    origen = almacenamiento_contenido.path(nombre)
+    with open(origen, 'rb') as f:
+        digest = hash_contenido(File(f))
+    destino = ruta_contenido(digest, os.path.splitext(nombre)[1].lower())
+    if not almacenamiento_contenido.exists(destino):
+        os.makedirs(os.path.dirname(almacenamiento_contenido.path(destino)), exist_ok=True)
+        try:
+            os.link(origen, almacenamiento_contenido.path(destino))
+        except FileExistsError:
+            pass
+        except OSError:
+            # Sin soporte de hard links (otro volumen, algunos sistemas de archivos)
+            with open(origen, 'rb') as f:
+                almacenamiento_contenido._save(destino, File(f))
+    retener(destino, os.path.getsize(origen))
+    return destino
+
+
+@deconstructible
+class AlmacenamientoContenido(FileSystemStorage):
+    """FileSystemStorage que nombra los archivos por el sha256 de su contenido"""
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hash_contenido(content)
+        extension = os.path.splitext(name or '')[1].lower()
+        nombre = self._save(ruta_contenido(digest, extension), content)
+        retener(nombre, content.size)
+        return nombre
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Se escribe con un nombre temporal y se renombra: nunca queda visible un
+        # archivo a medias y dos subidas simultáneas del mismo contenido no chocan
+        temporal = super()._save(f'{name}.{uuid.uuid4().hex}.parcial', content)
+        os.replace(self.path(temporal), self.path(name))
+        return name
+
+    def delete(self, name):
+        if hash_nombre(name):
+            liberar(name)
+        else:
+            super().delete(name)
+
+
+almacenamiento_contenido = AlmacenamientoContenido()
+
+
+def campos_contenido():
+    """(modelo, campo) de todos los FileField que usan el almacenamiento por contenido"""
+    return [
+        (modelo, campo.name)
+        for modelo in apps.get_models()
+        for campo in modelo._meta.concrete_fields
+        if isinstance(campo, models.FileField) and isinstance(campo.storage, AlmacenamientoContenido)
+    ]
+
+
+def contar_referencias():
+    """Referencias reales por hash, contadas en la base de datos (una consulta por campo)"""
+    referencias = Counter()
+    for modelo, campo in campos_contenido():
+        filas = modelo._default_manager.filter(**{f'{campo}__startswith': f'{PREFIJO}/'}).values(campo).annotate(n=Count('pk'))
+        for fila in filas:
+            digest = hash_nombre(fila[campo])
+            if digest:
+                referencias[digest] += fila['n']
+    return referencias
+
+
+def en_uso(nombre):
+    return any(modelo._default_manager.filter(**{campo: nombre}).exists() for modelo, campo in campos_contenido())
+
+
+def recontar_referencias():
+    """
+    Corrige ArchivoContenido con las referencias reales (filas eliminadas, campos
+    limpiados desde formularios, guardados que fallaron después de subir el archivo).
+    Retorna la cantidad de registros corregidos.
+    """
+    from .models import ArchivoContenido
+
+    referencias = contar_referencias()
+    corregidos = []
+    for archivo in ArchivoContenido.objects.only('id', 'hash', 'referencias').iterator():
+        reales = referencias.pop(archivo.hash, 0)
+        if archivo.referencias != reales:
+            archivo.referencias = reales
+            corregidos.append(archivo)
+    ArchivoContenido.objects.bulk_update(corregidos, ['referencias'], batch_size=500)
+
+    # Archivos referenciados sin registro (p. ej. anteriores a este almacenamiento)
+    nuevos = []
+    for digest, reales in referencias.items():
+        nombre = next((n for n in nombres_en_disco(digest) if hash_nombre(n) == digest), None)
+        if nombre:
+            nuevos.append(ArchivoContenido(
+                hash=digest, nombre=nombre, referencias=reales,
+                tamano=almacenamiento_contenido.size(nombre)
+            ))
+    ArchivoContenido.objects.bulk_create(nuevos, ignore_conflicts=True)
+    return len(corregidos) + len(nuevos)
+
+
+def nombres_en_disco(digest):
+    """Archivo y miniaturas de un hash (todos comparten el directorio y el prefijo)"""
+    directorio = f'{PREFIJO}/{digest[:2]}/{digest[2:4]}'
+    try:
+        _, archivos = almacenamiento_contenido.listdir(directorio)
+    except FileNotFoundError:
+        return []
+    return [f'{directorio}/{archivo}' for archivo in archivos if archivo.startswith(digest)]
+
+
+def recolectar(gracia=GRACIA, simular=False):
+    """
+    Borra los archivos sin referencias más antiguos que `gracia`, con sus
+    miniaturas, y los archivos del directorio que no tienen registro (subidas
+    interrumpidas). Retorna dict con archivos y bytes liberados.
+    """
+    from .models import ArchivoContenido
+
+    limite = timezone.now() - gracia
+    resultado = {'archivos': 0, 'bytes': 0}
+
+    def borrar(nombre):
+        resultado['archivos'] += 1
+        resultado['bytes'] += almacenamiento_contenido.size(nombre)
+        if not simular:
+            FileSystemStorage.delete(almacenamiento_contenido, nombre)
+
+    candidatos = ArchivoContenido.objects.filter(referencias=0, ultimo_uso__lt=limite)
+    for archivo in candidatos.iterator():
+        # Última verificación contra la base: una subida pudo reutilizarlo tras el recuento
+        if en_uso(archivo.nombre):
+            continue
+        if not simular:
+            borrados, _ = ArchivoContenido.objects.filter(
+                pk=archivo.pk, referencias=0, ultimo_uso__lt=limite
+            ).delete()
+            if not borrados:
+                continue
+        for nombre in nombres_en_disco(archivo.hash):
+            borrar(nombre)
+
+    # Huérfanos en disco (sin registro ni filas que los usen, o escrituras
+    # interrumpidas) con fecha de modificación anterior al límite
+    conocidos = set(ArchivoContenido.objects.values_list('hash', flat=True)) | set(contar_referencias())
+    antiguedad = time.time() - gracia.total_seconds()
+    for raiz, _, archivos in os.walk(almacenamiento_contenido.path(PREFIJO)):
+        for archivo in archivos:
+            if archivo[:64] in conocidos and not archivo.endswith('.parcial'):
+                continue
+            ruta = os.path.join(raiz, archivo)
+            if os.path.getmtime(ruta) < antiguedad:
+                borrar(os.path.relpath(ruta, almacenamiento_contenido.location).replace(os.sep, '/'))
+    return resultado
+
+
+def importar_anteriores(modelo, campo):
+    """
+    Pasa al almacenamiento por contenido los archivos guardados con nombres
+    anteriores (upload_to) de un campo. Los duplicados quedan en un solo archivo.
+    Retorna la cantidad de filas migradas.
+    """
+    from .miniaturas import generar_miniaturas
+
+    con_miniaturas = any(f.name == 'miniaturas' for f in modelo._meta.concrete_fields)
+    migradas = 0
+    anteriores = modelo._default_manager.exclude(**{f'{campo}__startswith': f'{PREFIJO}/'}).exclude(
+        **{campo: ''}).exclude(**{f'{campo}__isnull': True})
+    for pk, nombre in anteriores.values_list('pk', campo).iterator():
+        if not almacenamiento_contenido.exists(nombre):
+            continue
+        with almacenamiento_contenido.open(nombre, 'rb') as original:
+            nuevo = almacenamiento_contenido.save(nombre, original)
+        if not modelo._default_manager.filter(pk=pk, **{campo: nombre}).update(**{campo: nuevo}):
+            liberar(nuevo)
+            continue
+        migradas += 1
+        if not modelo._default_manager.filter(**{campo: nombre}).exists():
+            FileSystemStorage.delete(almacenamiento_contenido, nombre)
+        if con_miniaturas:
+            # Regenera las miniaturas junto al archivo nuevo y borra las anteriores
+            generar_miniaturas(modelo, pk, campo)
+    return migradas
@@ -0,0 +1,138 @@
+"""
+Detección de anomalías estadísticas en vibraciones
+Cada muestra (velocidad RMS) se compara con dos referencias mediante el
+z-score robusto de Iglewicz-Hoaglin, z = 0.6745·(x - mediana) / MAD:
+
+    z_historico  respecto del historial del propio activo
+    z_hermanos   respecto de los demás activos del mismo equipo en la misma fecha
+                 (motor, reductor y descansos suelen vibrar en niveles parecidos)
+
+La muestra se marca como anomalía si alguno supera UMBRAL_Z en valor absoluto.
+Las medianas por grupo se calculan ordenando una sola vez (np.lexsort), sin
+ciclos por activo, y solo se escriben las filas cuyo resultado cambia.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .cache_sucursal import invalidar_activos, invalidar_alcance
+from .models import Activo, VibracionesAnalisis
+
+
+# |z| desde el cual la muestra se marca como anomalía
+UMBRAL_Z = 3.5
+
+# Escala que hace la MAD comparable a la desviación estándar
+CONSTANTE_MAD = 0.6745
+
+# Mínimo de muestras del activo / de activos en la fecha para calcular cada z
+MIN_HISTORIAL = 5
+MIN_HERMANOS = 3
+
+# Piso de la MAD (relativo a la mediana y absoluto en mm/s): evita z enormes
+# en series casi constantes
+PISO_MAD_RELATIVO = 0.05
+PISO_MAD_ABSOLUTO = 0.05
+
+# Filas por sentencia en bulk_update
+TAMANO_LOTE = 500
+
+
+def mediana_por_grupo(valores, grupo, num_grupos):
+    """Mediana de valores por grupo (enteros 0..num_grupos-1). Retorna (mediana, conteo)"""
+    orden = np.lexsort((valores, grupo))
+    ordenados = valores[orden]
+    conteo = np.bincount(grupo, minlength=num_grupos)
+    inicio = np.concatenate(([0], np.cumsum(conteo)[:-1]))
+    bajo = np.minimum(inicio + (conteo - 1) // 2, valores.size - 1)
+    alto = np.minimum(inicio + conteo // 2, valores.size - 1)
+    mediana = np.where(conteo > 0, (ordenados[bajo] + ordenados[alto]) / 2, np.nan)
+    return mediana, conteo
+
+
+def z_robusto(valores, grupo, minimo):
+    """
+    Z-score robusto de cada valor respecto de su grupo.
+    Grupos con menos de `minimo` valores quedan en NaN.
+    """
+    claves, grupo = np.unique(grupo, return_inverse=True)
+    mediana, conteo = mediana_por_grupo(valores, grupo, claves.size)
+    mad, _ = mediana_por_grupo(np.abs(valores - mediana[grupo]), grupo, claves.size)
+    mad = np.maximum(mad, np.maximum(np.abs(mediana) * PISO_MAD_RELATIVO, PISO_MAD_ABSOLUTO))
+    z = CONSTANTE_MAD * (valores - mediana[grupo]) / mad[grupo]
+    return np.where(conteo[grupo] >= minimo, z, np.nan)
+
+
+def evaluar_muestras(activos, equipos, fechas, velocidades):
+    """
+    Calcula (z_historico, z_hermanos, anomalia) para arreglos alineados de
+    activo_id, equipo_id, fecha (datetime64[D]) y velocidad RMS.
+    """
+    velocidades = np.asarray(velocidades, dtype=np.float64)
+    activos = np.asarray(activos, dtype=np.int64)
+    dias = np.asarray(fechas, dtype='datetime64[D]').astype(np.int64)
+
+    z_historico = z_robusto(velocidades, activos, MIN_HISTORIAL)
+    # Grupo (equipo, fecha) codificado como un solo entero
+    z_hermanos = z_robusto(velocidades, np.asarray(equipos, dtype=np.int64) * 100000 + (dias - dias.min()), MIN_HERMANOS)
+
+    anomalia = (np.nan_to_num(np.abs(z_historico)) >= UMBRAL_Z) | (np.nan_to_num(np.abs(z_hermanos)) >= UMBRAL_Z)
+    return z_historico, z_hermanos, anomalia
+
+
+def _redondear(valor):
+    return None if np.isnan(valor) else round(float(valor), 2)
+
+
+def detectar_anomalias(activos=None, sucursal=None):
+    """
+    Recalcula las marcas de anomalía de las muestras de vibraciones.
+    Con `activos` se procesan los equipos completos a los que pertenecen
+    (la comparación entre hermanos necesita todos los activos del equipo).
+    Retorna dict con muestras evaluadas, actualizadas y anomalías vigentes.
+    """
+    alcance = VibracionesAnalisis.objects.all()
+    if sucursal is not None:
+        alcance = alcance.filter(activo__equipo__area__sucursal=sucursal)
+    if activos is not None:
+        alcance = alcance.filter(
+            activo__equipo__in=Activo.objects.filter(id__in=activos).values('equipo_id')
+        )
+
+    # Muestras sin medición no se evalúan y pierden marcas anteriores
+    if alcance.filter(velocidad_rms__lte=0).exclude(
+        z_historico__isnull=True, z_hermanos__isnull=True, anomalia=False
+    ).update(z_historico=None, z_hermanos=None, anomalia=False, actualizado=timezone.now()):
+        invalidar_alcance(activos, sucursal)
+
+    filas = list(alcance.filter(velocidad_rms__gt=0).values_list(
+        'id', 'activo_id', 'activo__equipo_id', 'fecha_muestreo', 'velocidad_rms',
+        'z_historico', 'z_hermanos', 'anomalia'
+    ))
+    if not filas:
+        return {'evaluadas': 0, 'actualizadas': 0, 'anomalias': 0}
+
+    ids, activos_ids, equipos_ids, fechas, velocidades, z_hist_prev, z_herm_prev, anomalia_prev = zip(*filas)
+    z_historico, z_hermanos, anomalia = evaluar_muestras(
+        activos_ids, equipos_ids, np.array(fechas, dtype='datetime64[D]'), velocidades
+    )
+
+    cambios = []
+    activos_cambiados = set()
+    ahora = timezone.now()
+    for i, muestra_id in enumerate(ids):
+        nuevo = (_redondear(z_historico[i]), _redondear(z_hermanos[i]), bool(anomalia[i]))
+        if nuevo != (z_hist_prev[i], z_herm_prev[i], anomalia_prev[i]):
+            cambios.append(VibracionesAnalisis(
+                id=muestra_id, z_historico=nuevo[0], z_hermanos=nuevo[1], anomalia=nuevo[2],
+                actualizado=ahora
+            ))
+            activos_cambiados.add(activos_ids[i])
+
+    # actualizado va explícito: bulk_update no aplica auto_now y la sincronización lo usa
+    with transaction.atomic():
+        VibracionesAnalisis.objects.bulk_update(
+            cambios, ['z_historico', 'z_hermanos', 'anomalia', 'actualizado'], batch_size=TAMANO_LOTE
+        )
+        invalidar_activos(activos_cambiados)
+    return {'evaluadas': len(ids), 'actualizadas': len(cambios), 'anomalias': int(anomalia.sum())}
@@ -0,0 +1,249 @@
+"""
+API REST de lectura
+Listados JSON de clientes, sucursales, áreas, equipos, activos y de los
+históricos de termografía y vibraciones, para las apps móviles y de terreno:
+
+    GET /api/v1/activos/?sucursal=3&fields=nombre,estado&limite=200
+    GET /api/v1/activos/42/?fields=nombre,estado
+
+- fields: campos a incluir separados por coma (el id va siempre). Solo se leen
+  de la base las columnas que necesitan los campos pedidos.
+- Filtros por padre: ?cliente=, ?sucursal=, ?area=, ?equipo=, ?activo= según el recurso.
+- cursor / limite: paginación keyset por id (sin OFFSET); siguiente_cursor es
+  None en la última página.
+- ETag: hash del contenido; con If-None-Match igual se responde 304 sin cuerpo.
+- Los objetos archivados (borrado lógico) se entregan con activo=False.
+
+La sincronización incremental de las tablets (/api/v1/sync/) está en core.sincronizacion.
+
+Cada página (y cada detalle) cuesta una sola consulta, sin importar la cantidad
+de filas ni los campos pedidos: ningún campo lee relaciones (las FK se entregan
+como id).
+"""
+import base64
+import json
+from operator import attrgetter
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from .listados import CursorInvalido, obtener_limite
+from .miniaturas import url_miniatura
+from .models import Activo, Area, Cliente, Equipo, Sucursal, TermografiaAnalisis, VibracionesAnalisis
+
+
+class ParametroInvalido(ValueError):
+    """Parámetro GET inválido; el mensaje se entrega al cliente"""
+
+
+# Cada campo es (columnas que lee, función que obtiene el valor del objeto)
+
+def columna(nombre):
+    return (nombre,), attrgetter(nombre)
+
+
+def relacion(nombre):
+    """FK entregada como id"""
+    return (nombre,), attrgetter(f'{nombre}_id')
+
+
+def display(nombre):
+    return (nombre,), lambda objeto: getattr(objeto, f'get_{nombre}_display')()
+
+
+def archivo(nombre):
+    return (nombre,), lambda objeto: getattr(objeto, nombre).url if getattr(objeto, nombre) else None
+
+
+def miniatura(nombre, ancho=160):
+    return (nombre, 'miniaturas'), lambda objeto: url_miniatura(getattr(objeto, nombre), ancho) or None
+
+
+def campos(*columnas, **especiales):
+    return {**{nombre: columna(nombre) for nombre in columnas}, **especiales}
+
+
+CONTACTO = ('email', 'telefono', 'direccion', 'ciudad', 'pais',
+            'contacto_nombre', 'contacto_puesto', 'contacto_email', 'contacto_telefono')
+
+METADATA = ('activo', 'creado', 'actualizado')
+
+# recurso → (modelo, {parámetro GET: filtro}, {campo: (columnas, valor)})
+RECURSOS = {
+    'clientes': (Cliente, {'sucursal': 'sucursales__id'}, campos(
+        'nombre', 'descripcion', *CONTACTO, 'ruc_nit', 'industria', 'empleados', *METADATA,
+        logo=archivo('logo'),
+        logo_miniatura=miniatura('logo'),
+    )),
+    'sucursales': (Sucursal, {'cliente': 'cliente_id', 'sucursal': 'id'}, campos(
+        'nombre', 'descripcion', *CONTACTO, *METADATA,
+        cliente=relacion('cliente'),
+        plano_planta=archivo('plano_planta'),
+    )),
+    'areas': (Area, {'sucursal': 'sucursal_id'}, campos(
+        'nombre', 'descripcion', *METADATA,
+        sucursal=relacion('sucursal'),
+        nombre_display=display('nombre'),
+    )),
+    'equipos': (Equipo, {'area': 'area_id', 'sucursal': 'area__sucursal_id'}, campos(
+        'nombre', 'descripcion', 'observaciones', 'estado', 'clase_maquina', *METADATA,
+        area=relacion('area'),
+        estado_display=display('estado'),
+    )),
+    'activos': (Activo, {'equipo': 'equipo_id', 'area': 'equipo__area_id', 'sucursal': 'equipo__area__sucursal_id'}, campos(
+        'nombre', 'descripcion', 'observaciones', 'estado', 'clase_maquina', 'rpm',
+        'intervalo_muestreo_dias', *METADATA,
+        equipo=relacion('equipo'),
+        estado_display=display('estado'),
+        foto_termica=archivo('foto_termica'),
+        foto_termica_miniatura=miniatura('foto_termica'),
+    )),
+    'termografias': (TermografiaAnalisis, {'activo': 'activo_id', 'sucursal': 'activo__equipo__area__sucursal_id'}, campos(
+        'fecha_muestreo', 'hora_muestreo', 'temperatura_promedio', 'temperatura_minima',
+        'temperatura_maxima', 'porcentaje_zona_buena', 'porcentaje_zona_alerta',
+        'porcentaje_zona_critica', 'resultado', 'observaciones', 'creado', 'actualizado',
+        activo=relacion('activo'),
+        imagen_termica=archivo('imagen_termica'),
+        imagen_termica_miniatura=miniatura('imagen_termica'),
+    )),
+    'vibraciones': (VibracionesAnalisis, {'activo': 'activo_id', 'sucursal': 'activo__equipo__area__sucursal_id'}, campos(
+        'fecha_muestreo', 'hora_muestreo', 'velocidad_rms', 'aceleracion', 'frecuencia_dominante',
+        'desplazamiento', 'resultado', 'observaciones', 'z_historico', 'z_hermanos', 'anomalia',
+        'creado', 'actualizado',
+        activo=relacion('activo'),
+    )),
+}
+
+
+def campos_solicitados(disponibles, fields):
+    """Campos pedidos en ?fields= (todos si no viene), validados"""
+    if not fields:
+        return list(disponibles)
+    nombres = [nombre.strip() for nombre in fields.split(',') if nombre.strip() and nombre.strip() != 'id']
+    desconocidos = [nombre for nombre in nombres if nombre not in disponibles]
+    if desconocidos:
+        raise ParametroInvalido(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return list(dict.fromkeys(nombres))
+
+
+def consulta_recurso(recurso, parametros):
+    """(queryset con solo las columnas necesarias, campos) de un recurso según los parámetros GET"""
+    modelo, filtros, disponibles = RECURSOS[recurso]
+    seleccion = campos_solicitados(disponibles, parametros.get('fields'))
+
+    consulta = modelo._default_manager.all()
+    for parametro, filtro in filtros.items():
+        valor = parametros.get(parametro)
+        if valor:
+            try:
+                consulta = consulta.filter(**{filtro: int(valor)})
+            except ValueError:
+                raise ParametroInvalido(f'{parametro} debe ser un id numérico')
+
+    columnas = {columna for nombre in seleccion for columna in disponibles[nombre][0]}
+    return consulta.only('id', *columnas), [(nombre, disponibles[nombre][1]) for nombre in seleccion]
+
+
+def serializar(objeto, seleccion):
+    return {'id': objeto.id, **{nombre: valor(objeto) for nombre, valor in seleccion}}
+
+
+def codificar_cursor(objeto_id):
+    return base64.urlsafe_b64encode(json.dumps([objeto_id]).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    try:
+        objeto_id, = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return int(objeto_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorInvalido(cursor)
+
+
+def respuesta_condicional(request, datos):
+    """JsonResponse con ETag del contenido; 304 si coincide con If-None-Match"""
+    respuesta = JsonResponse(datos)
+    set_response_etag(respuesta)
+    # El cliente guarda la respuesta pero la revalida siempre (barato con el ETag)
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    return get_conditional_response(request, etag=respuesta['ETag'], response=respuesta)
+
+
+def error(mensaje, status):
+    return JsonResponse({'success': False, 'error': mensaje}, status=status)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def listado(request, recurso):
+    """Página de un recurso. Parámetros GET: fields, cursor, limite y los filtros del recurso."""
+    if recurso not in RECURSOS:
+        return error('Recurso no encontrado', 404)
+    try:
+        consulta, seleccion = consulta_recurso(recurso, request.GET)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            consulta = consulta.filter(id__gt=decodificar_cursor(cursor))
+    except ParametroInvalido as e:
+        return error(str(e), 400)
+    except CursorInvalido:
+        return error('Cursor inválido', 400)
+
+    limite = obtener_limite(request.GET.get('limite'))
+    # Se pide una fila extra para saber si existe una página siguiente
+    pagina = list(consulta.order_by('id')[:limite + 1])
+    siguiente_cursor = codificar_cursor(pagina[limite - 1].id) if len(pagina) > limite else None
+
+    return respuesta_condicional(request, {
+        'success': True,
+        'resultados': [serializar(objeto, seleccion) for objeto in pagina[:limite]],
+        'siguiente_cursor': siguiente_cursor,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def detalle(request, recurso, objeto_id):
+    """Un objeto de un recurso. Parámetro GET: fields."""
+    if recurso not in RECURSOS:
+        return error('Recurso no encontrado', 404)
+    try:
+        consulta, seleccion = consulta_recurso(recurso, {'fields': request.GET.get('fields')})
+    except ParametroInvalido as e:
+        return error(str(e), 400)
+
+    objeto = consulta.filter(id=objeto_id).first()
+    if objeto is None:
+        return error('No encontrado', 404)
+    return respuesta_condicional(request, {'success': True, 'resultado': serializar(objeto, seleccion)})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def sincronizar(request):
+    """
+    Sincronización de dispositivos (core.sincronizacion).
+    GET: cambios desde ?marca= (opcional ?sucursal= y ?limite=). POST: {"cambios": [...]} hechos sin conexión.
+    """
+    from .sincronizacion import MarcaInvalida, aplicar_cambios, cambios_desde, obtener_limite as limite_sincronizacion
+
+    try:
+        if request.method == 'POST':
+            cambios = request.data.get('cambios') if isinstance(request.data, dict) else request.data
+            return JsonResponse({'success': True, **aplicar_cambios(cambios)})
+
+        sucursal_id = request.GET.get('sucursal')
+        if sucursal_id and not sucursal_id.isdigit():
+            raise ParametroInvalido('sucursal debe ser un id numérico')
+        datos = cambios_desde(
+            request.GET.get('marca') or None,
+            sucursal_id=int(sucursal_id) if sucursal_id else None,
+            limite=limite_sincronizacion(request.GET.get('limite'))
+        )
+        return JsonResponse({'success': True, **datos})
+    except ParametroInvalido as e:
+        return error(str(e), 400)
+    except MarcaInvalida:
+        return error('Marca inválida', 400)
@@ -0,0 +1,134 @@
+"""
+Caché por sucursal con versión
+Las páginas y exportaciones de una sucursal (áreas, históricos, CSV, JSON de
+las APIs de lectura) se reconstruyen igual para todos los usuarios mientras no
+cambien los datos. Cada sucursal (y cada cliente, para su listado de
+sucursales) tiene un número de versión en la caché y las entradas llevan la
+versión en la clave:
+
+    sucursal:12:v1718000000000000042:historico_termografias
+
+Toda escritura sube la versión tras el commit: los signals de los modelos de
+la sucursal (core.models) y, en las escrituras masivas que no envían signals
+(update, bulk_create, bulk_update), una llamada explícita a invalidar_activos
+o invalidar_sucursal. Las entradas de versiones anteriores no se borran: dejan
+de leerse y expiran solas.
+
+El backend es el de settings.CACHES (memoria local o archivos en desarrollo,
+Redis en producción); las versiones no expiran.
+"""
+import functools
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Vigencia de las entradas (la versión ya las invalida al cambiar los datos)
+DURACION = 60 * 60 * 24
+
+
+def clave_version(ambito, objeto_id):
+    return f'version:{ambito}:{objeto_id}'
+
+
+def version(ambito, objeto_id):
+    """Versión actual de la sucursal o cliente"""
+    clave = clave_version(ambito, objeto_id)
+    actual = cache.get(clave)
+    if actual is None:
+        # Una versión que se perdió (reinicio, desalojo) nunca vuelve a un valor
+        # anterior: se parte del reloj en nanosegundos
+        cache.add(clave, time.time_ns(), None)
+        actual = cache.get(clave)
+    return actual
+
+
+def _subir_version(ambito, objeto_id):
+    try:
+        cache.incr(clave_version(ambito, objeto_id))
+    except ValueError:
+        cache.set(clave_version(ambito, objeto_id), time.time_ns(), None)
+
+
+def invalidar(ambito, objeto_id):
+    """Sube la versión al confirmar la transacción en curso (o de inmediato si no hay)"""
+    if objeto_id is not None:
+        transaction.on_commit(lambda: _subir_version(ambito, objeto_id))
+
+
+def invalidar_sucursal(sucursal_id):
+    invalidar('sucursal', sucursal_id)
+
+
+def invalidar_cliente(cliente_id):
+    invalidar('cliente', cliente_id)
+
+
+def invalidar_area(area_id):
+    from .models import Area
+    invalidar_sucursal(Area.todos.filter(id=area_id).values_list('sucursal_id', flat=True).first())
+
+
+def invalidar_equipo(equipo_id):
+    from .models import Equipo
+    invalidar_sucursal(Equipo.todos.filter(id=equipo_id).values_list('area__sucursal_id', flat=True).first())
+
+
+def invalidar_activos(activos_ids):
+    """Sube la versión de las sucursales de los activos (una consulta)"""
+    from .models import Activo
+    activos_ids = list(activos_ids)
+    if not activos_ids:
+        return
+    for sucursal_id in set(Activo.todos.filter(id__in=activos_ids).values_list(
+        'equipo__area__sucursal_id', flat=True
+    )):
+        invalidar_sucursal(sucursal_id)
+
+
+def invalidar_alcance(activos=None, sucursal=None):
+    """Sube la versión de las sucursales de un recálculo por alcance (ver tendencias.filtrar_alcance)"""
+    from .models import Sucursal
+    if activos is not None:
+        invalidar_activos(activos)
+    elif sucursal is not None:
+        invalidar_sucursal(sucursal.id)
+    else:
+        for sucursal_id in Sucursal.todos.values_list('id', flat=True):
+            invalidar_sucursal(sucursal_id)
+
+
+def clave(ambito, objeto_id, nombre):
+    return f'{ambito}:{objeto_id}:v{version(ambito, objeto_id)}:{nombre}'
+
+
+def cacheado(ambito, objeto_id, nombre, funcion, duracion=DURACION):
+    """Valor de `funcion()` cacheado hasta la próxima escritura de la sucursal o cliente"""
+    llave = clave(ambito, objeto_id, nombre)
+    valor = cache.get(llave)
+    if valor is None:
+        valor = funcion()
+        cache.set(llave, valor, duracion)
+    return valor
+
+
+def respuesta_cacheada(ambito='sucursal', duracion=DURACION):
+    """
+    Decorador de vistas GET sin contenido propio del usuario (CSV, JSON): guarda
+    la respuesta completa por URL. El id sale del argumento <ambito>_id de la URL.
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method != 'GET':
+                return vista(request, *args, **kwargs)
+            llave = clave(ambito, kwargs[f'{ambito}_id'], f'respuesta:{request.get_full_path()}')
+            respuesta = cache.get(llave)
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code == 200 and not getattr(respuesta, 'streaming', False):
+                    cache.set(llave, respuesta, duracion)
+            return respuesta
+        return envoltura
+    return decorador
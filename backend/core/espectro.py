@@ -0,0 +1,299 @@
+"""
+Motor de espectro de vibraciones
+Calcula métricas a partir de formas de onda almacenadas (ver core.formas_onda):
+RMS de velocidad y aceleración, pico, factor de cresta, frecuencia dominante y
+energía por bandas (1×, 2×, 3× velocidad de giro y bandas adicionales como las
+frecuencias de falla de rodamientos).
+
+Las capturas con igual largo, frecuencia de muestreo y unidad se apilan en una
+matriz y se procesan con una sola rfft por grupo (ventana Hann). Las bandas se
+integran con una suma acumulada del espectro de potencia, sin ciclos por bin.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .alertas import evaluar_alertas_vibraciones
+from .anomalias import detectar_anomalias
+from .cache_sucursal import invalidar_activos
+from .formas_onda import abrir_senal
+from .ingesta_vibraciones import upsert_muestras
+from .models import Activo, FormaOnda, VibracionesAnalisis
+from .rodamientos import bandas_rodamientos
+from .severidad import clases_activos, clasificar_velocidades
+from .tendencias import calcular_tendencias
+
+
+G = 9806.65  # mm/s² por g
+
+# Banda de velocidad usada para severidad (ISO 10816)
+FRECUENCIA_MIN = 10.0
+FRECUENCIA_MAX = 1000.0
+
+# Ancho relativo de las bandas alrededor de cada frecuencia objetivo (±)
+TOLERANCIA_BANDA = 0.05
+
+# Armónicos de la velocidad de giro que se reportan
+ORDENES = (1, 2, 3)
+
+# Límite de muestras apiladas por rfft (float64 ≈ 8 bytes por muestra)
+MAX_MUESTRAS_LOTE = 2 ** 24
+
+
+def espectro_potencia(senales, fs):
+    """
+    Espectro de potencia de un lote de señales (matriz n_capturas × n_puntos).
+    Retorna (frecuencias, potencia) con la potencia escalada para que la suma
+    de los bins sea el cuadrado del RMS de la señal (Parseval, ventana Hann).
+    """
+    n = senales.shape[1]
+    ventana = np.hanning(n)
+    senales = senales - senales.mean(axis=1, keepdims=True)
+    espectro = np.fft.rfft(senales * ventana, axis=1)
+
+    potencia = np.abs(espectro) ** 2 / (n * np.sum(ventana ** 2))
+    # Espectro de un lado: se duplican todos los bins salvo DC y Nyquist
+    potencia[:, 1:(n + 1) // 2] *= 2
+    return np.fft.rfftfreq(n, d=1.0 / fs), potencia
+
+
+def a_velocidad_y_aceleracion(frecuencias, potencia, unidad):
+    """
+    Convierte el espectro de potencia de la unidad medida a espectros de
+    velocidad (mm/s) y aceleración (g) dividiendo/multiplicando por (2πf)²
+    """
+    w2 = (2 * np.pi * frecuencias) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if unidad == 'g':
+            aceleracion = potencia
+            velocidad = potencia * G ** 2 / w2
+        elif unidad == 'mm_s':
+            velocidad = potencia
+            aceleracion = potencia * w2 / G ** 2
+        else:  # 'um' desplazamiento
+            velocidad = potencia * w2 / 1000.0 ** 2
+            aceleracion = velocidad * w2 / G ** 2
+    velocidad[:, 0] = 0
+    aceleracion[:, 0] = 0
+    return velocidad, aceleracion
+
+
+def rms_bandas(frecuencias, acumulada, centros, tolerancia=TOLERANCIA_BANDA):
+    """
+    RMS en bandas [centro·(1-tol), centro·(1+tol)] por captura.
+    acumulada: suma acumulada de la potencia (n_capturas × n_bins).
+    centros: arreglo n_capturas × n_bandas (NaN = banda no disponible).
+    """
+    resolucion = frecuencias[1] - frecuencias[0]
+    ancho = np.maximum(centros * tolerancia, resolucion)
+    inicio = np.searchsorted(frecuencias, centros - ancho, side='left')
+    fin = np.searchsorted(frecuencias, centros + ancho, side='right')
+    inicio = np.clip(inicio, 0, frecuencias.size)
+    fin = np.clip(fin, 0, frecuencias.size)
+
+    # Potencia(banda) = acumulada[fin - 1] - acumulada[inicio - 1]
+    acumulada = np.concatenate([np.zeros((acumulada.shape[0], 1)), acumulada], axis=1)
+    filas = np.arange(acumulada.shape[0])[:, None]
+    energia = acumulada[filas, fin] - acumulada[filas, inicio]
+    return np.where(np.isnan(centros), np.nan, np.sqrt(np.maximum(energia, 0)))
+
+
+def calcular_metricas(senales, fs, unidad='g', rpm=None, bandas=None):
+    """
+    Calcula las métricas de un lote de capturas del mismo largo y frecuencia.
+    senales: matriz n_capturas × n_puntos en la unidad indicada.
+    rpm: arreglo por captura (NaN si se desconoce).
+    bandas: dict nombre → arreglo de frecuencias centrales por captura (Hz).
+    Retorna una lista de dicts (uno por captura).
+    """
+    senales = np.asarray(senales, dtype=np.float64)
+    m = senales.shape[0]
+    rpm = np.full(m, np.nan) if rpm is None else np.asarray(rpm, dtype=np.float64)
+    bandas = bandas or {}
+
+    # Dominio del tiempo (unidad medida)
+    centradas = senales - senales.mean(axis=1, keepdims=True)
+    rms_senal = np.sqrt(np.mean(centradas ** 2, axis=1))
+    pico = np.max(np.abs(centradas), axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor_cresta = np.where(rms_senal > 0, pico / rms_senal, 0.0)
+
+    # Dominio de la frecuencia
+    frecuencias, potencia = espectro_potencia(senales, fs)
+    velocidad, aceleracion = a_velocidad_y_aceleracion(frecuencias, potencia, unidad)
+    en_banda = (frecuencias >= FRECUENCIA_MIN) & (frecuencias <= FRECUENCIA_MAX)
+
+    velocidad_rms = np.sqrt(velocidad[:, en_banda].sum(axis=1))
+    aceleracion_rms = np.sqrt(aceleracion.sum(axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desplazamiento = velocidad * 1000.0 ** 2 / (2 * np.pi * frecuencias) ** 2
+    desplazamiento_rms = np.sqrt(np.nan_to_num(desplazamiento[:, en_banda]).sum(axis=1))
+
+    # Frecuencia dominante: mayor pico del espectro de velocidad en la banda ISO
+    indices_banda = np.flatnonzero(en_banda)
+    if indices_banda.size:
+        dominante = frecuencias[indices_banda[np.argmax(velocidad[:, en_banda], axis=1)]]
+    else:
+        dominante = np.full(m, np.nan)
+
+    # Bandas: armónicos de giro y bandas adicionales, sobre el espectro de velocidad
+    acumulada = np.cumsum(velocidad, axis=1)
+    giro = rpm / 60.0
+    centros = [giro * orden for orden in ORDENES]
+    nombres = [f'{orden}x' for orden in ORDENES]
+    for nombre, frecuencia in bandas.items():
+        nombres.append(nombre)
+        centros.append(np.broadcast_to(np.asarray(frecuencia, dtype=np.float64), (m,)))
+    energia = rms_bandas(frecuencias, acumulada, np.column_stack(centros))
+
+    resultados = []
+    for i in range(m):
+        resultados.append({
+            'velocidad_rms': round(float(velocidad_rms[i]), 4),
+            'aceleracion_rms': round(float(aceleracion_rms[i]), 4),
+            'desplazamiento_rms': round(float(desplazamiento_rms[i]), 4),
+            'rms_senal': round(float(rms_senal[i]), 4),
+            'pico': round(float(pico[i]), 4),
+            'factor_cresta': round(float(factor_cresta[i]), 3),
+            'frecuencia_dominante': None if np.isnan(dominante[i]) else round(float(dominante[i]), 2),
+            'bandas': {
+                nombre: None if np.isnan(energia[i, j]) else round(float(energia[i, j]), 4)
+                for j, nombre in enumerate(nombres)
+            },
+        })
+    return resultados
+
+
+def analizar_formas_onda(formas, bandas_por_forma=None):
+    """
+    Calcula y guarda en FormaOnda.metricas las métricas de varias capturas.
+    Agrupa por (num_puntos, frecuencia_muestreo, unidad) para apilar las señales.
+    bandas_por_forma: dict forma_id → {nombre: frecuencia} (opcional).
+    Retorna dict forma_id → métricas.
+    """
+    bandas_por_forma = bandas_por_forma or {}
+    grupos = defaultdict(list)
+    for forma in formas:
+        grupos[(forma.num_puntos, forma.frecuencia_muestreo, forma.unidad)].append(forma)
+
+    # RPM de la captura o, si no se registró, la nominal del activo
+    rpm_activos = dict(Activo.objects.filter(
+        id__in={forma.activo_id for forma in formas}
+    ).values_list('id', 'rpm'))
+
+    metricas = {}
+    for (num_puntos, fs, unidad), grupo in grupos.items():
+        por_lote = max(1, MAX_MUESTRAS_LOTE // max(num_puntos, 1))
+        for i in range(0, len(grupo), por_lote):
+            lote = grupo[i:i + por_lote]
+            senales = np.stack([abrir_senal(forma) for forma in lote])
+            rpm = [forma.rpm or rpm_activos.get(forma.activo_id) or np.nan for forma in lote]
+
+            # Bandas adicionales: se alinean por nombre, NaN donde la captura no la tiene
+            nombres = sorted({n for forma in lote for n in bandas_por_forma.get(forma.id, {})})
+            bandas = {
+                nombre: [bandas_por_forma.get(forma.id, {}).get(nombre, np.nan) for forma in lote]
+                for nombre in nombres
+            }
+
+            for forma, resultado in zip(lote, calcular_metricas(senales, fs, unidad, rpm, bandas)):
+                # Se conserva el análisis de envolvente si ya existía (core.rodamientos)
+                envolvente = (forma.metricas or {}).get('envolvente')
+                forma.metricas = {**resultado, 'envolvente': envolvente} if envolvente else resultado
+                metricas[forma.id] = resultado
+
+    FormaOnda.objects.bulk_update(formas, ['metricas'])
+    invalidar_activos({forma.activo_id for forma in formas})
+    return metricas
+
+
+def actualizar_muestras_desde_formas(formas):
+    """
+    Completa VibracionesAnalisis (activo, fecha) con las métricas de sus capturas.
+    Con varias capturas el mismo día (p.ej. 3 ejes) se usa el valor máximo, como
+    en la evaluación de severidad; la frecuencia dominante es la de la captura
+    con mayor velocidad RMS. El resultado se clasifica por severidad ISO 10816;
+    las observaciones no se modifican.
+    """
+    por_muestra = defaultdict(list)
+    for forma in formas:
+        if forma.metricas:
+            por_muestra[(forma.activo_id, timezone.localtime(forma.fecha_captura).date())].append(forma)
+
+    # Los ejes se suben uno por request: se suman las capturas ya analizadas del mismo día
+    if por_muestra:
+        anteriores = FormaOnda.objects.filter(
+            activo_id__in={activo_id for activo_id, _ in por_muestra},
+            fecha_captura__date__in={fecha for _, fecha in por_muestra},
+            metricas__isnull=False,
+        ).exclude(
+            id__in={forma.id for grupo in por_muestra.values() for forma in grupo}
+        ).only('id', 'activo_id', 'fecha_captura', 'metricas')
+        for forma in anteriores:
+            clave = (forma.activo_id, timezone.localtime(forma.fecha_captura).date())
+            if clave in por_muestra and forma.metricas:
+                por_muestra[clave].append(forma)
+
+    clases = clases_activos({activo_id for activo_id, _ in por_muestra})
+    muestras = []
+    for (activo_id, fecha), grupo in por_muestra.items():
+        principal = max(grupo, key=lambda f: f.metricas['velocidad_rms'])
+        muestras.append(VibracionesAnalisis(
+            activo_id=activo_id,
+            fecha_muestreo=fecha,
+            hora_muestreo=timezone.localtime(principal.fecha_captura).time(),
+            velocidad_rms=max(f.metricas['velocidad_rms'] for f in grupo),
+            aceleracion=max(f.metricas['aceleracion_rms'] for f in grupo),
+            desplazamiento=max(f.metricas['desplazamiento_rms'] for f in grupo),
+            frecuencia_dominante=principal.metricas['frecuencia_dominante'],
+        ))
+    if muestras:
+        resultados = clasificar_velocidades(
+            [m.velocidad_rms for m in muestras],
+            [clases.get(m.activo_id) for m in muestras]
+        )
+        for muestra, resultado in zip(muestras, resultados):
+            muestra.resultado = str(resultado)
+
+    with transaction.atomic():
+        upsert_muestras(muestras, campos=[
+            'hora_muestreo', 'velocidad_rms', 'aceleracion', 'desplazamiento',
+            'frecuencia_dominante', 'resultado', 'actualizado',
+        ])
+
+        # Enlazar cada captura con su muestra
+        ids = {
+            (activo_id, fecha): pk
+            for pk, activo_id, fecha in VibracionesAnalisis.objects.filter(
+                activo_id__in={a for a, _ in por_muestra},
+                fecha_muestreo__in={f for _, f in por_muestra}
+            ).values_list('id', 'activo_id', 'fecha_muestreo')
+        }
+        enlazar = []
+        for clave, grupo in por_muestra.items():
+            for forma in grupo:
+                forma.muestra_id = ids.get(clave)
+                enlazar.append(forma)
+        FormaOnda.objects.bulk_update(enlazar, ['muestra'])
+    activos_ids = {activo_id for activo_id, _ in por_muestra}
+    calcular_tendencias('vibraciones', activos=activos_ids)
+    detectar_anomalias(activos=activos_ids)
+    evaluar_alertas_vibraciones(activos_ids)
+    return len(muestras)
+
+
+def procesar_formas_onda(formas, bandas_por_forma=None):
+    """
+    Analiza las capturas y completa las muestras de vibraciones. Retorna métricas por forma.
+    Por defecto las bandas adicionales son las frecuencias de falla de los rodamientos del activo.
+    """
+    formas = list(formas)
+    if not formas:
+        return {}
+    if bandas_por_forma is None:
+        bandas_por_forma = bandas_rodamientos(formas)
+    metricas = analizar_formas_onda(formas, bandas_por_forma)
+    actualizar_muestras_desde_formas(formas)
+    return metricas
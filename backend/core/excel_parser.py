@@ -176,7 +176,7 @@ class ExcelEquiposParser:
             
             # Si es reemplazar, elimina primero
             if accion == 'reemplazar':
-                Equipo.objects.filter(area__sucursal=self.sucursal).delete()
+                Equipo.todos.filter(area__sucursal=self.sucursal).delete()
                 resultados['nota'] = 'Equipos y activos anteriores eliminados'
             
             # Procesar datos
@@ -190,43 +190,50 @@ class ExcelEquiposParser:
                     
                     # Obtener o crear equipo
                     if accion == 'upsert':
-                        equipo, creado = Equipo.objects.update_or_create(
+                        equipo, creado = Equipo.todos.update_or_create(
                             area=area,
                             nombre=dato['equipo'],
-                            defaults={'observaciones': dato['observaciones'] or ''}
+                            defaults={'observaciones': dato['observaciones'] or '', 'activo': True}
                         )
                         if creado:
                             resultados['equipos_creados'] += 1
                         else:
                             resultados['equipos_actualizados'] += 1
                     else:  # merge
-                        equipo, creado = Equipo.objects.get_or_create(
+                        equipo, creado = Equipo.todos.get_or_create(
                             area=area,
                             nombre=dato['equipo'],
                             defaults={'observaciones': dato['observaciones'] or ''}
                         )
                         if creado:
                             resultados['equipos_creados'] += 1
+                        elif not equipo.activo:
+                            # Estaba eliminado (archivado): vuelve a estar vigente
+                            equipo.activo = True
+                            equipo.save(update_fields=['activo', 'actualizado'])
                     
                     # Obtener o crear activo
                     if accion == 'upsert':
-                        activo, creado = Activo.objects.update_or_create(
+                        activo, creado = Activo.todos.update_or_create(
                             equipo=equipo,
                             nombre=dato['activo'],
-                            defaults={'observaciones': dato['observaciones'] or ''}
+                            defaults={'observaciones': dato['observaciones'] or '', 'activo': True}
                         )
                         if creado:
                             resultados['activos_creados'] += 1
                         else:
                             resultados['activos_actualizados'] += 1
                     else:  # merge
-                        activo, creado = Activo.objects.get_or_create(
+                        activo, creado = Activo.todos.get_or_create(
                             equipo=equipo,
                             nombre=dato['activo'],
                             defaults={'observaciones': dato['observaciones'] or ''}
                         )
                         if creado:
                             resultados['activos_creados'] += 1
+                        elif not activo.activo:
+                            activo.activo = True
+                            activo.save(update_fields=['activo', 'actualizado'])
                 
                 except Area.DoesNotExist:
                     resultados['errores'].append(
@@ -0,0 +1,111 @@
+"""
+Almacenamiento de formas de onda de vibraciones
+Las señales se guardan como arreglos float32 en formato .npy (compacto, con
+encabezado de dtype/forma) y se leen con np.load(mmap_mode='r'): el sistema
+operativo pagina solo los tramos que se recorren, por lo que una captura de
+millones de puntos se puede cortar o graficar sin cargarla completa en memoria.
+"""
+import io
+
+import numpy as np
+from django.core.files.base import ContentFile
+
+from .models import FormaOnda
+
+
+# Máximo de puntos que se envían al navegador para graficar
+MAX_PUNTOS_GRAFICO = 4000
+
+
+def normalizar_senal(datos):
+    """Convierte la señal a un arreglo 1-D float32 contiguo"""
+    senal = np.ascontiguousarray(np.asarray(datos, dtype=np.float32).ravel())
+    if senal.size == 0:
+        raise ValueError('La forma de onda no tiene muestras')
+    if not np.all(np.isfinite(senal)):
+        raise ValueError('La forma de onda contiene valores no numéricos')
+    return senal
+
+
+def leer_senal_subida(archivo):
+    """
+    Lee una señal subida por el colector: .npy, CSV/texto (un valor por línea
+    o separado por comas) o binario crudo float32 little-endian (.bin/.f32)
+    """
+    nombre = (getattr(archivo, 'name', '') or '').lower()
+    contenido = archivo.read()
+    if nombre.endswith('.npy'):
+        return np.load(io.BytesIO(contenido), allow_pickle=False)
+    if nombre.endswith(('.bin', '.f32', '.raw')):
+        return np.frombuffer(contenido, dtype='<f4')
+    texto = contenido.decode('utf-8-sig').replace(';', '\n').replace(',', '\n')
+    return np.array(texto.split(), dtype=np.float32)
+
+
+def guardar_forma_onda(activo, datos, frecuencia_muestreo, fecha_captura,
+                       eje='horizontal', unidad='g', rpm=None, muestra=None):
+    """Persiste la señal como .npy float32 y crea el registro FormaOnda"""
+    if not frecuencia_muestreo or frecuencia_muestreo <= 0:
+        raise ValueError('Frecuencia de muestreo inválida')
+    senal = normalizar_senal(datos)
+
+    buffer = io.BytesIO()
+    np.save(buffer, senal, allow_pickle=False)
+
+    forma = FormaOnda(
+        activo=activo,
+        muestra=muestra,
+        fecha_captura=fecha_captura,
+        eje=eje,
+        unidad=unidad,
+        frecuencia_muestreo=float(frecuencia_muestreo),
+        num_puntos=int(senal.size),
+        rpm=rpm,
+    )
+    nombre = f"activo_{activo.id}_{fecha_captura:%Y%m%d_%H%M%S}_{eje}.npy"
+    forma.archivo.save(nombre, ContentFile(buffer.getvalue()), save=False)
+    forma.save()
+    return forma
+
+
+def abrir_senal(forma):
+    """Abre la señal en modo memory-map de solo lectura (no copia los datos)"""
+    return np.load(forma.archivo.path, mmap_mode='r', allow_pickle=False)
+
+
+def tramo_senal(forma, inicio=None, fin=None):
+    """
+    Retorna (tiempo_inicial, tramo) de la señal entre inicio y fin (segundos).
+    El tramo sigue siendo una vista sobre el memory-map.
+    """
+    senal = abrir_senal(forma)
+    fs = forma.frecuencia_muestreo
+    i = max(0, int(round((inicio or 0) * fs)))
+    j = senal.shape[0] if fin is None else min(senal.shape[0], int(round(fin * fs)))
+    return i / fs, senal[i:max(i, j)]
+
+
+def reducir_para_grafico(senal, max_puntos=MAX_PUNTOS_GRAFICO):
+    """
+    Reduce la señal a ~max_puntos conservando la envolvente: por cada bloque
+    se toman el mínimo y el máximo, así los picos no desaparecen al graficar.
+    Retorna (indices, valores) como arreglos.
+    """
+    n = senal.shape[0]
+    if n <= max_puntos:
+        return np.arange(n), np.asarray(senal, dtype=np.float32)
+
+    bloques = max(1, max_puntos // 2)
+    tamano = n // bloques
+    recorte = np.asarray(senal[:bloques * tamano]).reshape(bloques, tamano)
+    pos_min = recorte.argmin(axis=1)
+    pos_max = recorte.argmax(axis=1)
+    base = np.arange(bloques) * tamano
+
+    # Intercalar min/max en orden temporal dentro de cada bloque
+    primero = np.minimum(pos_min, pos_max)
+    segundo = np.maximum(pos_min, pos_max)
+    indices = np.empty(bloques * 2, dtype=np.int64)
+    indices[0::2] = base + primero
+    indices[1::2] = base + segundo
+    return indices, np.asarray(senal[indices], dtype=np.float32)
@@ -72,12 +72,13 @@ class AreaForm(forms.ModelForm):
 class EquipoForm(forms.ModelForm):
     class Meta:
         model = Equipo
-        fields = ['nombre', 'descripcion', 'observaciones', 'estado', 'activo']
+        fields = ['nombre', 'descripcion', 'observaciones', 'estado', 'clase_maquina', 'activo']
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nombre del equipo'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Descripción'}),
             'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Potencia, RPM, Voltaje, etc.'}),
             'estado': forms.Select(attrs={'class': 'form-control estado-select'}),
+            'clase_maquina': forms.Select(attrs={'class': 'form-control'}),
             'activo': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
@@ -85,12 +86,14 @@ class EquipoForm(forms.ModelForm):
 class ActivoForm(forms.ModelForm):
     class Meta:
         model = Activo
-        fields = ['nombre', 'descripcion', 'observaciones', 'estado', 'activo']
+        fields = ['nombre', 'descripcion', 'observaciones', 'estado', 'clase_maquina', 'intervalo_muestreo_dias', 'activo']
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nombre del activo'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Descripción'}),
             'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Potencia, RPM, Voltaje, Fases, etc.'}),
             'estado': forms.Select(attrs={'class': 'form-control estado-select'}),
+            'clase_maquina': forms.Select(attrs={'class': 'form-control'}),
+            'intervalo_muestreo_dias': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'activo': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
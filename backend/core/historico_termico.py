@@ -0,0 +1,79 @@
+"""
+Histórico de termografías
+Cada foto térmica analizada (o corregida a mano) deja una fila en
+TermografiaAnalisis con la temperatura, el resultado y la imagen del momento.
+Las filas no se borran al reemplazar o eliminar la foto del activo: la imagen
+del histórico es una referencia más al mismo archivo del almacenamiento por
+contenido (core.almacenamiento.enlazar), sin copiar bytes.
+
+Una misma imagen en el mismo día actualiza su fila en vez de duplicarla (p. ej.
+cuando el usuario corrige las temperaturas que no pudo leer el OCR).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .almacenamiento import enlazar
+from .models import TermografiaAnalisis
+from .tendencias import calcular_tendencias
+
+
+# Estado del análisis térmico (AnalizadorTermico / AnalisisTermico) → resultado del histórico
+RESULTADO_POR_ESTADO = {
+    'bueno': 'normal',
+    'alarma': 'alerta',
+    'emergencia': 'critico',
+}
+
+
+def registrar_termografia(activo, estado, temperatura_maxima, temperatura_promedio, temperatura_minima,
+                          porcentaje_zona_alerta=0, porcentaje_zona_critica=0):
+    """
+    Registra en el histórico la medición actual del activo con su foto térmica
+    y recalcula su tendencia de termografía. Retorna la fila del histórico.
+    """
+    ahora = timezone.localtime()
+    nombre_imagen = activo.foto_termica.name or ''
+    zona_buena = max(0.0, 100.0 - (porcentaje_zona_alerta or 0) - (porcentaje_zona_critica or 0))
+    valores = {
+        'hora_muestreo': ahora.time().replace(microsecond=0),
+        'temperatura_maxima': temperatura_maxima or 0,
+        'temperatura_promedio': temperatura_promedio or 0,
+        'temperatura_minima': temperatura_minima or 0,
+        'porcentaje_zona_buena': zona_buena,
+        'porcentaje_zona_alerta': porcentaje_zona_alerta or 0,
+        'porcentaje_zona_critica': porcentaje_zona_critica or 0,
+        'resultado': RESULTADO_POR_ESTADO.get(estado, 'normal'),
+    }
+
+    with transaction.atomic():
+        registro = TermografiaAnalisis.objects.select_for_update().filter(
+            activo=activo,
+            fecha_muestreo=ahora.date(),
+            imagen_termica=nombre_imagen
+        ).order_by('-creado').first()
+
+        if registro is None:
+            registro = TermografiaAnalisis(activo=activo, fecha_muestreo=ahora.date())
+            if nombre_imagen:
+                registro.imagen_termica.name = enlazar(nombre_imagen)
+        for campo, valor in valores.items():
+            setattr(registro, campo, valor)
+        registro.save()
+
+    calcular_tendencias('termografia', activos=[activo.id])
+    return registro
+
+
+def matriz_historico(sucursal):
+    """
+    Análisis de la sucursal en una consulta, para las tablas activo × fecha.
+    Retorna (fechas descendentes, {(activo_id, fecha): análisis}); si un activo
+    tiene varios análisis en una fecha queda el último.
+    """
+    celdas = {}
+    for analisis in TermografiaAnalisis.objects.filter(
+        activo__equipo__area__sucursal=sucursal
+    ).order_by('fecha_muestreo', 'creado', 'id'):
+        celdas[(analisis.activo_id, analisis.fecha_muestreo)] = analisis
+    fechas = sorted({fecha for _, fecha in celdas}, reverse=True)
+    return fechas, celdas
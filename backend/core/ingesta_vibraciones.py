@@ -0,0 +1,162 @@
+"""
+Ingesta masiva de muestras de vibraciones (colectores de datos)
+Formato de cada fila (JSON o CSV con encabezado):
+activo, fecha, hora, velocidad_rms, aceleracion, frecuencia_dominante, desplazamiento, resultado, observaciones
+"""
+import csv
+import io
+import math
+import time
+from datetime import datetime
+
+from django.db import connection, transaction
+
+from .alertas import evaluar_alertas_vibraciones
+from .anomalias import detectar_anomalias
+from .cache_sucursal import invalidar_activos
+from .models import VibracionesAnalisis
+from .severidad import clases_activos, clasificar_velocidades
+from .tendencias import calcular_tendencias
+
+
+# Filas escritas por sentencia
+TAMANO_LOTE = 500
+
+# Campos que se sobrescriben cuando ya existe una muestra para (activo, fecha)
+CAMPOS_ACTUALIZABLES = [
+    'hora_muestreo', 'velocidad_rms', 'aceleracion', 'frecuencia_dominante',
+    'desplazamiento', 'resultado', 'observaciones', 'actualizado',
+]
+
+
+def leer_csv(archivo):
+    """Lee filas desde un archivo CSV (bytes o texto) con encabezado"""
+    if isinstance(archivo, (bytes, str)):
+        texto = archivo.decode('utf-8-sig') if isinstance(archivo, bytes) else archivo
+        stream = io.StringIO(texto)
+    else:
+        stream = io.TextIOWrapper(archivo, encoding='utf-8-sig')
+    return list(csv.DictReader(stream))
+
+
+def _float(valor, requerido=False):
+    """Convierte a float aceptando coma decimal; '' o None retorna 0 o None"""
+    if valor is None or str(valor).strip() == '':
+        return 0.0 if requerido else None
+    numero = float(str(valor).strip().replace(',', '.'))
+    # float() acepta 'nan' e 'inf', que no son mediciones
+    if not math.isfinite(numero):
+        raise ValueError(f'Valor numérico inválido: {valor}')
+    return numero
+
+
+def _hora(valor):
+    """Convierte HH:MM o HH:MM:SS a time"""
+    if valor is None or str(valor).strip() == '':
+        return None
+    valor = str(valor).strip()
+    formato = '%H:%M:%S' if valor.count(':') == 2 else '%H:%M'
+    return datetime.strptime(valor, formato).time()
+
+
+def construir_muestra(fila):
+    """Valida una fila y construye la instancia (sin guardar) de VibracionesAnalisis"""
+    activo_id = fila.get('activo', fila.get('activo_id'))
+    if activo_id in (None, ''):
+        raise ValueError('Activo requerido')
+
+    fecha_str = str(fila.get('fecha', '') or '').strip()
+    if not fecha_str:
+        raise ValueError('Fecha requerida')
+
+    # Sin resultado explícito se clasifica por severidad ISO 10816 al ingestar
+    resultado = str(fila.get('resultado', '') or '').strip() or None
+    if resultado and resultado not in dict(VibracionesAnalisis.RESULTADO_CHOICES):
+        raise ValueError(f'Resultado inválido: {resultado}')
+
+    return VibracionesAnalisis(
+        activo_id=int(activo_id),
+        fecha_muestreo=datetime.strptime(fecha_str, '%Y-%m-%d').date(),
+        hora_muestreo=_hora(fila.get('hora')),
+        velocidad_rms=_float(fila.get('velocidad_rms'), requerido=True),
+        aceleracion=_float(fila.get('aceleracion'), requerido=True),
+        frecuencia_dominante=_float(fila.get('frecuencia_dominante')),
+        desplazamiento=_float(fila.get('desplazamiento')),
+        resultado=resultado,
+        observaciones=fila.get('observaciones') or '',
+    )
+
+
+def upsert_muestras(muestras, campos=CAMPOS_ACTUALIZABLES):
+    """
+    Inserta o actualiza muestras por (activo, fecha_muestreo) en una sola sentencia
+    (INSERT ... ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en PostgreSQL/SQLite).
+    """
+    opciones = {}
+    # MySQL resuelve el conflicto con cualquier clave única y no acepta unique_fields
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['activo', 'fecha_muestreo']
+    guardadas = VibracionesAnalisis.objects.bulk_create(
+        muestras,
+        batch_size=TAMANO_LOTE,
+        update_conflicts=True,
+        update_fields=campos,
+        **opciones
+    )
+    invalidar_activos({muestra.activo_id for muestra in muestras})
+    return guardadas
+
+
+def ingestar_muestras(filas):
+    """
+    Valida e ingesta filas de muestras de vibraciones en lotes de TAMANO_LOTE.
+    Si una misma (activo, fecha) viene repetida prevalece la última fila.
+    Retorna un resumen con conteos, errores por fila y throughput.
+    """
+    inicio = time.perf_counter()
+    errores = []
+    muestras = {}
+
+    for numero, fila in enumerate(filas, start=1):
+        try:
+            if not isinstance(fila, dict):
+                raise ValueError('Fila inválida')
+            muestra = construir_muestra(fila)
+        except (ValueError, TypeError) as e:
+            errores.append({'fila': numero, 'error': str(e)})
+            continue
+        muestras[(muestra.activo_id, muestra.fecha_muestreo)] = (numero, muestra)
+
+    # Descartar muestras de activos inexistentes
+    clases = clases_activos({activo_id for activo_id, _ in muestras})
+    validas = []
+    for (activo_id, _), (numero, muestra) in muestras.items():
+        if activo_id in clases:
+            validas.append(muestra)
+        else:
+            errores.append({'fila': numero, 'error': f'Activo {activo_id} no encontrado'})
+
+    sin_resultado = [m for m in validas if not m.resultado]
+    if sin_resultado:
+        resultados = clasificar_velocidades(
+            [m.velocidad_rms for m in sin_resultado],
+            [clases[m.activo_id] for m in sin_resultado]
+        )
+        for muestra, resultado in zip(sin_resultado, resultados):
+            muestra.resultado = str(resultado)
+
+    with transaction.atomic():
+        upsert_muestras(validas)
+    activos_ids = {m.activo_id for m in validas}
+    calcular_tendencias('vibraciones', activos=activos_ids)
+    detectar_anomalias(activos=activos_ids)
+    evaluar_alertas_vibraciones(activos_ids)
+
+    duracion = time.perf_counter() - inicio
+    return {
+        'filas': len(filas),
+        'guardadas': len(validas),
+        'errores': sorted(errores, key=lambda e: e['fila']),
+        'duracion_ms': round(duracion * 1000, 1),
+        'filas_por_segundo': round(len(validas) / duracion, 1) if duracion > 0 else None,
+    }
@@ -0,0 +1,114 @@
+"""
+Línea de tiempo unificada de mediciones por activo
+Une en una sola consulta (UNION ALL) las filas de VibracionesAnalisis,
+TermografiaAnalisis, AnalisisTermico y MuestreoActivo de uno o varios activos,
+reducidas a las mismas columnas:
+
+    (id, activo_id, tipo, fecha, valor, valor_secundario, estado, imagen)
+
+El orden es (fecha, tipo, id) descendente y la paginación es keyset: la
+condición del cursor se aplica dentro de cada consulta antes del UNION, así
+cada tabla usa su índice (activo, fecha) y ninguna página usa OFFSET.
+"""
+import base64
+import json
+from datetime import date
+
+from django.core.files.storage import default_storage
+from django.db import connection, models
+from django.db.models import F, Q, Value
+from django.db.models.functions import TruncDate
+
+from .listados import CursorInvalido
+from .models import AnalisisTermico, MuestreoActivo, TermografiaAnalisis, VibracionesAnalisis
+
+
+# Origen de cada tipo de evento: (modelo, campo fecha, valor, valor secundario, estado, imagen)
+FUENTES = {
+    'vibraciones': (VibracionesAnalisis, 'fecha_muestreo', 'velocidad_rms', 'aceleracion', 'resultado', None),
+    'termografia': (TermografiaAnalisis, 'fecha_muestreo', 'temperatura_maxima', 'temperatura_promedio', 'resultado', 'imagen_termica'),
+    'analisis_termico': (AnalisisTermico, None, 'temperatura_maxima', 'temperatura_promedio', 'estado', None),
+    'muestreo': (MuestreoActivo, 'fecha_muestreo', None, None, None, None),
+}
+
+COLUMNAS = ('id', 'activo_id', 'ev_tipo', 'ev_fecha', 'ev_valor', 'ev_valor_secundario', 'ev_estado', 'ev_imagen')
+
+
+def _columna(campo, tipo_campo):
+    return F(campo) if campo else Value(None, output_field=tipo_campo)
+
+
+def consulta_fuente(tipo, activos, cursor=None):
+    """Consulta reducida de un tipo de evento, con la condición del cursor aplicada"""
+    modelo, campo_fecha, valor, secundario, estado, imagen = FUENTES[tipo]
+    fecha = F(campo_fecha) if campo_fecha else TruncDate('creado')
+
+    consulta = modelo.objects.filter(activo_id__in=activos).annotate(
+        ev_tipo=Value(tipo, output_field=models.CharField()),
+        ev_fecha=fecha,
+        ev_valor=_columna(valor, models.FloatField()),
+        ev_valor_secundario=_columna(secundario, models.FloatField()),
+        ev_estado=F(estado) if estado else Value('', output_field=models.CharField()),
+        ev_imagen=F(imagen) if imagen else Value('', output_field=models.CharField()),
+    )
+
+    if cursor:
+        fecha_cursor, tipo_cursor, id_cursor = cursor
+        # Orden descendente (fecha, tipo, id): el tipo es constante dentro de la consulta
+        if tipo < tipo_cursor:
+            consulta = consulta.filter(ev_fecha__lte=fecha_cursor)
+        elif tipo == tipo_cursor:
+            consulta = consulta.filter(Q(ev_fecha__lt=fecha_cursor) | Q(ev_fecha=fecha_cursor, id__lt=id_cursor))
+        else:
+            consulta = consulta.filter(ev_fecha__lt=fecha_cursor)
+    # Sin el ordering por defecto del modelo (no se permite dentro de un UNION)
+    return consulta.order_by().values_list(*COLUMNAS)
+
+
+def codificar_cursor(evento):
+    clave = [evento['fecha'], evento['tipo'], evento['id']]
+    return base64.urlsafe_b64encode(json.dumps(clave).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    try:
+        fecha, tipo, evento_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return date.fromisoformat(fecha), str(tipo), int(evento_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorInvalido(cursor)
+
+
+def linea_tiempo(activos, tipos=None, cursor=None, limite=100):
+    """
+    Eventos de los activos ordenados del más reciente al más antiguo.
+    tipos: subconjunto de FUENTES (por defecto todos). Retorna (eventos, siguiente_cursor).
+    """
+    tipos = [t for t in FUENTES if not tipos or t in tipos]
+    clave_cursor = decodificar_cursor(cursor) if cursor else None
+
+    consultas = []
+    for tipo in tipos:
+        consulta = consulta_fuente(tipo, activos, clave_cursor)
+        # Donde la base lo permite, cada rama aporta solo las filas que pueden entrar en la página
+        if len(tipos) > 1 and connection.features.supports_slicing_ordering_in_compound:
+            consulta = consulta.order_by('-ev_fecha', '-id')[:limite + 1]
+        consultas.append(consulta)
+    if not consultas:
+        return [], None
+
+    union = consultas[0].union(*consultas[1:], all=True) if len(consultas) > 1 else consultas[0]
+    filas = list(union.order_by('-ev_fecha', '-ev_tipo', '-id')[:limite + 1])
+
+    eventos = [{
+        'tipo': tipo,
+        'id': evento_id,
+        'activo_id': activo_id,
+        'fecha': fecha.isoformat() if fecha else None,
+        'valor': valor,
+        'valor_secundario': secundario,
+        'estado': estado or '',
+        'imagen': default_storage.url(imagen) if imagen else None,
+    } for evento_id, activo_id, tipo, fecha, valor, secundario, estado, imagen in filas[:limite]]
+
+    siguiente_cursor = codificar_cursor(eventos[-1]) if len(filas) > limite else None
+    return eventos, siguiente_cursor
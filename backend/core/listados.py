@@ -0,0 +1,198 @@
+"""
+Listados paginados de activos por sucursal
+Paginación keyset (por cursor) sobre (area_orden, equipo, nombre, id):
+cada página se obtiene con un WHERE sobre la última fila entregada, sin OFFSET,
+por lo que el costo de la primera página no depende del tamaño de la planta.
+"""
+import base64
+import json
+
+from django.db import models
+from django.db.models import Case, Q, When
+
+from .miniaturas import url_miniatura
+from .models import Activo, Area, Equipo
+
+
+# Tamaño de página por defecto y máximo permitido por request
+TAMANO_PAGINA = 100
+TAMANO_PAGINA_MAXIMO = 500
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar"""
+
+
+def orden_area(campo='equipo__area__nombre'):
+    """Expresión que ordena las áreas como Aserradero, Elaborado, Caldera"""
+    return Case(
+        When(**{campo: 'aserradero'}, then=0),
+        When(**{campo: 'elaborado'}, then=1),
+        When(**{campo: 'caldera'}, then=2),
+        default=3,
+        output_field=models.IntegerField()
+    )
+
+
+def activos_sucursal(sucursal):
+    """Activos vigentes de una sucursal en el orden estándar del listado total"""
+    return Activo.objects.filter(
+        equipo__area__sucursal=sucursal,
+        activo=True
+    ).select_related(
+        'equipo',
+        'equipo__area'
+    ).annotate(
+        area_orden=orden_area()
+    ).order_by('area_orden', 'equipo__nombre', 'nombre', 'id')
+
+
+def filtrar_activos(activos, estado=None, area=None, texto=None):
+    """Aplica los filtros del listado: estado, área (nombre) y texto libre"""
+    if estado:
+        activos = activos.filter(estado=estado)
+    if area and area in dict(Area.AREA_CHOICES):
+        activos = activos.filter(equipo__area__nombre=area)
+    if texto:
+        activos = activos.filter(
+            Q(nombre__icontains=texto) |
+            Q(equipo__nombre__icontains=texto) |
+            Q(descripcion__icontains=texto) |
+            Q(observaciones__icontains=texto)
+        )
+    return activos
+
+
+def filtros_desde_request(request):
+    """Obtiene los filtros del listado desde los parámetros GET"""
+    return {
+        'estado': request.GET.get('estado', '').strip() or None,
+        'area': request.GET.get('area', '').strip() or None,
+        'texto': request.GET.get('q', '').strip() or None,
+    }
+
+
+def codificar_cursor(activo):
+    """Codifica la clave de orden de un activo como cursor opaco (base64 url-safe)"""
+    clave = [activo.area_orden, activo.equipo.nombre, activo.nombre, activo.id]
+    return base64.urlsafe_b64encode(json.dumps(clave).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """Decodifica un cursor generado por codificar_cursor"""
+    try:
+        area_orden, equipo_nombre, nombre, activo_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        )
+        return int(area_orden), str(equipo_nombre), str(nombre), int(activo_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorInvalido(cursor)
+
+
+def obtener_limite(valor):
+    """Normaliza el tamaño de página solicitado"""
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return TAMANO_PAGINA
+    return max(1, min(limite, TAMANO_PAGINA_MAXIMO))
+
+
+def paginar_activos(activos, cursor=None, limite=TAMANO_PAGINA):
+    """
+    Retorna (pagina, siguiente_cursor) para un queryset de activos_sucursal().
+    siguiente_cursor es None cuando no quedan más filas.
+    """
+    if cursor:
+        area_orden, equipo_nombre, nombre, activo_id = decodificar_cursor(cursor)
+        activos = activos.filter(
+            Q(area_orden__gt=area_orden) |
+            Q(area_orden=area_orden, equipo__nombre__gt=equipo_nombre) |
+            Q(area_orden=area_orden, equipo__nombre=equipo_nombre, nombre__gt=nombre) |
+            Q(area_orden=area_orden, equipo__nombre=equipo_nombre, nombre=nombre, id__gt=activo_id)
+        )
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    pagina = list(activos[:limite + 1])
+    siguiente_cursor = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        siguiente_cursor = codificar_cursor(pagina[-1])
+    return pagina, siguiente_cursor
+
+
+def equipos_sin_activos(sucursal, estado=None, area=None, texto=None):
+    """
+    Equipos vigentes de una sucursal sin activos vigentes, en el orden del
+    listado total. El listado se pagina por activos, así que estos equipos no
+    aparecen en ninguna página; se agregan en la última (ver agrupar_por_equipo).
+    """
+    if estado:
+        # El filtro de estado es de los activos: un equipo sin activos no lo cumple
+        return []
+    equipos = Equipo.objects.filter(area__sucursal=sucursal, activo=True).exclude(activos__activo=True)
+    if area and area in dict(Area.AREA_CHOICES):
+        equipos = equipos.filter(area__nombre=area)
+    if texto:
+        equipos = equipos.filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto) | Q(observaciones__icontains=texto))
+    return list(equipos.select_related('area').annotate(
+        area_orden=orden_area('area__nombre')
+    ).order_by('area_orden', 'nombre', 'id'))
+
+
+def agrupar_por_equipo(activos, sin_activos=()):
+    """
+    Agrupa una página de activos (ordenada por equipo) en la estructura
+    equipo → activos_vigentes que usan las tablas de vibraciones.
+    sin_activos: equipos de equipos_sin_activos() que se intercalan en su
+    lugar (con activos_vigentes vacío); solo se pasan en la última página.
+    """
+    equipos = []
+    for activo in activos:
+        if not equipos or equipos[-1].id != activo.equipo_id:
+            equipo = activo.equipo
+            equipo.area_orden = activo.area_orden
+            equipo.activos_vigentes = []
+            equipos.append(equipo)
+        equipos[-1].activos_vigentes.append(activo)
+
+    if not sin_activos:
+        return equipos
+
+    # Ambas listas vienen en orden (área, nombre): se intercalan sin reordenar ninguna
+    def clave(equipo):
+        return equipo.area_orden, equipo.nombre.casefold()
+
+    intercalados = []
+    pendientes = list(sin_activos)
+    for equipo in equipos:
+        while pendientes and clave(pendientes[0]) < clave(equipo):
+            intercalados.append(pendientes.pop(0))
+        intercalados.append(equipo)
+    intercalados += pendientes
+    for equipo in sin_activos:
+        equipo.activos_vigentes = []
+    return intercalados
+
+
+def serializar_activo(activo):
+    """Representación JSON de una fila del listado"""
+    return {
+        'id': activo.id,
+        'nombre': activo.nombre,
+        'descripcion': activo.descripcion or '',
+        'observaciones': activo.observaciones or '',
+        'estado': activo.estado,
+        'estado_display': activo.get_estado_display(),
+        'foto_termica': activo.foto_termica.url if activo.foto_termica else None,
+        'foto_termica_miniatura': url_miniatura(activo.foto_termica, 160) or None,
+        'equipo': {
+            'id': activo.equipo.id,
+            'nombre': activo.equipo.nombre,
+        },
+        'area': {
+            'id': activo.equipo.area.id,
+            'nombre': activo.equipo.area.nombre,
+            'nombre_display': activo.equipo.area.get_nombre_display(),
+        },
+    }
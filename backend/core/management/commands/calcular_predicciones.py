@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.models import Sucursal
+from core.prediccion import calcular_predicciones
+from core.tendencias import SERIES
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los pronósticos de vida útil remanente por activo (ejecución nocturna)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sucursal', type=int, help='ID de la sucursal (por defecto todas)')
+        parser.add_argument('--tipo', choices=list(SERIES), help='Solo vibraciones o termografia')
+
+    def handle(self, *args, **options):
+        sucursal = Sucursal.objects.get(id=options['sucursal']) if options['sucursal'] else None
+        tipos = [options['tipo']] if options['tipo'] else list(SERIES)
+
+        inicio = time.perf_counter()
+        for tipo in tipos:
+            total = calcular_predicciones(tipo, sucursal=sucursal)
+            self.stdout.write(f'  ✓ {tipo}: {total} activos')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Predicciones actualizadas en {time.perf_counter() - inicio:.1f} s'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.models import Sucursal
+from core.tendencias import SERIES, calcular_tendencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las tendencias de vibraciones y termografía por activo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sucursal', type=int, help='ID de la sucursal (por defecto todas)')
+        parser.add_argument('--tipo', choices=list(SERIES), help='Solo vibraciones o termografia')
+
+    def handle(self, *args, **options):
+        sucursal = Sucursal.objects.get(id=options['sucursal']) if options['sucursal'] else None
+        tipos = [options['tipo']] if options['tipo'] else list(SERIES)
+
+        for tipo in tipos:
+            total = calcular_tendencias(tipo, sucursal=sucursal)
+            self.stdout.write(f'  ✓ {tipo}: {total} activos')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Tendencias actualizadas'))
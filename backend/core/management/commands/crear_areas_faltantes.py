@@ -27,7 +27,7 @@ class Command(BaseCommand):
                 self.stdout.write(f'  - {sucursal.nombre} ({sucursal.cliente.nombre}): {areas_existentes}/3 áreas')
                 
                 for area_nombre, area_label in areas_predefinidas:
-                    area, created = Area.objects.get_or_create(
+                    area, created = Area.todos.get_or_create(
                         sucursal=sucursal,
                         nombre=area_nombre,
                         defaults={'descripcion': f'Área de {area_label}'}
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.anomalias import detectar_anomalias
+from core.models import Sucursal
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las marcas de anomalía (z-score robusto) de las muestras de vibraciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sucursal', type=int, help='ID de la sucursal (por defecto todas)')
+
+    def handle(self, *args, **options):
+        sucursal = Sucursal.objects.get(id=options['sucursal']) if options['sucursal'] else None
+
+        resultado = detectar_anomalias(sucursal=sucursal)
+        self.stdout.write(f"  ✓ {resultado['evaluadas']} muestras evaluadas, {resultado['actualizadas']} actualizadas")
+
+        self.stdout.write(self.style.SUCCESS(f"\n✅ {resultado['anomalias']} anomalías vigentes"))
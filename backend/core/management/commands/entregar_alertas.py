@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.alertas import entregar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Entrega por correo las notificaciones de alerta pendientes (outbox)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Queda en ejecución revisando la bandeja de salida')
+        parser.add_argument('--intervalo', type=int, default=30, help='Segundos entre revisiones en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            resultado = entregar_notificaciones()
+            if resultado['enviadas'] or resultado['fallidas'] or not options['continuo']:
+                self.stdout.write(f"  ✓ {resultado['enviadas']} enviadas, {resultado['fallidas']} con error")
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Entrega de alertas finalizada'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.miniaturas import generar_miniaturas
+from core.models import CAMPOS_IMAGEN
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP/JPEG faltantes de todas las imágenes (fotos térmicas, logos, planos, perfiles)'
+
+    def handle(self, *args, **options):
+        for modelo, campo in CAMPOS_IMAGEN.items():
+            pendientes = modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            generadas = 0
+            for pk in pendientes.values_list('pk', flat=True).iterator():
+                try:
+                    generar_miniaturas(modelo, pk, campo)
+                    generadas += 1
+                except (OSError, ValueError) as e:
+                    self.stdout.write(self.style.WARNING(f'  ⚠️ {modelo.__name__} {pk}: {e}'))
+            self.stdout.write(f'  ✓ {modelo.__name__}: {generadas} imágenes')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Miniaturas actualizadas'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.models import Sucursal
+from core.teselas import generar_teselas
+
+
+class Command(BaseCommand):
+    help = 'Genera las teselas faltantes de los planos de planta de todas las sucursales'
+
+    def handle(self, *args, **options):
+        pendientes = Sucursal.objects.exclude(plano_planta='').exclude(plano_planta__isnull=True)
+        generadas = 0
+        for pk in pendientes.values_list('pk', flat=True).iterator():
+            try:
+                generar_teselas(pk)
+                generadas += 1
+            except (OSError, ValueError) as e:
+                self.stdout.write(self.style.WARNING(f'  ⚠️ Sucursal {pk}: {e}'))
+        self.stdout.write(f'  ✓ {generadas} planos')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Teselas actualizadas'))
@@ -28,15 +28,18 @@ class Command(BaseCommand):
             resultado = choice(RESULTADOS)
             
             # Crear registro de análisis
-            analisis = VibracionesAnalisis.objects.create(
+            # Una muestra por activo y fecha: si ya existe la de hoy se reemplaza
+            analisis, _ = VibracionesAnalisis.objects.update_or_create(
                 activo=activo,
-                velocidad_rms=velocidad_rms,
-                aceleracion=aceleracion,
-                frecuencia_dominante=frecuencia_dominante,
-                desplazamiento=desplazamiento,
-                resultado=resultado,
                 fecha_muestreo=date.today(),
-                observaciones=f'Datos ficticios para prueba - Resultado: {resultado}'
+                defaults={
+                    'velocidad_rms': velocidad_rms,
+                    'aceleracion': aceleracion,
+                    'frecuencia_dominante': frecuencia_dominante,
+                    'desplazamiento': desplazamiento,
+                    'resultado': resultado,
+                    'observaciones': f'Datos ficticios para prueba - Resultado: {resultado}'
+                }
             )
             contador += 1
             self.stdout.write(
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.espectro import procesar_formas_onda
+from core.models import FormaOnda
+
+
+class Command(BaseCommand):
+    help = 'Calcula métricas de espectro de las formas de onda y completa las muestras de vibraciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Reprocesar también las que ya tienen métricas')
+        parser.add_argument('--activo', type=int, help='Procesar solo las formas de onda de un activo')
+        parser.add_argument('--lote', type=int, default=200, help='Formas de onda por lote')
+
+    def handle(self, *args, **options):
+        formas = FormaOnda.objects.order_by('id')
+        if not options['todas']:
+            formas = formas.filter(metricas__isnull=True)
+        if options['activo']:
+            formas = formas.filter(activo_id=options['activo'])
+
+        ids = list(formas.values_list('id', flat=True))
+        if not ids:
+            self.stdout.write(self.style.WARNING('No hay formas de onda para procesar'))
+            return
+
+        total = 0
+        for i in range(0, len(ids), options['lote']):
+            total += len(procesar_formas_onda(FormaOnda.objects.filter(id__in=ids[i:i + options['lote']])))
+            self.stdout.write(f'  ✓ {total}/{len(ids)} formas de onda procesadas')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Se procesaron {total} formas de onda'))
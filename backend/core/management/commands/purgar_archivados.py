@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import JERARQUIA_ARCHIVO, Activo, Area, Cliente, Equipo, Sucursal
+
+
+# De padres a hijos: al borrar un padre la cascada ya se lleva sus hijos
+MODELOS = (Cliente, Sucursal, Area, Equipo, Activo)
+
+
+class Command(BaseCommand):
+    help = ('Archiva los descendientes vigentes de clientes, sucursales, áreas y equipos archivados '
+            'y borra definitivamente los archivados hace más de --dias días (con sus análisis)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=90,
+                            help='Antigüedad mínima (días desde que se archivó) para borrar definitivamente')
+        parser.add_argument('--simular', action='store_true', help='Informa lo que se borraría sin borrar nada')
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        if not options['simular']:
+            # Desactivados desde el formulario (casilla activo): el plazo corre desde ahora
+            for modelo in MODELOS:
+                marcados = modelo.todos.archivados().filter(archivado=None).update(archivado=ahora)
+                if marcados:
+                    self.stdout.write(f'  ✓ {modelo._meta.verbose_name_plural}: {marcados} desactivados marcados como archivados')
+
+            # El formulario tampoco archiva los hijos: se archivan con el instante del padre
+            for modelo in MODELOS:
+                hijos, _ = JERARQUIA_ARCHIVO[modelo.__name__]
+                if not hijos:
+                    continue
+                relacion = getattr(modelo, hijos)
+                padres = modelo.todos.archivados().filter(**{f'{hijos}__activo': True}).values_list('id', 'archivado').order_by().distinct()
+                por_instante = {}
+                for padre_id, archivado in padres:
+                    por_instante.setdefault(archivado, []).append(padre_id)
+                archivados = sum(
+                    relacion.rel.related_model.todos.filter(**{f'{relacion.field.name}__in': ids}).archivar(archivado)
+                    for archivado, ids in por_instante.items()
+                )
+                self.stdout.write(f'  ✓ {modelo._meta.verbose_name_plural}: {archivados} descendientes archivados')
+
+        limite = ahora - timedelta(days=options['dias'])
+        for modelo in MODELOS:
+            # Por la fecha de archivo: actualizado cambia con cualquier escritura posterior
+            antiguos = modelo.todos.archivados().filter(archivado__lt=limite)
+            if options['simular']:
+                self.stdout.write(f'  ✓ {modelo._meta.verbose_name_plural}: se borrarían {antiguos.count()}')
+                continue
+            # Las lápidas de sincronización y la caché se actualizan con las signals de delete
+            with transaction.atomic():
+                total, por_modelo = antiguos.delete()
+            self.stdout.write(
+                f'  ✓ {modelo._meta.verbose_name_plural}: {por_modelo.get(modelo._meta.label, 0)} borrados '
+                f'({total} filas en total)'
+            )
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Purga de archivados finalizada'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from core.models import Sucursal, VibracionesAnalisis
+from core.severidad import reclasificar_muestras, reclasificar_sucursal
+
+
+class Command(BaseCommand):
+    help = 'Reclasifica por severidad ISO 10816 las muestras de vibraciones (todas o de una sucursal)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sucursal', type=int, help='ID de la sucursal a reclasificar')
+
+    def handle(self, *args, **options):
+        if options['sucursal']:
+            sucursal = Sucursal.objects.get(id=options['sucursal'])
+            self.stdout.write(f'📍 Sucursal: {sucursal.nombre}')
+            cambios = reclasificar_sucursal(sucursal)
+        else:
+            cambios = reclasificar_muestras(VibracionesAnalisis.objects.all())
+
+        for resultado, cantidad in sorted(cambios.items()):
+            self.stdout.write(f'  ✓ {resultado}: {cantidad}')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ Se reclasificaron {sum(cambios.values())} muestras de vibraciones')
+        )
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from core.almacenamiento import campos_contenido, importar_anteriores, recolectar, recontar_referencias, GRACIA
+from core.subidas import limpiar_abandonadas
+from core.teselas import recolectar_teselas
+
+
+class Command(BaseCommand):
+    help = ('Recuenta las referencias del almacenamiento por contenido, borra los archivos sin uso, '
+            'las teselas de planos reemplazados y las subidas abandonadas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=float, default=GRACIA.total_seconds() / 3600,
+                            help='Antigüedad mínima (horas) de un archivo sin referencias para borrarlo')
+        parser.add_argument('--simular', action='store_true', help='Informa lo que se borraría sin borrar nada')
+        parser.add_argument('--importar', action='store_true',
+                            help='Pasa antes los archivos con nombres anteriores (upload_to) al almacenamiento por contenido')
+
+    def handle(self, *args, **options):
+        if options['importar'] and not options['simular']:
+            for modelo, campo in campos_contenido():
+                migradas = importar_anteriores(modelo, campo)
+                self.stdout.write(f'  ✓ {modelo.__name__}.{campo}: {migradas} archivos importados')
+
+        if not options['simular']:
+            descartadas = limpiar_abandonadas()
+            self.stdout.write(f'  ✓ {descartadas} subidas fragmentadas abandonadas descartadas')
+
+            corregidos = recontar_referencias()
+            self.stdout.write(f'  ✓ {corregidos} conteos de referencias corregidos')
+
+        gracia = timedelta(hours=options['horas'])
+        resultado = recolectar(gracia, simular=options['simular'])
+        accion = 'se borrarían' if options['simular'] else 'borrados'
+        self.stdout.write(f"  ✓ {resultado['archivos']} archivos {accion} ({resultado['bytes'] / 1024 / 1024:.1f} MB)")
+
+        piramides = recolectar_teselas(gracia, simular=options['simular'])
+        accion = 'se borrarían' if options['simular'] else 'borradas'
+        self.stdout.write(f'  ✓ {piramides} pirámides de teselas {accion}')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Recolección de media finalizada'))
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def eliminar_duplicados(apps, schema_editor):
+    """Deja una sola muestra por (activo, fecha_muestreo): la más reciente (mayor id)"""
+    VibracionesAnalisis = apps.get_model('core', 'VibracionesAnalisis')
+    duplicados = VibracionesAnalisis.objects.values(
+        'activo_id', 'fecha_muestreo'
+    ).annotate(
+        total=Count('id'),
+        ultimo_id=Max('id')
+    ).filter(total__gt=1)
+
+    for grupo in duplicados:
+        VibracionesAnalisis.objects.filter(
+            activo_id=grupo['activo_id'],
+            fecha_muestreo=grupo['fecha_muestreo']
+        ).exclude(id=grupo['ultimo_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_update_vibraciones_resultado_choices'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vibracionesanalisis',
+            constraint=models.UniqueConstraint(fields=('activo', 'fecha_muestreo'), name='vibraciones_activo_fecha_unica'),
+        ),
+    ]
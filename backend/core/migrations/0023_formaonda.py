@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_vibracionesanalisis_activo_fecha_unica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormaOnda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_captura', models.DateTimeField(help_text='Fecha y hora de la captura')),
+                ('eje', models.CharField(choices=[('horizontal', 'Horizontal'), ('vertical', 'Vertical'), ('axial', 'Axial')], default='horizontal', max_length=20)),
+                ('unidad', models.CharField(choices=[('g', 'Aceleración (g)'), ('mm_s', 'Velocidad (mm/s)'), ('um', 'Desplazamiento (µm)')], default='g', max_length=10)),
+                ('frecuencia_muestreo', models.FloatField(help_text='Frecuencia de muestreo en Hz')),
+                ('num_puntos', models.PositiveIntegerField(help_text='Cantidad de muestras de la señal')),
+                ('rpm', models.FloatField(blank=True, help_text='Velocidad de giro durante la captura (RPM)', null=True)),
+                ('archivo', models.FileField(upload_to='vibraciones/formas_onda/%Y/%m/')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('activo', models.ForeignKey(help_text='Activo medido', on_delete=django.db.models.deletion.CASCADE, related_name='formas_onda', to='core.activo')),
+                ('muestra', models.ForeignKey(blank=True, help_text='Muestra de vibraciones asociada (opcional)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='formas_onda', to='core.vibracionesanalisis')),
+            ],
+            options={
+                'verbose_name': 'Forma de Onda',
+                'verbose_name_plural': 'Formas de Onda',
+                'ordering': ['-fecha_captura'],
+                'indexes': [models.Index(fields=['activo', '-fecha_captura'], name='core_formao_activo__f49bc8_idx')],
+            },
+        ),
+    ]
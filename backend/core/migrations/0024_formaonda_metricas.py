@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_formaonda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formaonda',
+            name='metricas',
+            field=models.JSONField(blank=True, help_text='RMS, pico, factor de cresta, frecuencia dominante y bandas', null=True),
+        ),
+    ]
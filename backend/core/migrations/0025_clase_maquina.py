@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_formaonda_metricas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='clase_maquina',
+            field=models.CharField(blank=True, choices=[('clase_i', 'Clase I - Máquinas pequeñas (hasta 15 kW)'), ('clase_ii', 'Clase II - Máquinas medianas (15 a 75 kW)'), ('clase_iii', 'Clase III - Máquinas grandes, base rígida'), ('clase_iv', 'Clase IV - Máquinas grandes, base flexible')], help_text='Clase de máquina ISO 10816; si se deja vacía se usa la del equipo', max_length=20, null=True, verbose_name='Clase de máquina'),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='clase_maquina',
+            field=models.CharField(choices=[('clase_i', 'Clase I - Máquinas pequeñas (hasta 15 kW)'), ('clase_ii', 'Clase II - Máquinas medianas (15 a 75 kW)'), ('clase_iii', 'Clase III - Máquinas grandes, base rígida'), ('clase_iv', 'Clase IV - Máquinas grandes, base flexible')], default='clase_ii', help_text='Clase de máquina ISO 10816 usada para clasificar las vibraciones', max_length=20, verbose_name='Clase de máquina'),
+        ),
+    ]
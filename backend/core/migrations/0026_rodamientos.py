@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:04
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_clase_maquina'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='rpm',
+            field=models.FloatField(blank=True, help_text='Velocidad de giro nominal (RPM)', null=True, verbose_name='RPM'),
+        ),
+        migrations.CreateModel(
+            name='Rodamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('designacion', models.CharField(help_text='Designación del fabricante (ej: 6205-2RS)', max_length=50)),
+                ('ubicacion', models.CharField(choices=[('lado_acople', 'Lado acople'), ('lado_libre', 'Lado libre')], default='lado_acople', max_length=20)),
+                ('num_elementos', models.PositiveSmallIntegerField(help_text='Cantidad de elementos rodantes')),
+                ('diametro_elemento', models.FloatField(help_text='Diámetro del elemento rodante (mm)', validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('diametro_primitivo', models.FloatField(help_text='Diámetro primitivo o pitch (mm)', validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('angulo_contacto', models.FloatField(default=0, help_text='Ángulo de contacto en grados')),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rodamientos', to='core.activo')),
+            ],
+            options={
+                'verbose_name': 'Rodamiento',
+                'verbose_name_plural': 'Rodamientos',
+                'ordering': ['activo', 'ubicacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_rodamientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TendenciaActivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('vibraciones', 'Vibraciones (velocidad RMS, mm/s)'), ('termografia', 'Termografía (temperatura máxima, °C)')], max_length=20)),
+                ('num_muestras', models.PositiveIntegerField(default=0)),
+                ('primera_fecha', models.DateField()),
+                ('ultima_fecha', models.DateField()),
+                ('ultimo_valor', models.FloatField()),
+                ('valor_minimo', models.FloatField()),
+                ('valor_maximo', models.FloatField()),
+                ('ewma', models.FloatField(help_text='Promedio móvil exponencial')),
+                ('pendiente', models.FloatField(help_text='Pendiente de todo el historial (unidades por día)')),
+                ('pendiente_reciente', models.FloatField(help_text='Pendiente de las últimas muestras (unidades por día)')),
+                ('tasa_cambio', models.FloatField(blank=True, help_text='Cambio porcentual respecto de la muestra anterior', null=True)),
+                ('calculado', models.DateTimeField(auto_now=True)),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tendencias', to='core.activo')),
+            ],
+            options={
+                'verbose_name': 'Tendencia de Activo',
+                'verbose_name_plural': 'Tendencias de Activos',
+                'constraints': [models.UniqueConstraint(fields=('activo', 'tipo'), name='tendencia_activo_tipo_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_tendenciaactivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrediccionActivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('vibraciones', 'Vibraciones (velocidad RMS, mm/s)'), ('termografia', 'Termografía (temperatura máxima, °C)')], max_length=20)),
+                ('modelo', models.CharField(choices=[('lineal', 'Lineal'), ('exponencial', 'Exponencial')], max_length=20)),
+                ('num_muestras', models.PositiveIntegerField(help_text='Muestras usadas en el ajuste')),
+                ('r2', models.FloatField(help_text='Coeficiente de determinación del ajuste')),
+                ('valor_actual', models.FloatField(help_text='Valor ajustado a la fecha de la última muestra')),
+                ('umbral', models.FloatField(help_text='Umbral de alarma usado para el pronóstico')),
+                ('fecha_cruce', models.DateField(blank=True, help_text='Fecha estimada de cruce del umbral de alarma', null=True)),
+                ('dias_restantes', models.IntegerField(blank=True, help_text='Días desde la última muestra hasta el cruce', null=True)),
+                ('confianza', models.FloatField(help_text='Confianza del pronóstico (0 a 1)')),
+                ('calculado', models.DateTimeField(auto_now=True)),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predicciones', to='core.activo')),
+            ],
+            options={
+                'verbose_name': 'Predicción de Activo',
+                'verbose_name_plural': 'Predicciones de Activos',
+                'ordering': ['fecha_cruce'],
+                'indexes': [models.Index(fields=['tipo', 'fecha_cruce'], name='core_predic_tipo_4d76aa_idx')],
+                'constraints': [models.UniqueConstraint(fields=('activo', 'tipo'), name='prediccion_activo_tipo_unica')],
+            },
+        ),
+    ]
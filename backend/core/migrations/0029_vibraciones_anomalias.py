@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_prediccionactivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vibracionesanalisis',
+            name='anomalia',
+            field=models.BooleanField(default=False, help_text='La muestra se aparta del historial o de sus activos hermanos'),
+        ),
+        migrations.AddField(
+            model_name='vibracionesanalisis',
+            name='z_hermanos',
+            field=models.FloatField(blank=True, help_text='Z robusto respecto de los activos del mismo equipo en la fecha', null=True),
+        ),
+        migrations.AddField(
+            model_name='vibracionesanalisis',
+            name='z_historico',
+            field=models.FloatField(blank=True, help_text='Z robusto respecto del historial del activo', null=True),
+        ),
+    ]
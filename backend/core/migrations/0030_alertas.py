@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_vibraciones_anomalias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReglaAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200)),
+                ('tipo', models.CharField(choices=[('cambio_estado', 'Cambio de estado'), ('umbral', 'Umbral de medición'), ('pendiente', 'Pendiente de tendencia')], max_length=20)),
+                ('estado_origen', models.CharField(blank=True, choices=[('bueno', 'Bueno'), ('observacion', 'Observación'), ('alarma', 'Alarma'), ('emergencia', 'Emergencia'), ('falla', 'Falla'), ('sin_medicion', 'Sin Medición')], max_length=20)),
+                ('estado_destino', models.CharField(blank=True, choices=[('bueno', 'Bueno'), ('observacion', 'Observación'), ('alarma', 'Alarma'), ('emergencia', 'Emergencia'), ('falla', 'Falla'), ('sin_medicion', 'Sin Medición')], max_length=20)),
+                ('metrica', models.CharField(blank=True, choices=[('velocidad_rms', 'Velocidad RMS (mm/s)'), ('aceleracion', 'Aceleración (g)'), ('temperatura_maxima', 'Temperatura máxima (°C)'), ('temperatura_promedio', 'Temperatura promedio (°C)')], max_length=30)),
+                ('serie', models.CharField(blank=True, choices=[('vibraciones', 'Vibraciones (velocidad RMS, mm/s)'), ('termografia', 'Termografía (temperatura máxima, °C)')], max_length=20)),
+                ('valor', models.FloatField(blank=True, help_text='Umbral, o cambio mínimo por mes en reglas de pendiente', null=True)),
+                ('destinatarios', models.TextField(blank=True, help_text='Correos separados por coma (vacío = correo del cliente)')),
+                ('minutos_antirrebote', models.PositiveIntegerField(default=60, help_text='No se repite la alerta del mismo activo dentro de este plazo')),
+                ('activa', models.BooleanField(default=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reglas_alerta', to='core.cliente')),
+            ],
+            options={
+                'verbose_name': 'Regla de Alerta',
+                'verbose_name_plural': 'Reglas de Alerta',
+                'ordering': ['cliente', 'nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificacionAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatarios', models.TextField(help_text='Correos separados por coma')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviada', 'Enviada'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('enviar_despues', models.DateTimeField(help_text='No se entrega antes de esta fecha (agrupación y reintentos)')),
+                ('enviado', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('regla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='core.reglaalerta')),
+            ],
+            options={
+                'verbose_name': 'Notificación de Alerta',
+                'verbose_name_plural': 'Notificaciones de Alerta',
+                'ordering': ['-creado'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventoAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mensaje', models.CharField(max_length=300)),
+                ('valor', models.FloatField(blank=True, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_alerta', to='core.activo')),
+                ('notificacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos', to='core.notificacionalerta')),
+                ('regla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='core.reglaalerta')),
+            ],
+            options={
+                'verbose_name': 'Evento de Alerta',
+                'verbose_name_plural': 'Eventos de Alerta',
+                'ordering': ['-creado'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadoReglaActivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('condicion', models.BooleanField(default=False, help_text='La condición se cumplía en la última evaluación')),
+                ('ultimo_disparo', models.DateTimeField(blank=True, null=True)),
+                ('activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados_reglas', to='core.activo')),
+                ('regla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados', to='core.reglaalerta')),
+            ],
+            options={
+                'verbose_name': 'Estado de Regla por Activo',
+                'verbose_name_plural': 'Estados de Reglas por Activo',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificacionalerta',
+            index=models.Index(fields=['estado', 'enviar_despues'], name='core_notifi_estado_3fd35f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoalerta',
+            index=models.Index(fields=['activo', '-creado'], name='core_evento_activo__a96561_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='estadoreglaactivo',
+            constraint=models.UniqueConstraint(fields=('regla', 'activo'), name='estado_regla_activo_unico'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_alertas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='intervalo_muestreo_dias',
+            field=models.PositiveIntegerField(default=30, help_text='Cada cuántos días debe muestrearse el activo', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Intervalo de muestreo (días)'),
+        ),
+    ]
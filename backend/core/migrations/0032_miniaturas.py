@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_activo_intervalo_muestreo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='miniaturas',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)', null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='miniaturas',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)', null=True),
+        ),
+        migrations.AddField(
+            model_name='sucursal',
+            name='miniaturas',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)', null=True),
+        ),
+        migrations.AddField(
+            model_name='termografiaanalisis',
+            name='miniaturas',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='miniaturas',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)', null=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:24
+
+import core.almacenamiento
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activo',
+            name='foto_termica',
+            field=models.ImageField(blank=True, help_text='Foto térmica del activo', null=True, storage=core.almacenamiento.AlmacenamientoContenido(), upload_to='termografias/activos/'),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=core.almacenamiento.AlmacenamientoContenido(), upload_to='clientes/', verbose_name='Logo o icono del cliente'),
+        ),
+        migrations.AlterField(
+            model_name='sucursal',
+            name='plano_planta',
+            field=models.ImageField(blank=True, null=True, storage=core.almacenamiento.AlmacenamientoContenido(), upload_to='plantas/', verbose_name='Plano de la planta'),
+        ),
+        migrations.AlterField(
+            model_name='termografiaanalisis',
+            name='imagen_termica',
+            field=models.ImageField(blank=True, help_text='Fotografía térmica capturada', null=True, storage=core.almacenamiento.AlmacenamientoContenido(), upload_to='termografias/analisis_historico/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=core.almacenamiento.AlmacenamientoContenido(), upload_to='profile_photos/'),
+        ),
+        migrations.CreateModel(
+            name='ArchivoContenido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(help_text='sha256 del contenido', max_length=64, unique=True)),
+                ('nombre', models.CharField(help_text='Ruta dentro de MEDIA_ROOT', max_length=255)),
+                ('tamano', models.BigIntegerField(default=0, help_text='Tamaño en bytes')),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('ultimo_uso', models.DateTimeField(default=django.utils.timezone.now, help_text='Última vez que se sumó o restó una referencia')),
+            ],
+            options={
+                'verbose_name': 'Archivo por Contenido',
+                'verbose_name_plural': 'Archivos por Contenido',
+                'indexes': [models.Index(fields=['referencias', 'ultimo_uso'], name='core_archiv_referen_c19a9c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:27
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_almacenamiento_contenido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaFragmentada',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('destino', models.CharField(choices=[('foto_termica', 'Foto térmica de activo'), ('plano_planta', 'Plano de planta')], max_length=20)),
+                ('objeto_id', models.PositiveIntegerField(help_text='Activo o Sucursal de destino')),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tipo_contenido', models.CharField(max_length=100)),
+                ('tamano_total', models.BigIntegerField(help_text='Tamaño declarado en bytes')),
+                ('recibido', models.BigIntegerField(default=0, help_text='Bytes recibidos (offset del próximo fragmento)')),
+                ('parametros', models.JSONField(blank=True, default=dict, help_text='Opciones del destino (p. ej. nueva_muestra)')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_fragmentadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida Fragmentada',
+                'verbose_name_plural': 'Subidas Fragmentadas',
+                'indexes': [models.Index(fields=['actualizado'], name='core_subida_actuali_f0ce48_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:34
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_subidafragmentada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sucursal',
+            name='teselas',
+            field=models.JSONField(blank=True, editable=False, help_text='Pirámide de teselas del plano (core.teselas)', null=True),
+        ),
+        migrations.CreateModel(
+            name='PuntoPlano',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('x', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('y', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('activo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='punto_plano', to='core.activo')),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntos_plano', to='core.sucursal')),
+            ],
+            options={
+                'verbose_name': 'Punto del Plano',
+                'verbose_name_plural': 'Puntos del Plano',
+            },
+        ),
+    ]
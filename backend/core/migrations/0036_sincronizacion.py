@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_plano_teselas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recurso', models.CharField(help_text='Recurso de la API (clientes, activos, ...)', max_length=30)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('eliminado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['actualizado', 'id'], name='core_activo_actuali_cc1928_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='termografiaanalisis',
+            index=models.Index(fields=['actualizado', 'id'], name='core_termog_actuali_479e09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vibracionesanalisis',
+            index=models.Index(fields=['actualizado', 'id'], name='core_vibrac_actuali_6256a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eliminacion',
+            index=models.Index(fields=['eliminado', 'id'], name='core_elimin_elimina_60d019_idx'),
+        ),
+    ]
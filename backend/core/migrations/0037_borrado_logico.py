@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:55
+
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='activo',
+            options={'default_manager_name': 'todos', 'ordering': ['-creado'], 'verbose_name': 'Activo', 'verbose_name_plural': 'Activos'},
+        ),
+        migrations.AlterModelOptions(
+            name='area',
+            options={'default_manager_name': 'todos', 'ordering': ['nombre'], 'verbose_name': 'Área', 'verbose_name_plural': 'Áreas'},
+        ),
+        migrations.AlterModelOptions(
+            name='cliente',
+            options={'default_manager_name': 'todos', 'ordering': ['-creado'], 'verbose_name': 'Cliente', 'verbose_name_plural': 'Clientes'},
+        ),
+        migrations.AlterModelOptions(
+            name='equipo',
+            options={'default_manager_name': 'todos', 'ordering': ['-creado'], 'verbose_name': 'Equipo', 'verbose_name_plural': 'Equipos'},
+        ),
+        migrations.AlterModelOptions(
+            name='sucursal',
+            options={'default_manager_name': 'todos', 'ordering': ['-creado'], 'verbose_name': 'Sucursal', 'verbose_name_plural': 'Sucursales'},
+        ),
+        migrations.AlterModelManagers(
+            name='activo',
+            managers=[
+                ('todos', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='area',
+            managers=[
+                ('todos', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='cliente',
+            managers=[
+                ('todos', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='equipo',
+            managers=[
+                ('todos', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='sucursal',
+            managers=[
+                ('todos', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['equipo', 'activo', 'nombre'], name='core_activo_equipo__57d9c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='area',
+            index=models.Index(fields=['sucursal', 'activo', 'nombre'], name='core_area_sucursa_248cc2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', '-creado'], name='core_client_activo_54a9b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipo',
+            index=models.Index(fields=['area', 'activo', 'nombre'], name='core_equipo_area_id_8f63a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sucursal',
+            index=models.Index(fields=['cliente', 'activo', 'nombre'], name='core_sucurs_cliente_654b10_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_borrado_logico'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacionalerta',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviada', 'Enviada'), ('error', 'Error')], default='pendiente', max_length=20),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def marcar_archivados(apps, schema_editor):
+    """Los ya archivados toman como fecha de archivo su última actualización"""
+    for nombre in ('Cliente', 'Sucursal', 'Area', 'Equipo', 'Activo'):
+        apps.get_model('core', nombre)._base_manager.filter(activo=False).update(archivado=F('actualizado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_notificacion_enviando'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activo',
+            name='archivado',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se archivó (borrado lógico)', null=True),
+        ),
+        migrations.AddField(
+            model_name='area',
+            name='archivado',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se archivó (borrado lógico)', null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='archivado',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se archivó (borrado lógico)', null=True),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='archivado',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se archivó (borrado lógico)', null=True),
+        ),
+        migrations.AddField(
+            model_name='sucursal',
+            name='archivado',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Cuándo se archivó (borrado lógico)', null=True),
+        ),
+        migrations.RunPython(marcar_archivados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,185 @@
+"""
+Miniaturas de imágenes (fotos térmicas, logos, planos y fotos de perfil)
+Al guardar un modelo cuya imagen cambió se encola, tras el commit, la
+generación de versiones WebP y JPEG en los anchos de ANCHOS en un pool de
+hilos, para no demorar la subida. Los archivos quedan junto al original:
+
+    termografias/activos/foto.<hash>.<ancho>.webp
+
+El hash es del contenido del original, así cada imagen nueva tiene URLs nuevas
+y los navegadores pueden cachearlas indefinidamente. Las rutas se guardan en el
+campo `miniaturas` del modelo; mientras no existan, las plantillas usan el
+original (ver templatetags/imagenes.py).
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .almacenamiento import hash_nombre
+
+logger = logging.getLogger(__name__)
+
+
+# Anchos máximos generados (px); la imagen nunca se agranda
+ANCHOS = (160, 640, 1280)
+
+# Formato → (formato PIL, extensión, opciones de guardado)
+FORMATOS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_pool = None
+_en_curso = {}
+_lock = threading.Lock()
+
+
+def pool():
+    """Pool de hilos compartido (MINIATURAS_WORKERS hilos, 2 por defecto)"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'MINIATURAS_WORKERS', 2),
+            thread_name_prefix='miniaturas'
+        )
+    return _pool
+
+
+def ancho_rendicion(ancho):
+    """Menor ancho generado que cubre el solicitado"""
+    return next((a for a in ANCHOS if a >= ancho), ANCHOS[-1])
+
+
+def url_miniatura(archivo, ancho, formato='webp'):
+    """URL de la miniatura de un FieldFile o, si aún no existe, la del original"""
+    if not archivo:
+        return ''
+    miniaturas = getattr(archivo.instance, 'miniaturas', None) or {}
+    if miniaturas.get('original') == archivo.name:
+        nombre = miniaturas.get(formato, {}).get(str(ancho_rendicion(ancho)))
+        if nombre:
+            return default_storage.url(nombre)
+    return archivo.url
+
+
+def nombres_miniaturas(miniaturas):
+    return {nombre for formato in FORMATOS for nombre in (miniaturas or {}).get(formato, {}).values()}
+
+
+def eliminar_miniaturas(miniaturas, conservar=()):
+    if hash_nombre((miniaturas or {}).get('original')):
+        # Las miniaturas de un archivo por contenido las comparten todas las filas
+        # que lo usan; se borran junto con el archivo (recolectar_media)
+        return
+    for nombre in nombres_miniaturas(miniaturas) - set(conservar):
+        default_storage.delete(nombre)
+
+
+def renderizar(contenido, base):
+    """Genera y guarda las miniaturas de una imagen. Retorna {formato: {ancho: nombre}}"""
+    digest = hashlib.sha1(contenido).hexdigest()[:12]
+    imagen = ImageOps.exif_transpose(Image.open(BytesIO(contenido)))
+
+    resultado = {formato: {} for formato in FORMATOS}
+    for ancho in ANCHOS:
+        copia = imagen.copy()
+        copia.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+        for formato, (formato_pil, extension, opciones) in FORMATOS.items():
+            nombre = f'{base}.{digest}.{ancho}.{extension}'
+            if not default_storage.exists(nombre):
+                salida = copia
+                if formato_pil == 'JPEG' and salida.mode != 'RGB':
+                    # JPEG no tiene transparencia: se aplana sobre blanco
+                    fondo = Image.new('RGB', salida.size, 'white')
+                    rgba = salida.convert('RGBA')
+                    fondo.paste(rgba, mask=rgba.split()[-1])
+                    salida = fondo
+                buffer = BytesIO()
+                salida.save(buffer, formato_pil, **opciones)
+                guardado = default_storage.save(nombre, ContentFile(buffer.getvalue()))
+                if guardado != nombre:
+                    # Otra tarea escribió el mismo archivo entretanto (mismo hash, mismo contenido)
+                    default_storage.delete(guardado)
+            resultado[formato][str(ancho)] = nombre
+    return resultado
+
+
+def generar_miniaturas(modelo, pk, campo):
+    """
+    Genera las miniaturas de la imagen actual de una fila y las registra.
+    Si la imagen cambió mientras tanto no se registra nada (lo hará la tarea nueva).
+    """
+    instancia = modelo._default_manager.filter(pk=pk).only('pk', campo, 'miniaturas').first()
+    if instancia is None:
+        return None
+    archivo = getattr(instancia, campo)
+    anteriores = instancia.miniaturas or {}
+
+    if not archivo:
+        if anteriores:
+            modelo._default_manager.filter(pk=pk).update(miniaturas=None, actualizado=timezone.now())
+            eliminar_miniaturas(anteriores)
+        return None
+    if anteriores.get('original') == archivo.name:
+        return anteriores
+
+    with archivo.open('rb') as f:
+        contenido = f.read()
+    miniaturas = {'original': archivo.name, **renderizar(contenido, os.path.splitext(archivo.name)[0])}
+
+    # actualizado: las URLs de las miniaturas cambian para la API y la sincronización
+    if modelo._default_manager.filter(pk=pk, **{campo: archivo.name}).update(miniaturas=miniaturas, actualizado=timezone.now()):
+        eliminar_miniaturas(anteriores, conservar=nombres_miniaturas(miniaturas))
+    return miniaturas
+
+
+def _tarea(funcion, *args):
+    clave = (funcion, args)
+    try:
+        while True:
+            try:
+                funcion(*args)
+            except Exception:
+                logger.exception('Error en %s%r', funcion.__name__, args)
+            with _lock:
+                # Si la fila se volvió a guardar mientras se procesaba, se repite
+                if not _en_curso.pop(clave):
+                    break
+                _en_curso[clave] = False
+    finally:
+        # Cada hilo del pool tiene su propia conexión
+        connection.close()
+
+
+def encolar(funcion, *args):
+    """
+    Ejecuta funcion(*args) en el pool. Varios guardados seguidos de la misma fila
+    generan una sola tarea a la vez (y una repetición si llegan durante la tarea).
+    """
+    clave = (funcion, args)
+    with _lock:
+        if clave in _en_curso:
+            _en_curso[clave] = True
+            return
+        _en_curso[clave] = False
+    pool().submit(_tarea, funcion, *args)
+
+
+def programar_miniaturas(instancia, campo):
+    """Encola la generación si la imagen de la instancia no coincide con sus miniaturas"""
+    archivo = getattr(instancia, campo)
+    original = (instancia.miniaturas or {}).get('original')
+    if (archivo.name or None) == original or (not archivo and not instancia.miniaturas):
+        return
+    modelo, pk = type(instancia), instancia.pk
+    transaction.on_commit(lambda: encolar(generar_miniaturas, modelo, pk, campo))
@@ -1,15 +1,134 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.core.validators import MinValueValidator
-from django.db.models.signals import post_save
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from datetime import datetime
+import math
+import uuid
+
+from .almacenamiento import almacenamiento_contenido
+
+
+# ============================================================================
+# BORRADO LÓGICO
+# ============================================================================
+# Cliente, Sucursal, Area, Equipo y Activo no se borran desde la aplicación:
+# se archivan (activo=False) junto con sus descendientes. Model.objects
+# entrega solo los vigentes; Model.todos incluye los archivados y es el
+# manager por defecto (admin, get_object_or_404, relaciones, formularios).
+# Los archivados antiguos se borran con el comando purgar_archivados.
+
+# Jerarquía del borrado lógico: modelo → (relación con los hijos, ruta a la sucursal)
+JERARQUIA_ARCHIVO = {
+    'Cliente': ('sucursales', 'sucursales__'),
+    'Sucursal': ('areas', ''),
+    'Area': ('equipos', 'sucursal__'),
+    'Equipo': ('activos', 'area__sucursal__'),
+    'Activo': (None, 'equipo__area__sucursal__'),
+}
+
+
+class ArchivableQuerySet(models.QuerySet):
+    """Consultas de los modelos con borrado lógico (campos activo y archivado)"""
+
+    def vigentes(self):
+        return self.filter(activo=True)
+
+    def archivados(self):
+        return self.filter(activo=False)
+
+    def archivar(self, instante=None):
+        """
+        Archiva los objetos y sus descendientes vigentes, marcándolos con el
+        mismo instante de archivo. Retorna cuántas filas cambiaron.
+        """
+        return self._marcar(False, instante or timezone.now())
+
+    def restaurar(self):
+        """
+        Restaura los objetos y los descendientes archivados junto con ellos (mismo
+        instante); los que se eliminaron antes por separado siguen archivados.
+        """
+        return self._marcar(True)
+
+    def _marcar(self, activo, instante=None):
+        from .cache_sucursal import invalidar_cliente, invalidar_sucursal
+
+        filas = self.model._default_manager.filter(id__in=list(self.values_list('id', flat=True)))
+        cambiar = filas.exclude(activo=activo)
+        ids = list(cambiar.values_list('id', flat=True))
+        por_instante = {}
+        if activo:
+            for objeto_id, archivado in cambiar.values_list('id', 'archivado'):
+                if archivado is not None:
+                    por_instante.setdefault(archivado, []).append(objeto_id)
+        hijos, ruta = JERARQUIA_ARCHIVO[self.model.__name__]
+        for sucursal_id, cliente_id in set(filas.values_list(f'{ruta}id', f'{ruta}cliente_id')):
+            invalidar_sucursal(sucursal_id)
+            invalidar_cliente(cliente_id)
+        # update no envía signals: se invalidan las cachés a mano (actualizado
+        # va explícito porque la sincronización lo usa)
+        cambiadas = cambiar.update(activo=activo, archivado=None if activo else instante, actualizado=timezone.now())
+
+        if hijos:
+            relacion = getattr(self.model, hijos)
+            hijos = relacion.rel.related_model._default_manager
+            campo = relacion.field.name
+            if activo and por_instante:
+                condicion = models.Q()
+                for archivado, padres in por_instante.items():
+                    condicion |= models.Q(**{f'{campo}__in': padres, 'archivado': archivado})
+                cambiadas += hijos.filter(condicion)._marcar(True)
+            elif not activo and ids:
+                cambiadas += hijos.filter(**{f'{campo}__in': ids})._marcar(False, instante)
+        return cambiadas
+
+
+class VigentesManager(models.Manager.from_queryset(ArchivableQuerySet)):
+    """Manager que entrega solo los objetos vigentes (activo=True)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
+class Archivable:
+    """Borrado lógico de una instancia (ver ArchivableQuerySet)"""
+
+    def archivar(self):
+        type(self).todos.filter(pk=self.pk).archivar()
+        self.activo = False
+
+    def restaurar(self):
+        type(self).todos.filter(pk=self.pk).restaurar()
+        self.activo = True
+
+    def reutilizar_archivado(self, *campos):
+        """
+        Si hay un objeto archivado con los mismos valores únicos (`campos`), este
+        objeto nuevo toma su lugar: al guardar se actualiza esa fila en vez de
+        fallar por la restricción única. Sus descendientes siguen archivados.
+        """
+        archivado = type(self).todos.archivados().filter(
+            **{campo: getattr(self, campo) for campo in campos}
+        ).first()
+        if archivado is not None:
+            self.pk = archivado.pk
+            self.creado = archivado.creado
+            self.archivado = None
+            self._state.adding = False
+            self.al_reutilizar(archivado)
+
+    def al_reutilizar(self, archivado):
+        """Extensión: qué más vuelve con un objeto reutilizado (por defecto nada)"""
 
 
 class UserProfile(models.Model):
     """Modelo para extender el perfil del usuario"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
-    photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
+    photo = models.ImageField(upload_to='profile_photos/', storage=almacenamiento_contenido, blank=True, null=True)
+    miniaturas = models.JSONField(blank=True, null=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)')
     bio = models.TextField(blank=True, null=True)
     
     # Timestamps
@@ -28,7 +147,7 @@ def crear_perfil_usuario(sender, instance, created, **kwargs):
         UserProfile.objects.get_or_create(user=instance)
 
 
-class Cliente(models.Model):
+class Cliente(Archivable, models.Model):
     """Modelo para clientes/empresas"""
     nombre = models.CharField(max_length=200, unique=True)
     descripcion = models.TextField(blank=True, null=True)
@@ -50,7 +169,8 @@ class Cliente(models.Model):
     empleados = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(1)])
     
     # Imagen/Icono del cliente
-    logo = models.ImageField(upload_to='clientes/', blank=True, null=True, verbose_name='Logo o icono del cliente')
+    logo = models.ImageField(upload_to='clientes/', storage=almacenamiento_contenido, blank=True, null=True, verbose_name='Logo o icono del cliente')
+    miniaturas = models.JSONField(blank=True, null=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)')
     
     # Timestamps
     creado = models.DateTimeField(auto_now_add=True)
@@ -58,17 +178,25 @@ class Cliente(models.Model):
     
     # Estado
     activo = models.BooleanField(default=True)
+    archivado = models.DateTimeField(blank=True, null=True, editable=False, help_text='Cuándo se archivó (borrado lógico)')
+    
+    objects = VigentesManager()
+    todos = ArchivableQuerySet.as_manager()
     
     class Meta:
         ordering = ['-creado']
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        default_manager_name = 'todos'
+        indexes = [
+            models.Index(fields=['activo', '-creado']),
+        ]
     
     def __str__(self):
         return self.nombre
 
 
-class Sucursal(models.Model):
+class Sucursal(Archivable, models.Model):
     """Modelo para sucursales/ubicaciones de clientes"""
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='sucursales')
     nombre = models.CharField(max_length=200)
@@ -86,7 +214,9 @@ class Sucursal(models.Model):
     contacto_telefono = models.CharField(max_length=20, blank=True)
     
     # Plano o imagen de la planta
-    plano_planta = models.ImageField(upload_to='plantas/', blank=True, null=True, verbose_name='Plano de la planta')
+    plano_planta = models.ImageField(upload_to='plantas/', storage=almacenamiento_contenido, blank=True, null=True, verbose_name='Plano de la planta')
+    miniaturas = models.JSONField(blank=True, null=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)')
+    teselas = models.JSONField(blank=True, null=True, editable=False, help_text='Pirámide de teselas del plano (core.teselas)')
     
     # Timestamps
     creado = models.DateTimeField(auto_now_add=True)
@@ -94,18 +224,32 @@ class Sucursal(models.Model):
     
     # Estado
     activo = models.BooleanField(default=True)
+    archivado = models.DateTimeField(blank=True, null=True, editable=False, help_text='Cuándo se archivó (borrado lógico)')
+    
+    objects = VigentesManager()
+    todos = ArchivableQuerySet.as_manager()
     
     class Meta:
         ordering = ['-creado']
         verbose_name = 'Sucursal'
         verbose_name_plural = 'Sucursales'
         unique_together = ('cliente', 'nombre')
+        default_manager_name = 'todos'
+        indexes = [
+            models.Index(fields=['cliente', 'activo', 'nombre']),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.cliente.nombre}"
+    
+    def al_reutilizar(self, archivado):
+        # Las áreas fijas archivadas junto con la sucursal vuelven vacías (sin sus equipos)
+        Area.todos.filter(sucursal_id=archivado.pk, activo=False, archivado=archivado.archivado).update(
+            activo=True, archivado=None, actualizado=timezone.now()
+        )
 
 
-class Area(models.Model):
+class Area(Archivable, models.Model):
     """Modelo para áreas dentro de una sucursal"""
     AREA_CHOICES = [
         ('aserradero', 'Aserradero'),
@@ -123,12 +267,20 @@ class Area(models.Model):
     
     # Estado
     activo = models.BooleanField(default=True)
+    archivado = models.DateTimeField(blank=True, null=True, editable=False, help_text='Cuándo se archivó (borrado lógico)')
+    
+    objects = VigentesManager()
+    todos = ArchivableQuerySet.as_manager()
     
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Área'
         verbose_name_plural = 'Áreas'
         unique_together = ('sucursal', 'nombre')
+        default_manager_name = 'todos'
+        indexes = [
+            models.Index(fields=['sucursal', 'activo', 'nombre']),
+        ]
     
     def __str__(self):
         return f"{self.get_nombre_display()} - {self.sucursal.nombre}"
@@ -146,14 +298,14 @@ def crear_areas_sucursal(sender, instance, created, **kwargs):
         ]
         
         for area_nombre, area_label in areas_predefinidas:
-            Area.objects.get_or_create(
+            Area.todos.get_or_create(
                 sucursal=instance,
                 nombre=area_nombre,
                 defaults={'descripcion': f'Área de {area_label}'}
             )
 
 
-class Equipo(models.Model):
+class Equipo(Archivable, models.Model):
     """Modelo para equipos/máquinas dentro de un área"""
     
     # Estados del equipo
@@ -165,6 +317,14 @@ class Equipo(models.Model):
         ('sin_medicion', 'Sin Medición'),
     ]
     
+    # Clases de máquina ISO 10816-1 (definen los límites de severidad de vibraciones)
+    CLASE_MAQUINA_CHOICES = [
+        ('clase_i', 'Clase I - Máquinas pequeñas (hasta 15 kW)'),
+        ('clase_ii', 'Clase II - Máquinas medianas (15 a 75 kW)'),
+        ('clase_iii', 'Clase III - Máquinas grandes, base rígida'),
+        ('clase_iv', 'Clase IV - Máquinas grandes, base flexible'),
+    ]
+    
     area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='equipos')
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True, null=True)
@@ -178,24 +338,41 @@ class Equipo(models.Model):
         help_text='Estado actual del equipo basado en mediciones'
     )
     
+    # Severidad de vibraciones
+    clase_maquina = models.CharField(
+        max_length=20,
+        choices=CLASE_MAQUINA_CHOICES,
+        default='clase_ii',
+        verbose_name='Clase de máquina',
+        help_text='Clase de máquina ISO 10816 usada para clasificar las vibraciones'
+    )
+    
     # Timestamps
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
     
     # Estado de actividad
     activo = models.BooleanField(default=True)
+    archivado = models.DateTimeField(blank=True, null=True, editable=False, help_text='Cuándo se archivó (borrado lógico)')
+    
+    objects = VigentesManager()
+    todos = ArchivableQuerySet.as_manager()
     
     class Meta:
         ordering = ['-creado']
         verbose_name = 'Equipo'
         verbose_name_plural = 'Equipos'
         unique_together = ('area', 'nombre')
+        default_manager_name = 'todos'
+        indexes = [
+            models.Index(fields=['area', 'activo', 'nombre']),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.area.get_nombre_display()}"
 
 
-class Activo(models.Model):
+class Activo(Archivable, models.Model):
     """Modelo para activos/componentes dentro de un equipo"""
     
     # Estados del activo
@@ -214,7 +391,8 @@ class Activo(models.Model):
     observaciones = models.CharField(max_length=500, default='Sin Observaciones', blank=True, null=True, help_text='Potencia, RPM, Voltaje, Fases, etc. (máx 500 caracteres)')
     
     # Foto térmica (solo para activos en termografías)
-    foto_termica = models.ImageField(upload_to='termografias/activos/', blank=True, null=True, help_text='Foto térmica del activo')
+    foto_termica = models.ImageField(upload_to='termografias/activos/', storage=almacenamiento_contenido, blank=True, null=True, help_text='Foto térmica del activo')
+    miniaturas = models.JSONField(blank=True, null=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)')
     
     # Estado
     estado = models.CharField(
@@ -224,22 +402,93 @@ class Activo(models.Model):
         help_text='Estado actual del activo basado en mediciones'
     )
     
+    # Severidad de vibraciones (vacío = la clase del equipo)
+    clase_maquina = models.CharField(
+        max_length=20,
+        choices=Equipo.CLASE_MAQUINA_CHOICES,
+        blank=True,
+        null=True,
+        verbose_name='Clase de máquina',
+        help_text='Clase de máquina ISO 10816; si se deja vacía se usa la del equipo'
+    )
+    rpm = models.FloatField(blank=True, null=True, verbose_name='RPM', help_text='Velocidad de giro nominal (RPM)')
+    
+    # Ruta de muestreo (core.rutas)
+    intervalo_muestreo_dias = models.PositiveIntegerField(
+        default=30,
+        validators=[MinValueValidator(1)],
+        verbose_name='Intervalo de muestreo (días)',
+        help_text='Cada cuántos días debe muestrearse el activo'
+    )
+    
     # Timestamps
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
     
     # Estado de actividad
     activo = models.BooleanField(default=True)
+    archivado = models.DateTimeField(blank=True, null=True, editable=False, help_text='Cuándo se archivó (borrado lógico)')
+    
+    objects = VigentesManager()
+    todos = ArchivableQuerySet.as_manager()
     
     class Meta:
         ordering = ['-creado']
         verbose_name = 'Activo'
         verbose_name_plural = 'Activos'
+        default_manager_name = 'todos'
+        indexes = [
+            models.Index(fields=['equipo', 'activo', 'nombre']),
+            # Sincronización incremental (core.sincronizacion)
+            models.Index(fields=['actualizado', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.equipo.nombre}"
 
 
+class Rodamiento(models.Model):
+    """Geometría de un rodamiento de un activo (para frecuencias de falla)"""
+    
+    UBICACION_CHOICES = [
+        ('lado_acople', 'Lado acople'),
+        ('lado_libre', 'Lado libre'),
+    ]
+    
+    activo = models.ForeignKey(Activo, on_delete=models.CASCADE, related_name='rodamientos')
+    designacion = models.CharField(max_length=50, help_text='Designación del fabricante (ej: 6205-2RS)')
+    ubicacion = models.CharField(max_length=20, choices=UBICACION_CHOICES, default='lado_acople')
+    
+    # Geometría
+    num_elementos = models.PositiveSmallIntegerField(help_text='Cantidad de elementos rodantes')
+    diametro_elemento = models.FloatField(validators=[MinValueValidator(0.01)], help_text='Diámetro del elemento rodante (mm)')
+    diametro_primitivo = models.FloatField(validators=[MinValueValidator(0.01)], help_text='Diámetro primitivo o pitch (mm)')
+    angulo_contacto = models.FloatField(default=0, help_text='Ángulo de contacto en grados')
+    
+    class Meta:
+        ordering = ['activo', 'ubicacion']
+        verbose_name = 'Rodamiento'
+        verbose_name_plural = 'Rodamientos'
+    
+    def __str__(self):
+        return f"{self.designacion} ({self.get_ubicacion_display()}) - {self.activo.nombre}"
+    
+    def ordenes_falla(self):
+        """Frecuencias de falla en múltiplos de la velocidad de giro (órdenes)"""
+        razon = self.diametro_elemento / self.diametro_primitivo * math.cos(math.radians(self.angulo_contacto))
+        return {
+            'FTF': 0.5 * (1 - razon),
+            'BPFO': self.num_elementos / 2 * (1 - razon),
+            'BPFI': self.num_elementos / 2 * (1 + razon),
+            'BSF': self.diametro_primitivo / (2 * self.diametro_elemento) * (1 - razon ** 2),
+        }
+    
+    def frecuencias_falla(self, rpm):
+        """Frecuencias de falla en Hz para una velocidad de giro en RPM"""
+        giro = rpm / 60.0
+        return {nombre: orden * giro for nombre, orden in self.ordenes_falla().items()}
+
+
 class AnalisisTermico(models.Model):
     """Modelo para guardar análisis de imágenes térmicas"""
     
@@ -368,10 +617,12 @@ class TermografiaAnalisis(models.Model):
     # Imagen térmica
     imagen_termica = models.ImageField(
         upload_to='termografias/analisis_historico/',
+        storage=almacenamiento_contenido,
         blank=True,
         null=True,
         help_text='Fotografía térmica capturada'
     )
+    miniaturas = models.JSONField(blank=True, null=True, editable=False, help_text='Miniaturas WebP/JPEG (core.miniaturas)')
     
     # Resultado del análisis
     resultado = models.CharField(
@@ -397,6 +648,7 @@ class TermografiaAnalisis(models.Model):
         verbose_name = 'Análisis de Termografía'
         verbose_name_plural = 'Análisis de Termografía'
         indexes = [
+            models.Index(fields=['actualizado', 'id']),
             models.Index(fields=['-fecha_muestreo']),
             models.Index(fields=['activo', '-fecha_muestreo']),
         ]
@@ -450,6 +702,11 @@ class VibracionesAnalisis(models.Model):
         help_text='Observaciones adicionales del análisis'
     )
     
+    # Detección de anomalías (core.anomalias): z-score robusto de la velocidad RMS
+    z_historico = models.FloatField(blank=True, null=True, help_text='Z robusto respecto del historial del activo')
+    z_hermanos = models.FloatField(blank=True, null=True, help_text='Z robusto respecto de los activos del mismo equipo en la fecha')
+    anomalia = models.BooleanField(default=False, help_text='La muestra se aparta del historial o de sus activos hermanos')
+    
     # Metadata
     creado = models.DateTimeField(auto_now_add=True)
     actualizado = models.DateTimeField(auto_now=True)
@@ -459,10 +716,606 @@ class VibracionesAnalisis(models.Model):
         verbose_name = 'Análisis de Vibraciones'
         verbose_name_plural = 'Análisis de Vibraciones'
         indexes = [
+            models.Index(fields=['actualizado', 'id']),
             models.Index(fields=['-fecha_muestreo']),
             models.Index(fields=['activo', '-fecha_muestreo']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['activo', 'fecha_muestreo'],
+                name='vibraciones_activo_fecha_unica'
+            ),
+        ]
     
     def __str__(self):
         return f"Vibraciones - {self.activo.nombre} ({self.fecha_muestreo})"
 
+
+
+class TendenciaActivo(models.Model):
+    """
+    Resumen de tendencia por activo y tipo de medición (calculado por core.tendencias).
+    Las vistas de histórico y dashboard lo leen sin recalcular sobre el historial.
+    """
+    
+    TIPO_CHOICES = [
+        ('vibraciones', 'Vibraciones (velocidad RMS, mm/s)'),
+        ('termografia', 'Termografía (temperatura máxima, °C)'),
+    ]
+    
+    activo = models.ForeignKey(Activo, on_delete=models.CASCADE, related_name='tendencias')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    
+    # Historial resumido
+    num_muestras = models.PositiveIntegerField(default=0)
+    primera_fecha = models.DateField()
+    ultima_fecha = models.DateField()
+    ultimo_valor = models.FloatField()
+    valor_minimo = models.FloatField()
+    valor_maximo = models.FloatField()
+    
+    # Tendencia
+    ewma = models.FloatField(help_text='Promedio móvil exponencial')
+    pendiente = models.FloatField(help_text='Pendiente de todo el historial (unidades por día)')
+    pendiente_reciente = models.FloatField(help_text='Pendiente de las últimas muestras (unidades por día)')
+    tasa_cambio = models.FloatField(blank=True, null=True, help_text='Cambio porcentual respecto de la muestra anterior')
+    
+    calculado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Tendencia de Activo'
+        verbose_name_plural = 'Tendencias de Activos'
+        constraints = [
+            models.UniqueConstraint(fields=['activo', 'tipo'], name='tendencia_activo_tipo_unica'),
+        ]
+    
+    def __str__(self):
+        return f"Tendencia {self.get_tipo_display()} - {self.activo.nombre}"
+    
+    @property
+    def cambio_mensual(self):
+        """Cambio esperado en 30 días según la pendiente reciente"""
+        return self.pendiente_reciente * 30
+    
+    @property
+    def direccion(self):
+        """'subiendo', 'bajando' o 'estable' (cambio mensual mayor al 10% del promedio)"""
+        umbral = 0.1 * abs(self.ewma) if self.ewma else 0
+        if self.cambio_mensual > umbral:
+            return 'subiendo'
+        if self.cambio_mensual < -umbral:
+            return 'bajando'
+        return 'estable'
+
+
+class PrediccionActivo(models.Model):
+    """
+    Pronóstico de vida útil remanente por activo y tipo de medición (core.prediccion):
+    fecha estimada en que la serie cruzará el umbral de alarma.
+    """
+    
+    MODELO_CHOICES = [
+        ('lineal', 'Lineal'),
+        ('exponencial', 'Exponencial'),
+    ]
+    
+    activo = models.ForeignKey(Activo, on_delete=models.CASCADE, related_name='predicciones')
+    tipo = models.CharField(max_length=20, choices=TendenciaActivo.TIPO_CHOICES)
+    
+    # Modelo de degradación ajustado
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES)
+    num_muestras = models.PositiveIntegerField(help_text='Muestras usadas en el ajuste')
+    r2 = models.FloatField(help_text='Coeficiente de determinación del ajuste')
+    valor_actual = models.FloatField(help_text='Valor ajustado a la fecha de la última muestra')
+    umbral = models.FloatField(help_text='Umbral de alarma usado para el pronóstico')
+    
+    # Pronóstico (vacío = no se proyecta cruce dentro del horizonte)
+    fecha_cruce = models.DateField(blank=True, null=True, help_text='Fecha estimada de cruce del umbral de alarma')
+    dias_restantes = models.IntegerField(blank=True, null=True, help_text='Días desde la última muestra hasta el cruce')
+    confianza = models.FloatField(help_text='Confianza del pronóstico (0 a 1)')
+    
+    calculado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['fecha_cruce']
+        verbose_name = 'Predicción de Activo'
+        verbose_name_plural = 'Predicciones de Activos'
+        constraints = [
+            models.UniqueConstraint(fields=['activo', 'tipo'], name='prediccion_activo_tipo_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['tipo', 'fecha_cruce']),
+        ]
+    
+    def __str__(self):
+        return f"Predicción {self.get_tipo_display()} - {self.activo.nombre} ({self.fecha_cruce or 'sin cruce'})"
+
+
+class FormaOnda(models.Model):
+    """
+    Forma de onda (señal en el tiempo) capturada por un colector de vibraciones.
+    La metadata vive en la base de datos y las muestras en un archivo .npy float32
+    bajo MEDIA_ROOT, que se abre con memory-map (ver core.formas_onda).
+    """
+    
+    EJE_CHOICES = [
+        ('horizontal', 'Horizontal'),
+        ('vertical', 'Vertical'),
+        ('axial', 'Axial'),
+    ]
+    
+    UNIDAD_CHOICES = [
+        ('g', 'Aceleración (g)'),
+        ('mm_s', 'Velocidad (mm/s)'),
+        ('um', 'Desplazamiento (µm)'),
+    ]
+    
+    activo = models.ForeignKey(
+        Activo,
+        on_delete=models.CASCADE,
+        related_name='formas_onda',
+        help_text='Activo medido'
+    )
+    muestra = models.ForeignKey(
+        VibracionesAnalisis,
+        on_delete=models.SET_NULL,
+        related_name='formas_onda',
+        blank=True,
+        null=True,
+        help_text='Muestra de vibraciones asociada (opcional)'
+    )
+    
+    # Captura
+    fecha_captura = models.DateTimeField(help_text='Fecha y hora de la captura')
+    eje = models.CharField(max_length=20, choices=EJE_CHOICES, default='horizontal')
+    unidad = models.CharField(max_length=10, choices=UNIDAD_CHOICES, default='g')
+    frecuencia_muestreo = models.FloatField(help_text='Frecuencia de muestreo en Hz')
+    num_puntos = models.PositiveIntegerField(help_text='Cantidad de muestras de la señal')
+    rpm = models.FloatField(blank=True, null=True, help_text='Velocidad de giro durante la captura (RPM)')
+    
+    # Señal (float32, formato .npy)
+    archivo = models.FileField(upload_to='vibraciones/formas_onda/%Y/%m/')
+    
+    # Métricas calculadas por el motor de espectro (core.espectro)
+    metricas = models.JSONField(blank=True, null=True, help_text='RMS, pico, factor de cresta, frecuencia dominante y bandas')
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-fecha_captura']
+        verbose_name = 'Forma de Onda'
+        verbose_name_plural = 'Formas de Onda'
+        indexes = [
+            models.Index(fields=['activo', '-fecha_captura']),
+        ]
+    
+    def __str__(self):
+        return f"Forma de onda - {self.activo.nombre} ({self.fecha_captura:%Y-%m-%d %H:%M}, {self.eje})"
+    
+    @property
+    def duracion(self):
+        """Duración de la captura en segundos"""
+        return self.num_puntos / self.frecuencia_muestreo if self.frecuencia_muestreo else 0
+
+
+# Elimina el archivo .npy al borrar la forma de onda
+@receiver(post_delete, sender=FormaOnda)
+def eliminar_archivo_forma_onda(sender, instance, **kwargs):
+    if instance.archivo:
+        instance.archivo.delete(save=False)
+
+
+# ============================================================================
+# ALERTAS
+# ============================================================================
+
+class ReglaAlerta(models.Model):
+    """
+    Regla de alerta configurable por cliente. Se evalúa al escribir mediciones
+    o estados de un activo (core.alertas), sin recorrer el historial.
+    """
+    
+    TIPO_CHOICES = [
+        ('cambio_estado', 'Cambio de estado'),
+        ('umbral', 'Umbral de medición'),
+        ('pendiente', 'Pendiente de tendencia'),
+    ]
+    
+    METRICA_CHOICES = [
+        ('velocidad_rms', 'Velocidad RMS (mm/s)'),
+        ('aceleracion', 'Aceleración (g)'),
+        ('temperatura_maxima', 'Temperatura máxima (°C)'),
+        ('temperatura_promedio', 'Temperatura promedio (°C)'),
+    ]
+    
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='reglas_alerta')
+    nombre = models.CharField(max_length=200)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    
+    # Cambio de estado (origen vacío = cualquier estado)
+    estado_origen = models.CharField(max_length=20, choices=Activo.ESTADO_CHOICES, blank=True)
+    estado_destino = models.CharField(max_length=20, choices=Activo.ESTADO_CHOICES, blank=True)
+    
+    # Umbral (métrica ≥ valor) o pendiente (cambio mensual de la serie ≥ valor)
+    metrica = models.CharField(max_length=30, choices=METRICA_CHOICES, blank=True)
+    serie = models.CharField(max_length=20, choices=TendenciaActivo.TIPO_CHOICES, blank=True)
+    valor = models.FloatField(blank=True, null=True, help_text='Umbral, o cambio mínimo por mes en reglas de pendiente')
+    
+    # Notificación
+    destinatarios = models.TextField(blank=True, help_text='Correos separados por coma (vacío = correo del cliente)')
+    minutos_antirrebote = models.PositiveIntegerField(
+        default=60,
+        help_text='No se repite la alerta del mismo activo dentro de este plazo'
+    )
+    activa = models.BooleanField(default=True)
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['cliente', 'nombre']
+        verbose_name = 'Regla de Alerta'
+        verbose_name_plural = 'Reglas de Alerta'
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.cliente.nombre})"
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        
+        if self.tipo == 'cambio_estado' and not self.estado_destino:
+            raise ValidationError({'estado_destino': 'Requerido para reglas de cambio de estado'})
+        if self.tipo == 'umbral' and not self.metrica:
+            raise ValidationError({'metrica': 'Requerida para reglas de umbral'})
+        if self.tipo == 'pendiente' and not self.serie:
+            raise ValidationError({'serie': 'Requerida para reglas de pendiente'})
+        if self.tipo in ('umbral', 'pendiente') and self.valor is None:
+            raise ValidationError({'valor': 'Requerido para reglas de umbral o pendiente'})
+    
+    def lista_destinatarios(self):
+        """Correos de destino de la regla o, si no tiene, del cliente"""
+        correos = [c.strip() for c in self.destinatarios.split(',') if c.strip()]
+        return correos or [self.cliente.contacto_email or self.cliente.email]
+
+
+class EstadoReglaActivo(models.Model):
+    """Último estado de evaluación de una regla para un activo (detección de flancos y antirrebote)"""
+    
+    regla = models.ForeignKey(ReglaAlerta, on_delete=models.CASCADE, related_name='estados')
+    activo = models.ForeignKey(Activo, on_delete=models.CASCADE, related_name='estados_reglas')
+    condicion = models.BooleanField(default=False, help_text='La condición se cumplía en la última evaluación')
+    ultimo_disparo = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Estado de Regla por Activo'
+        verbose_name_plural = 'Estados de Reglas por Activo'
+        constraints = [
+            models.UniqueConstraint(fields=['regla', 'activo'], name='estado_regla_activo_unico'),
+        ]
+
+
+class NotificacionAlerta(models.Model):
+    """
+    Bandeja de salida (outbox): un correo pendiente que agrupa los eventos de una
+    regla ocurridos en la ventana de agrupación. La entrega la hace el comando
+    entregar_alertas.
+    """
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviada', 'Enviada'),
+        ('error', 'Error'),
+    ]
+    
+    regla = models.ForeignKey(ReglaAlerta, on_delete=models.CASCADE, related_name='notificaciones')
+    destinatarios = models.TextField(help_text='Correos separados por coma')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    enviar_despues = models.DateTimeField(help_text='No se entrega antes de esta fecha (agrupación y reintentos)')
+    enviado = models.DateTimeField(blank=True, null=True)
+    ultimo_error = models.TextField(blank=True)
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-creado']
+        verbose_name = 'Notificación de Alerta'
+        verbose_name_plural = 'Notificaciones de Alerta'
+        indexes = [
+            models.Index(fields=['estado', 'enviar_despues']),
+        ]
+    
+    def __str__(self):
+        return f"Notificación {self.regla.nombre} - {self.get_estado_display()} ({self.creado:%Y-%m-%d %H:%M})"
+
+
+class EventoAlerta(models.Model):
+    """Disparo de una regla para un activo"""
+    
+    regla = models.ForeignKey(ReglaAlerta, on_delete=models.CASCADE, related_name='eventos')
+    activo = models.ForeignKey(Activo, on_delete=models.CASCADE, related_name='eventos_alerta')
+    notificacion = models.ForeignKey(
+        NotificacionAlerta,
+        on_delete=models.SET_NULL,
+        related_name='eventos',
+        blank=True,
+        null=True
+    )
+    mensaje = models.CharField(max_length=300)
+    valor = models.FloatField(blank=True, null=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-creado']
+        verbose_name = 'Evento de Alerta'
+        verbose_name_plural = 'Eventos de Alerta'
+        indexes = [
+            models.Index(fields=['activo', '-creado']),
+        ]
+    
+    def __str__(self):
+        return f"{self.regla.nombre} - {self.activo.nombre}: {self.mensaje}"
+
+
+# ============================================================================
+# PLANO DE PLANTA
+# ============================================================================
+
+class PuntoPlano(models.Model):
+    """Ubicación de un activo sobre el plano de su sucursal"""
+    
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name='puntos_plano')
+    activo = models.OneToOneField(Activo, on_delete=models.CASCADE, related_name='punto_plano')
+    
+    # Posición relativa al plano (0 = borde izquierdo/superior, 1 = derecho/inferior),
+    # independiente de la resolución del plano
+    x = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(1)])
+    y = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(1)])
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Punto del Plano'
+        verbose_name_plural = 'Puntos del Plano'
+    
+    def __str__(self):
+        return f"{self.activo.nombre} ({self.x:.3f}, {self.y:.3f})"
+
+
+# ============================================================================
+# ALMACENAMIENTO POR CONTENIDO
+# ============================================================================
+
+class ArchivoContenido(models.Model):
+    """Archivo del almacenamiento por contenido con su conteo de referencias (core.almacenamiento)"""
+    
+    hash = models.CharField(max_length=64, unique=True, help_text='sha256 del contenido')
+    nombre = models.CharField(max_length=255, help_text='Ruta dentro de MEDIA_ROOT')
+    tamano = models.BigIntegerField(default=0, help_text='Tamaño en bytes')
+    referencias = models.PositiveIntegerField(default=0)
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    ultimo_uso = models.DateTimeField(default=timezone.now, help_text='Última vez que se sumó o restó una referencia')
+    
+    class Meta:
+        verbose_name = 'Archivo por Contenido'
+        verbose_name_plural = 'Archivos por Contenido'
+        indexes = [
+            models.Index(fields=['referencias', 'ultimo_uso']),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} ref.)"
+
+
+# ============================================================================
+# SUBIDAS FRAGMENTADAS
+# ============================================================================
+
+class SubidaFragmentada(models.Model):
+    """Subida reanudable en curso: los fragmentos se escriben en un archivo temporal (core.subidas)"""
+    
+    DESTINO_CHOICES = [
+        ('foto_termica', 'Foto térmica de activo'),
+        ('plano_planta', 'Plano de planta'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subidas_fragmentadas')
+    destino = models.CharField(max_length=20, choices=DESTINO_CHOICES)
+    objeto_id = models.PositiveIntegerField(help_text='Activo o Sucursal de destino')
+    nombre_archivo = models.CharField(max_length=255)
+    tipo_contenido = models.CharField(max_length=100)
+    tamano_total = models.BigIntegerField(help_text='Tamaño declarado en bytes')
+    recibido = models.BigIntegerField(default=0, help_text='Bytes recibidos (offset del próximo fragmento)')
+    parametros = models.JSONField(default=dict, blank=True, help_text='Opciones del destino (p. ej. nueva_muestra)')
+    
+    # Metadata
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Subida Fragmentada'
+        verbose_name_plural = 'Subidas Fragmentadas'
+        indexes = [
+            models.Index(fields=['actualizado']),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.recibido}/{self.tamano_total} bytes)"
+
+
+# ============================================================================
+# SINCRONIZACIÓN
+# ============================================================================
+
+class Eliminacion(models.Model):
+    """Lápida de un objeto eliminado, para que los dispositivos sincronizados lo borren (core.sincronizacion)"""
+    
+    recurso = models.CharField(max_length=30, help_text='Recurso de la API (clientes, activos, ...)')
+    objeto_id = models.PositiveBigIntegerField()
+    eliminado = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Eliminación'
+        verbose_name_plural = 'Eliminaciones'
+        indexes = [
+            models.Index(fields=['eliminado', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.recurso} {self.objeto_id} ({self.eliminado:%Y-%m-%d %H:%M})"
+
+
+# ============================================================================
+# MINIATURAS DE IMÁGENES
+# ============================================================================
+
+# Campo de imagen de cada modelo con miniaturas
+CAMPOS_IMAGEN = {
+    UserProfile: 'photo',
+    Cliente: 'logo',
+    Sucursal: 'plano_planta',
+    Activo: 'foto_termica',
+    TermografiaAnalisis: 'imagen_termica',
+}
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Sucursal)
+@receiver(post_save, sender=Activo)
+@receiver(post_save, sender=TermografiaAnalisis)
+def programar_miniaturas_imagen(sender, instance, **kwargs):
+    """Encola la generación de miniaturas cuando la imagen cambió"""
+    from .miniaturas import programar_miniaturas
+    programar_miniaturas(instance, CAMPOS_IMAGEN[sender])
+
+
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Sucursal)
+@receiver(post_delete, sender=Activo)
+@receiver(post_delete, sender=TermografiaAnalisis)
+def eliminar_miniaturas_imagen(sender, instance, **kwargs):
+    from .almacenamiento import liberar
+    from .miniaturas import eliminar_miniaturas
+    eliminar_miniaturas(instance.miniaturas)
+    # La fila ya no referencia su imagen (Django no borra archivos al eliminar filas)
+    liberar(getattr(instance, CAMPOS_IMAGEN[sender]).name)
+
+
+@receiver(post_save, sender=Sucursal)
+def programar_teselas_plano(sender, instance, **kwargs):
+    """Encola la pirámide de teselas cuando el plano cambió"""
+    from .teselas import programar_teselas
+    programar_teselas(instance)
+
+
+# ============================================================================
+# CACHÉ POR SUCURSAL
+# ============================================================================
+
+# Toda escritura de los datos de una sucursal sube su versión en la caché
+# (core.cache_sucursal). Al eliminar en cascada los hijos se eliminan antes
+# que sus padres, así que la sucursal aún se puede resolver desde el padre.
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_cache_cliente(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_cliente
+    invalidar_cliente(instance.id)
+
+
+@receiver(post_save, sender=Sucursal)
+@receiver(post_delete, sender=Sucursal)
+def invalidar_cache_sucursal(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_cliente, invalidar_sucursal
+    invalidar_sucursal(instance.id)
+    invalidar_cliente(instance.cliente_id)
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(post_save, sender=PuntoPlano)
+@receiver(post_delete, sender=PuntoPlano)
+def invalidar_cache_por_sucursal(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_sucursal
+    invalidar_sucursal(instance.sucursal_id)
+
+
+@receiver(post_save, sender=Equipo)
+@receiver(post_delete, sender=Equipo)
+def invalidar_cache_por_area(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_area
+    invalidar_area(instance.area_id)
+
+
+@receiver(post_save, sender=Activo)
+@receiver(post_delete, sender=Activo)
+@receiver(post_save, sender=MuestreoEquipo)
+@receiver(post_delete, sender=MuestreoEquipo)
+def invalidar_cache_por_equipo(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_equipo
+    invalidar_equipo(instance.equipo_id)
+
+
+@receiver(post_save, sender=Rodamiento)
+@receiver(post_delete, sender=Rodamiento)
+@receiver(post_save, sender=AnalisisTermico)
+@receiver(post_delete, sender=AnalisisTermico)
+@receiver(post_save, sender=MuestreoActivo)
+@receiver(post_delete, sender=MuestreoActivo)
+@receiver(post_save, sender=TermografiaAnalisis)
+@receiver(post_delete, sender=TermografiaAnalisis)
+@receiver(post_save, sender=VibracionesAnalisis)
+@receiver(post_delete, sender=VibracionesAnalisis)
+@receiver(post_save, sender=TendenciaActivo)
+@receiver(post_delete, sender=TendenciaActivo)
+@receiver(post_save, sender=PrediccionActivo)
+@receiver(post_delete, sender=PrediccionActivo)
+@receiver(post_save, sender=FormaOnda)
+@receiver(post_delete, sender=FormaOnda)
+def invalidar_cache_por_activo(sender, instance, **kwargs):
+    from .cache_sucursal import invalidar_activos
+    if instance.activo_id is not None:
+        invalidar_activos([instance.activo_id])
+
+
+# ============================================================================
+# LÁPIDAS DE SINCRONIZACIÓN
+# ============================================================================
+
+# Modelo → recurso de la API (core.api.RECURSOS)
+RECURSOS_SINCRONIZADOS = {
+    Cliente: 'clientes',
+    Sucursal: 'sucursales',
+    Area: 'areas',
+    Equipo: 'equipos',
+    Activo: 'activos',
+    TermografiaAnalisis: 'termografias',
+    VibracionesAnalisis: 'vibraciones',
+}
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Sucursal)
+@receiver(post_delete, sender=Area)
+@receiver(post_delete, sender=Equipo)
+@receiver(post_delete, sender=Activo)
+@receiver(post_delete, sender=TermografiaAnalisis)
+@receiver(post_delete, sender=VibracionesAnalisis)
+def registrar_eliminacion(sender, instance, origin=None, **kwargs):
+    # En un borrado en cascada basta la lápida del origen: el dispositivo borra
+    # localmente los hijos (así eliminar una sucursal no deja miles de lápidas)
+    modelo_origen = getattr(origin, 'model', type(origin))
+    if modelo_origen is not sender and modelo_origen in RECURSOS_SINCRONIZADOS:
+        return
+    Eliminacion.objects.create(recurso=RECURSOS_SINCRONIZADOS[sender], objeto_id=instance.pk)
@@ -0,0 +1,168 @@
+"""
+Pronóstico de vida útil remanente (RUL)
+Para cada activo se ajustan dos modelos de degradación sobre las últimas
+muestras de su serie (velocidad RMS o temperatura máxima):
+
+    lineal       y = a + b·t
+    exponencial  y = exp(a + b·t)   (regresión sobre ln y)
+
+y se conserva el de mejor R². Si la tendencia es creciente se extrapola la
+fecha de cruce del umbral de alarma (límite B/C de ISO 10816 para la clase de
+máquina, o la temperatura de alarma en termografía).
+
+Los ajustes de todos los activos se calculan juntos con sumas agrupadas
+(np.add.reduceat) sobre la serie concatenada: el costo es lineal en la cantidad
+de filas, sin ciclos por activo.
+"""
+import numpy as np
+from django.db import connection, transaction
+
+from .cache_sucursal import invalidar_alcance
+from .models import PrediccionActivo
+from .severidad import LIMITES_ZONA, CLASE_POR_DEFECTO, clases_activos
+from .tendencias import SERIES, agrupar, cargar_series, filtrar_alcance, regresion_por_grupo
+
+
+# Muestras más recientes usadas en el ajuste
+VENTANA_AJUSTE = 12
+
+# Mínimo de muestras para pronosticar
+MIN_MUESTRAS = 3
+
+# Cruces más lejanos que esto no se reportan (días)
+HORIZONTE_DIAS = 730
+
+# Temperatura máxima de alarma en termografía (°C), igual que AnalizadorTermico
+UMBRAL_ALARMA_TERMICA = 50.0
+
+
+def umbrales_alarma(tipo, activos_ids):
+    """Umbral de alarma por activo: inicio de la zona C (ISO 10816) o temperatura de alarma"""
+    if tipo == 'termografia':
+        return np.full(len(activos_ids), UMBRAL_ALARMA_TERMICA)
+    clases = clases_activos(activos_ids.tolist())
+    return np.array([
+        LIMITES_ZONA.get(clases.get(activo_id), LIMITES_ZONA[CLASE_POR_DEFECTO])[1]
+        for activo_id in activos_ids.tolist()
+    ])
+
+
+def ajustar_degradacion(activos, fechas, valores, umbrales_por_id, ventana=VENTANA_AJUSTE):
+    """
+    Ajusta los modelos de degradación de todas las series a la vez.
+    umbrales_por_id: función ids → arreglo de umbrales (se llama una vez).
+    Retorna un dict de arreglos, una posición por activo.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    ids, inicios, conteos, grupo, x = agrupar(activos, fechas)
+    finales = inicios + conteos - 1
+    desde_final = finales[grupo] - np.arange(valores.size)
+
+    def suma(arreglo):
+        return np.add.reduceat(arreglo, inicios)
+
+    peso = (desde_final < ventana).astype(np.float64)
+    positivo = valores > 0
+    peso_log = peso * positivo
+
+    a_lin, b_lin, n = regresion_por_grupo(x, valores, peso, inicios)
+    a_exp, b_exp, n_log = regresion_por_grupo(x, np.log(np.where(positivo, valores, 1.0)), peso_log, inicios)
+
+    # R² de ambos modelos en la escala original
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        media = suma(peso * valores) / n
+        total = suma(peso * (valores - media[grupo]) ** 2)
+        error_lin = suma(peso * (valores - (a_lin[grupo] + b_lin[grupo] * x)) ** 2)
+        error_exp = suma(peso_log * (valores - np.exp(a_exp[grupo] + b_exp[grupo] * x)) ** 2)
+        r2_lin = np.where(total > 0, 1 - error_lin / total, 0.0)
+        r2_exp = np.where((total > 0) & (n_log == n), 1 - error_exp / total, -np.inf)
+
+    exponencial = (r2_exp > r2_lin) & (b_exp > 0)
+    x_final = x[finales]
+    umbral = umbrales_por_id(ids)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        actual = np.where(exponencial, np.exp(a_exp + b_exp * x_final), a_lin + b_lin * x_final)
+        cruce = np.where(
+            exponencial,
+            (np.log(umbral) - a_exp) / b_exp,
+            (umbral - a_lin) / b_lin
+        )
+    pendiente = np.where(exponencial, b_exp, b_lin)
+    dias = np.where(actual >= umbral, 0.0, np.where(pendiente > 0, np.ceil(cruce - x_final), np.nan))
+    dias = np.where(dias > HORIZONTE_DIAS, np.nan, dias)
+
+    r2 = np.clip(np.where(exponencial, r2_exp, r2_lin), 0, 1)
+    # Confianza: calidad del ajuste × suficiencia de datos
+    confianza = r2 * np.minimum(1.0, (n - 2) / max(ventana - 2, 1))
+
+    return {
+        'activo_id': ids,
+        'num_muestras': n.astype(np.int64),
+        'modelo': np.where(exponencial, 'exponencial', 'lineal'),
+        'r2': r2,
+        'valor_actual': actual,
+        'umbral': umbral,
+        'ultima_fecha': np.asarray(fechas, dtype='datetime64[D]')[finales],
+        'dias_restantes': dias,
+        'confianza': np.clip(confianza, 0, 1),
+    }
+
+
+def calcular_predicciones(tipo, activos=None, sucursal=None):
+    """
+    Recalcula y persiste los pronósticos de un tipo ('vibraciones' o 'termografia')
+    para todos los activos, una sucursal o un conjunto de activos.
+    Retorna la cantidad de activos con pronóstico.
+    """
+    predicciones = filtrar_alcance(PrediccionActivo.objects.filter(tipo=tipo), activos, sucursal)
+    series = cargar_series(tipo, activos, sucursal)
+    if series is None:
+        predicciones.delete()
+        return 0
+
+    ajuste = ajustar_degradacion(*series, umbrales_por_id=lambda ids: umbrales_alarma(tipo, ids))
+
+    objetos = []
+    for i, activo_id in enumerate(ajuste['activo_id'].tolist()):
+        if ajuste['num_muestras'][i] < MIN_MUESTRAS:
+            continue
+        dias = ajuste['dias_restantes'][i]
+        sin_cruce = np.isnan(dias)
+        objetos.append(PrediccionActivo(
+            activo_id=activo_id,
+            tipo=tipo,
+            modelo=str(ajuste['modelo'][i]),
+            num_muestras=int(ajuste['num_muestras'][i]),
+            r2=round(float(ajuste['r2'][i]), 4),
+            valor_actual=round(float(ajuste['valor_actual'][i]), 4),
+            umbral=float(ajuste['umbral'][i]),
+            fecha_cruce=None if sin_cruce else (ajuste['ultima_fecha'][i] + int(dias)).item(),
+            dias_restantes=None if sin_cruce else int(dias),
+            confianza=round(float(ajuste['confianza'][i]), 3),
+        ))
+
+    opciones = {}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['activo', 'tipo']
+
+    with transaction.atomic():
+        # Activos sin datos suficientes pierden el pronóstico anterior
+        predicciones.exclude(activo_id__in=[p.activo_id for p in objetos]).delete()
+        PrediccionActivo.objects.bulk_create(
+            objetos,
+            batch_size=500,
+            update_conflicts=True,
+            update_fields=[
+                'modelo', 'num_muestras', 'r2', 'valor_actual', 'umbral',
+                'fecha_cruce', 'dias_restantes', 'confianza', 'calculado',
+            ],
+            **opciones
+        )
+        invalidar_alcance(activos, sucursal)
+    return len(objetos)
+
+
+def calcular_predicciones_sucursal(sucursal=None):
+    """Recalcula los pronósticos de vibraciones y termografía (una sucursal o todas)"""
+    return {tipo: calcular_predicciones(tipo, sucursal=sucursal) for tipo in SERIES}
@@ -0,0 +1,232 @@
+"""
+Análisis de envolvente para detección de fallas de rodamientos
+Con la geometría de cada Rodamiento y la velocidad de giro se calculan las
+frecuencias de falla (FTF, BPFO, BPFI, BSF). Las formas de onda se filtran en
+una banda de resonancia, se demodulan con la transformada de Hilbert (vía FFT)
+y en el espectro de la envolvente se buscan picos en esas frecuencias y sus
+armónicos. Todas las capturas de un equipo con igual largo y frecuencia de
+muestreo se procesan juntas como una matriz.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from .cache_sucursal import invalidar_activos
+from .formas_onda import abrir_senal
+from .models import Activo, FormaOnda, Rodamiento
+
+
+# Banda de demodulación (Hz); se ajusta a la frecuencia de muestreo
+BANDA_ENVOLVENTE = (500.0, 5000.0)
+
+# Armónicos de cada frecuencia de falla que se revisan
+ARMONICOS = 3
+
+# Tolerancia relativa de búsqueda del pico (el deslizamiento cambia la velocidad real)
+TOLERANCIA = 0.03
+
+# Relación pico / piso de ruido (dB) desde la cual se marca la falla
+UMBRAL_DB = 10.0
+
+# Límite de muestras por lote (la FFT compleja usa ~16 bytes por muestra)
+MAX_MUESTRAS_LOTE = 2 ** 23
+
+
+def banda_demodulacion(fs):
+    """Banda de demodulación limitada por Nyquist"""
+    inferior, superior = BANDA_ENVOLVENTE
+    superior = min(superior, 0.45 * fs)
+    inferior = min(inferior, 0.25 * superior)
+    return inferior, superior
+
+
+def espectro_envolvente(senales, fs, banda=None):
+    """
+    Espectro de la envolvente de un lote de señales (n_capturas × n_puntos).
+    Filtro pasa banda y señal analítica en un solo paso: se anulan las
+    frecuencias negativas y las que quedan fuera de la banda, y se duplican las
+    positivas dentro de ella. Retorna (frecuencias, amplitud).
+    """
+    senales = np.asarray(senales, dtype=np.float64)
+    n = senales.shape[1]
+    inferior, superior = banda or banda_demodulacion(fs)
+
+    frecuencias = np.fft.fftfreq(n, d=1.0 / fs)
+    filtro = np.where((frecuencias >= inferior) & (frecuencias <= superior), 2.0, 0.0)
+    analitica = np.fft.ifft(np.fft.fft(senales, axis=1) * filtro, axis=1)
+
+    envolvente = np.abs(analitica)
+    envolvente -= envolvente.mean(axis=1, keepdims=True)
+    ventana = np.hanning(n)
+    amplitud = 2 * np.abs(np.fft.rfft(envolvente * ventana, axis=1)) / ventana.sum()
+    return np.fft.rfftfreq(n, d=1.0 / fs), amplitud
+
+
+def picos_en_bandas(frecuencias, amplitud, centros, tolerancia=TOLERANCIA):
+    """
+    Máximo del espectro alrededor de cada frecuencia objetivo.
+    centros: n_capturas × n_objetivos (NaN = sin objetivo).
+    Retorna (amplitud_pico, frecuencia_pico), ambos n_capturas × n_objetivos.
+    """
+    resolucion = frecuencias[1] - frecuencias[0]
+    ancho = np.maximum(np.nan_to_num(centros) * tolerancia, 2 * resolucion)
+    inicio = np.searchsorted(frecuencias, np.nan_to_num(centros) - ancho, side='left')
+    fin = np.searchsorted(frecuencias, np.nan_to_num(centros) + ancho, side='right')
+
+    # Ventanas de igual largo: índices inicio..inicio+largo, enmascarando lo que excede fin
+    largo = max(1, int((fin - inicio).max()))
+    indices = inicio[..., None] + np.arange(largo)
+    validos = indices < fin[..., None]
+    indices = np.minimum(indices, frecuencias.size - 1)
+
+    filas = np.arange(amplitud.shape[0])[:, None, None]
+    valores = np.where(validos, amplitud[filas, indices], -np.inf)
+    posicion = valores.argmax(axis=-1)
+    pico = np.take_along_axis(valores, posicion[..., None], axis=-1)[..., 0]
+    frecuencia_pico = frecuencias[np.take_along_axis(indices, posicion[..., None], axis=-1)[..., 0]]
+
+    sin_objetivo = np.isnan(centros) | ~np.isfinite(pico)
+    return np.where(sin_objetivo, np.nan, pico), np.where(sin_objetivo, np.nan, frecuencia_pico)
+
+
+def rpm_efectiva(forma):
+    """RPM de la captura o, si no se registró, la nominal del activo"""
+    return forma.rpm or forma.activo.rpm
+
+
+def objetivos_falla(forma):
+    """Lista de (rodamiento, falla, frecuencia_hz) para una captura"""
+    rpm = rpm_efectiva(forma)
+    if not rpm:
+        return []
+    return [
+        (rodamiento, falla, frecuencia)
+        for rodamiento in forma.activo.rodamientos.all()
+        for falla, frecuencia in rodamiento.frecuencias_falla(rpm).items()
+    ]
+
+
+def evaluar_lote(formas, fs):
+    """Análisis de envolvente de capturas con el mismo largo y frecuencia de muestreo"""
+    objetivos = [objetivos_falla(forma) for forma in formas]
+    max_objetivos = max(len(o) for o in objetivos)
+
+    # Matriz de objetivos: cada falla con sus armónicos, NaN de relleno
+    centros = np.full((len(formas), max_objetivos, ARMONICOS), np.nan)
+    for i, lista in enumerate(objetivos):
+        for j, (_, _, frecuencia) in enumerate(lista):
+            centros[i, j] = frecuencia * np.arange(1, ARMONICOS + 1)
+
+    frecuencias, amplitud = espectro_envolvente(np.stack([abrir_senal(f) for f in formas]), fs)
+    pico, frecuencia_pico = picos_en_bandas(frecuencias, amplitud, centros.reshape(len(formas), -1))
+    pico = pico.reshape(centros.shape)
+    frecuencia_pico = frecuencia_pico.reshape(centros.shape)
+
+    # Piso de ruido: mediana del espectro hasta el mayor armónico buscado
+    limite = np.searchsorted(frecuencias, np.nanmax(centros, axis=(1, 2), initial=0) * 1.2)
+    piso = np.array([
+        np.median(amplitud[i, 1:max(int(limite[i]), 10)]) for i in range(len(formas))
+    ])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relacion_db = 20 * np.log10(pico / piso[:, None, None])
+
+    banda = banda_demodulacion(fs)
+    resultados = {}
+    for i, forma in enumerate(formas):
+        por_rodamiento = {}
+        for j, (rodamiento, falla, frecuencia) in enumerate(objetivos[i]):
+            detectados = int(np.sum(relacion_db[i, j] >= UMBRAL_DB))
+            datos = por_rodamiento.setdefault(rodamiento.id, {
+                'rodamiento_id': rodamiento.id,
+                'designacion': rodamiento.designacion,
+                'ubicacion': rodamiento.ubicacion,
+                'fallas': {},
+            })
+            datos['fallas'][falla] = {
+                'frecuencia': round(float(frecuencia), 2),
+                'pico_hz': round(float(frecuencia_pico[i, j, 0]), 2),
+                'amplitud': round(float(pico[i, j, 0]), 5),
+                'relacion_db': round(float(relacion_db[i, j, 0]), 1),
+                'armonicos': detectados,
+                # Alerta: fundamental sobre el umbral y al menos un armónico más
+                'alerta': bool(relacion_db[i, j, 0] >= UMBRAL_DB and detectados >= 2),
+            }
+        resultados[forma.id] = {
+            'rpm': rpm_efectiva(forma),
+            'banda': [round(banda[0], 1), round(banda[1], 1)],
+            'rodamientos': list(por_rodamiento.values()),
+            'alerta': any(
+                falla['alerta'] for datos in por_rodamiento.values() for falla in datos['fallas'].values()
+            ),
+        }
+    return resultados
+
+
+def analizar_envolvente(formas):
+    """
+    Análisis de envolvente de varias capturas. Las que no tienen rodamientos o
+    RPM se omiten. Guarda el resultado en FormaOnda.metricas['envolvente'].
+    Retorna dict forma_id → resultado.
+    """
+    grupos = defaultdict(list)
+    for forma in formas:
+        if objetivos_falla(forma):
+            grupos[(forma.num_puntos, forma.frecuencia_muestreo)].append(forma)
+
+    resultados = {}
+    actualizadas = []
+    for (num_puntos, fs), grupo in grupos.items():
+        por_lote = max(1, MAX_MUESTRAS_LOTE // max(num_puntos, 1))
+        for i in range(0, len(grupo), por_lote):
+            lote = grupo[i:i + por_lote]
+            resultados.update(evaluar_lote(lote, fs))
+            for forma in lote:
+                forma.metricas = {**(forma.metricas or {}), 'envolvente': resultados[forma.id]}
+                actualizadas.append(forma)
+
+    FormaOnda.objects.bulk_update(actualizadas, ['metricas'])
+    invalidar_activos({forma.activo_id for forma in actualizadas})
+    return resultados
+
+
+def ultimas_formas_equipo(equipo):
+    """Última captura de cada (activo, eje) del equipo, con activo y rodamientos precargados"""
+    ultimas = {}
+    for forma_id, activo_id, eje in FormaOnda.objects.filter(
+        activo__equipo=equipo,
+        activo__activo=True
+    ).order_by('activo_id', 'eje', '-fecha_captura', '-id').values_list('id', 'activo_id', 'eje'):
+        ultimas.setdefault((activo_id, eje), forma_id)
+
+    return list(FormaOnda.objects.filter(
+        id__in=ultimas.values()
+    ).select_related('activo').prefetch_related('activo__rodamientos'))
+
+
+def analizar_rodamientos_equipo(equipo):
+    """Análisis de envolvente de las últimas capturas de todos los activos del equipo"""
+    return analizar_envolvente(ultimas_formas_equipo(equipo))
+
+
+def bandas_rodamientos(formas):
+    """
+    Frecuencias de falla por captura para el motor de espectro (core.espectro):
+    dict forma_id → {'BPFO_6205': Hz, ...}
+    """
+    activos_ids = {forma.activo_id for forma in formas}
+    rodamientos = defaultdict(list)
+    for rodamiento in Rodamiento.objects.filter(activo_id__in=activos_ids):
+        rodamientos[rodamiento.activo_id].append(rodamiento)
+    rpm_activos = dict(Activo.objects.filter(id__in=activos_ids).values_list('id', 'rpm'))
+
+    bandas = {}
+    for forma in formas:
+        rpm = forma.rpm or rpm_activos.get(forma.activo_id)
+        if not rpm:
+            continue
+        bandas[forma.id] = {
+            f'{falla}_{rodamiento.designacion}': frecuencia
+            for rodamiento in rodamientos[forma.activo_id]
+            for falla, frecuencia in rodamiento.frecuencias_falla(rpm).items()
+        }
+    return bandas
@@ -0,0 +1,93 @@
+"""
+Planificador de rutas de muestreo
+Con el intervalo de muestreo de cada activo y su último MuestreoActivo se
+calculan los activos vencidos y los que vencen dentro del horizonte, en el
+orden de recorrido de la planta: área (aserradero → elaborado → caldera),
+equipo y activo.
+
+El estado de muestreo de toda la sucursal sale de una sola consulta agregada
+(MAX(fecha_muestreo) por activo) y se guarda en la caché por sucursal
+(core.cache_sucursal) para el día; registrar muestreos o cambiar activos sube
+la versión de la sucursal.
+"""
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache_sucursal import cacheado
+from .listados import orden_area
+from .models import Activo, Area
+
+
+# Días hacia adelante en que un activo se considera próximo a vencer
+HORIZONTE_PROXIMOS = 7
+
+# Vigencia de la caché (la clave ya incluye el día)
+DURACION_CACHE = 60 * 60 * 6
+
+
+def estado_muestreo(sucursal_id):
+    """Activos vigentes de la sucursal con su último muestreo, en orden de recorrido (una consulta)"""
+    return list(Activo.objects.filter(
+        equipo__area__sucursal_id=sucursal_id,
+        activo=True
+    ).annotate(
+        area_orden=orden_area(),
+        ultimo_muestreo=Max('muestreos__fecha_muestreo')
+    ).order_by('area_orden', 'equipo__nombre', 'nombre', 'id').values(
+        'id', 'nombre', 'intervalo_muestreo_dias', 'ultimo_muestreo',
+        'equipo_id', 'equipo__nombre', 'equipo__area__nombre'
+    ))
+
+
+def estado_muestreo_cacheado(sucursal_id, hoy):
+    return cacheado('sucursal', sucursal_id, f'ruta_muestreo:{hoy.isoformat()}',
+                    lambda: estado_muestreo(sucursal_id), DURACION_CACHE)
+
+
+def planificar_ruta(sucursal, horizonte=HORIZONTE_PROXIMOS, hoy=None):
+    """
+    Ruta de muestreo de la sucursal: activos sin muestreo, vencidos o que vencen
+    dentro de `horizonte` días, agrupados por área y equipo en orden de recorrido.
+    """
+    hoy = hoy or timezone.localdate()
+    limite = hoy + timedelta(days=horizonte)
+    areas_display = dict(Area.AREA_CHOICES)
+
+    areas = []
+    totales = {'sin_muestreo': 0, 'vencido': 0, 'proximo': 0}
+    for fila in estado_muestreo_cacheado(sucursal.id, hoy):
+        ultimo = fila['ultimo_muestreo']
+        proximo = ultimo + timedelta(days=fila['intervalo_muestreo_dias']) if ultimo else None
+        if proximo is None:
+            estado = 'sin_muestreo'
+        elif proximo < hoy:
+            estado = 'vencido'
+        elif proximo <= limite:
+            estado = 'proximo'
+        else:
+            continue
+        totales[estado] += 1
+
+        area = fila['equipo__area__nombre']
+        if not areas or areas[-1]['area'] != area:
+            areas.append({'area': area, 'nombre_display': areas_display.get(area, area), 'equipos': []})
+        equipos = areas[-1]['equipos']
+        if not equipos or equipos[-1]['equipo_id'] != fila['equipo_id']:
+            equipos.append({'equipo_id': fila['equipo_id'], 'equipo': fila['equipo__nombre'], 'activos': []})
+        equipos[-1]['activos'].append({
+            'activo_id': fila['id'],
+            'activo': fila['nombre'],
+            'estado': estado,
+            'ultimo_muestreo': ultimo.isoformat() if ultimo else None,
+            'proximo_muestreo': proximo.isoformat() if proximo else None,
+            'dias_atraso': (hoy - proximo).days if proximo else None,
+        })
+
+    return {
+        'fecha': hoy.isoformat(),
+        'horizonte_dias': horizonte,
+        'totales': totales,
+        'areas': areas,
+    }
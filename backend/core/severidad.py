@@ -0,0 +1,115 @@
+"""
+Clasificación de severidad de vibraciones según ISO 10816-1 / 20816-1
+La velocidad RMS (mm/s, 10-1000 Hz) se compara con los límites de zona de la
+clase de máquina del activo (o de su equipo):
+
+    Zona A → bueno, Zona B → observacion, Zona C → alarma, Zona D → falla
+
+La reclasificación trabaja sobre columnas (values_list + NumPy) y escribe con un
+UPDATE por resultado, por lo que reprocesar años de historial de una sucursal
+tras cambiar límites o clases no requiere guardar fila por fila.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache_sucursal import invalidar_activos
+from .models import Activo, VibracionesAnalisis
+
+
+# Límites de zona A/B, B/C y C/D en mm/s RMS por clase de máquina
+LIMITES_ZONA = {
+    'clase_i': (0.71, 1.8, 4.5),
+    'clase_ii': (1.12, 2.8, 7.1),
+    'clase_iii': (1.8, 4.5, 11.2),
+    'clase_iv': (2.8, 7.1, 18.0),
+}
+
+CLASE_POR_DEFECTO = 'clase_ii'
+
+# Resultado asignado a cada zona (A, B, C, D)
+RESULTADO_ZONA = ('bueno', 'observacion', 'alarma', 'falla')
+
+# IDs por sentencia UPDATE
+TAMANO_LOTE = 1000
+
+_CLASES = list(LIMITES_ZONA)
+_TABLA_LIMITES = np.array([LIMITES_ZONA[clase] for clase in _CLASES])
+_RESULTADOS = np.array(RESULTADO_ZONA + ('sin_medicion',))
+
+
+def clasificar_velocidades(velocidades, clases):
+    """
+    Clasifica arreglos de velocidad RMS (mm/s) y clase de máquina.
+    Velocidades nulas o <= 0 quedan como 'sin_medicion'.
+    Retorna un arreglo de strings con el resultado de cada muestra.
+    """
+    velocidades = np.asarray(velocidades, dtype=np.float64)
+    indice_clase = np.array(
+        [_CLASES.index(c) if c in LIMITES_ZONA else _CLASES.index(CLASE_POR_DEFECTO) for c in clases],
+        dtype=np.int64
+    ).reshape(velocidades.shape)
+
+    # Zona = cantidad de límites superados (0=A ... 3=D)
+    zona = (velocidades[:, None] > _TABLA_LIMITES[indice_clase]).sum(axis=1)
+    zona = np.where(np.isnan(velocidades) | (velocidades <= 0), len(RESULTADO_ZONA), zona)
+    return _RESULTADOS[zona]
+
+
+def clasificar_velocidad(velocidad_rms, clase=CLASE_POR_DEFECTO):
+    """Clasifica una sola velocidad RMS"""
+    return str(clasificar_velocidades([velocidad_rms], [clase])[0])
+
+
+def clase_efectiva(prefijo='activo__'):
+    """Expresión con la clase del activo o, si está vacía, la de su equipo"""
+    return Coalesce(F(f'{prefijo}clase_maquina'), F(f'{prefijo}equipo__clase_maquina'))
+
+
+def clases_activos(activos_ids):
+    """Dict activo_id → clase de máquina efectiva"""
+    return dict(
+        Activo.objects.filter(id__in=activos_ids).annotate(
+            clase=clase_efectiva(prefijo='')
+        ).values_list('id', 'clase')
+    )
+
+
+def reclasificar_muestras(muestras):
+    """
+    Reclasifica un queryset de VibracionesAnalisis.
+    Solo escribe las filas cuyo resultado cambia, con un UPDATE por resultado.
+    Retorna dict resultado → cantidad de muestras actualizadas.
+    """
+    filas = list(muestras.annotate(clase=clase_efectiva()).values_list(
+        'id', 'velocidad_rms', 'resultado', 'clase', 'activo_id'
+    ))
+    if not filas:
+        return {}
+
+    ids = np.array([f[0] for f in filas], dtype=np.int64)
+    actuales = np.array([f[2] for f in filas])
+    nuevos = clasificar_velocidades([f[1] for f in filas], [f[3] for f in filas])
+
+    cambios = {}
+    cambia = nuevos != actuales
+    ahora = timezone.now()
+    with transaction.atomic():
+        for resultado in np.unique(nuevos[cambia]):
+            ids_resultado = ids[cambia & (nuevos == resultado)].tolist()
+            for i in range(0, len(ids_resultado), TAMANO_LOTE):
+                VibracionesAnalisis.objects.filter(
+                    id__in=ids_resultado[i:i + TAMANO_LOTE]
+                ).update(resultado=str(resultado), actualizado=ahora)
+            cambios[str(resultado)] = len(ids_resultado)
+        invalidar_activos({f[4] for f, cambio in zip(filas, cambia) if cambio})
+    return cambios
+
+
+def reclasificar_sucursal(sucursal):
+    """Reclasifica todo el historial de vibraciones de una sucursal"""
+    return reclasificar_muestras(
+        VibracionesAnalisis.objects.filter(activo__equipo__area__sucursal=sucursal)
+    )
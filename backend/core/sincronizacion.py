@@ -0,0 +1,280 @@
+"""
+Sincronización incremental para dispositivos sin conectividad
+Las tablets de terreno trabajan sin red en salas de calderas y aserraderos;
+al volver a tener señal descargan solo lo que cambió desde su última marca y
+envían las ediciones hechas sin conexión:
+
+    GET  /api/v1/sync/?marca=<marca>&sucursal=3
+    POST /api/v1/sync/  {"cambios": [{"recurso": "activos", "id": 5,
+                          "actualizado": "<el que vio el dispositivo>",
+                          "campos": {"estado": "alarma"}}]}
+
+Bajada: por cada recurso de la API (core.api.RECURSOS) se entregan las filas
+con (actualizado, id) posterior a la posición guardada en la marca, y las
+lápidas (Eliminacion) de los objetos borrados. La marca es opaca y lleva una
+posición por recurso; si algún recurso llenó la página, completo es False y el
+dispositivo vuelve a pedir con la marca nueva. Una lápida de un padre implica
+borrar localmente sus hijos (la cascada no deja lápidas por cada hijo).
+
+Las posiciones no avanzan más allá de MARGEN antes de la consulta: una
+transacción que confirma después de la lectura con un actualizado anterior no
+se pierde. Las filas de ese margen se reenvían en la siguiente bajada y el
+dispositivo las vuelve a aplicar (upsert por id).
+
+Subida: cada cambio trae el actualizado con que el dispositivo vio el objeto;
+si en el servidor cambió entretanto el cambio no se aplica y se devuelve como
+conflicto con la versión actual, para que el técnico decida.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .alertas import evaluar_alertas
+from .api import RECURSOS, ParametroInvalido, consulta_recurso, serializar
+from .cache_sucursal import invalidar_activos, invalidar_area
+from .models import Eliminacion
+
+
+# Filas por recurso en cada bajada (por defecto y máximo)
+LIMITE = 500
+LIMITE_MAXIMO = 2000
+
+# Holgura para transacciones que confirman después de la lectura
+MARGEN = timedelta(minutes=5)
+
+# Máximo de cambios por subida
+MAX_CAMBIOS = 500
+
+# Campos que se pueden editar sin conexión
+EDITABLES = {
+    'activos': ('estado', 'observaciones', 'descripcion'),
+    'equipos': ('estado', 'observaciones', 'descripcion'),
+}
+
+# Clave de las lápidas dentro de la marca
+ELIMINADOS = 'eliminados'
+
+
+class MarcaInvalida(ValueError):
+    """La marca recibida no se pudo decodificar"""
+
+
+def codificar_marca(posiciones):
+    clave = {nombre: [instante.isoformat(), objeto_id] for nombre, (instante, objeto_id) in posiciones.items()}
+    return base64.urlsafe_b64encode(json.dumps(clave).encode('utf-8')).decode('ascii')
+
+
+def decodificar_marca(marca):
+    """{recurso o 'eliminados': (instante, id)} de una marca generada por codificar_marca"""
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(marca.encode('ascii')).decode('utf-8'))
+        posiciones = {}
+        for nombre, (instante, objeto_id) in clave.items():
+            if nombre not in RECURSOS and nombre != ELIMINADOS:
+                raise ValueError(nombre)
+            instante = datetime.fromisoformat(instante)
+            if timezone.is_naive(instante):
+                raise ValueError(instante)
+            posiciones[nombre] = (instante, int(objeto_id))
+        return posiciones
+    except (ValueError, TypeError, AttributeError, UnicodeError):
+        raise MarcaInvalida(marca)
+
+
+def obtener_limite(valor):
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return LIMITE
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def posterior_a(posicion, campo):
+    instante, objeto_id = posicion
+    return Q(**{f'{campo}__gt': instante}) | Q(**{campo: instante, 'id__gt': objeto_id})
+
+
+def siguiente_posicion(anterior, filas, campo, truncado, seguro):
+    """Posición después de entregar `filas`; nunca retrocede ni pasa de `seguro` si no hubo corte"""
+    if truncado:
+        return getattr(filas[-1], campo), filas[-1].id
+    limite = (seguro, 0)
+    return max(anterior, limite) if anterior else limite
+
+
+def cambios_desde(marca=None, sucursal_id=None, limite=LIMITE):
+    """
+    Cambios y eliminaciones posteriores a `marca` (todo si no viene), opcionalmente
+    solo de una sucursal. Retorna dict con cambios, eliminados, marca y completo.
+    """
+    seguro = timezone.now() - MARGEN
+    posiciones = decodificar_marca(marca) if marca else {}
+    parametros = {'sucursal': sucursal_id} if sucursal_id else {}
+    nuevas = {}
+    cambios = {}
+    completo = True
+
+    for recurso in RECURSOS:
+        consulta, seleccion = consulta_recurso(recurso, parametros)
+        anterior = posiciones.get(recurso)
+        if anterior:
+            consulta = consulta.filter(posterior_a(anterior, 'actualizado'))
+        # Se pide una fila extra para saber si quedan más
+        filas = list(consulta.order_by('actualizado', 'id')[:limite + 1])
+        truncado = len(filas) > limite
+        filas = filas[:limite]
+        cambios[recurso] = [serializar(fila, seleccion) for fila in filas]
+        nuevas[recurso] = siguiente_posicion(anterior, filas, 'actualizado', truncado, seguro)
+        completo = completo and not truncado
+
+    # Sin marca el dispositivo parte de cero: no tiene nada que borrar
+    eliminados = {}
+    anterior = posiciones.get(ELIMINADOS)
+    if marca:
+        consulta = Eliminacion.objects.all()
+        if anterior:
+            consulta = consulta.filter(posterior_a(anterior, 'eliminado'))
+        lapidas = list(consulta.order_by('eliminado', 'id')[:limite + 1])
+        truncado = len(lapidas) > limite
+        lapidas = lapidas[:limite]
+        for lapida in lapidas:
+            eliminados.setdefault(lapida.recurso, []).append(lapida.objeto_id)
+        nuevas[ELIMINADOS] = siguiente_posicion(anterior, lapidas, 'eliminado', truncado, seguro)
+        completo = completo and not truncado
+    else:
+        nuevas[ELIMINADOS] = (seguro, 0)
+
+    return {
+        'cambios': cambios,
+        'eliminados': eliminados,
+        'marca': codificar_marca(nuevas),
+        'completo': completo,
+    }
+
+
+def _milisegundos(instante):
+    # Las respuestas JSON llevan los instantes con milisegundos (DjangoJSONEncoder)
+    return instante.replace(microsecond=instante.microsecond // 1000 * 1000)
+
+
+def aplicar_cambios(cambios):
+    """
+    Aplica las ediciones hechas sin conexión en una transacción. Cada cambio se
+    aplica, se rechaza por datos inválidos o queda en conflicto si el objeto
+    cambió en el servidor. Retorna dict con conteos y el resultado por ítem.
+    """
+    if not isinstance(cambios, list) or not cambios:
+        raise ParametroInvalido('Se requiere una lista de cambios')
+    if len(cambios) > MAX_CAMBIOS:
+        raise ParametroInvalido(f'Máximo {MAX_CAMBIOS} cambios por request')
+
+    ids = {recurso: set() for recurso in EDITABLES}
+    for cambio in cambios:
+        if isinstance(cambio, dict) and cambio.get('recurso') in EDITABLES:
+            try:
+                ids[cambio['recurso']].add(int(cambio.get('id')))
+            except (TypeError, ValueError):
+                pass
+
+    resultados = []
+    modificados = {recurso: {} for recurso in EDITABLES}
+    campos_modificados = {recurso: set() for recurso in EDITABLES}
+    estados_anteriores = {}
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        objetos = {
+            recurso: RECURSOS[recurso][0]._default_manager.select_for_update().in_bulk(ids[recurso])
+            for recurso in EDITABLES
+        }
+        # Versión con que se compara cada cambio (la de antes de esta subida)
+        originales = {
+            (recurso, objeto_id): objeto.actualizado
+            for recurso, por_id in objetos.items() for objeto_id, objeto in por_id.items()
+        }
+
+        for indice, cambio in enumerate(cambios):
+            resultado = {'indice': indice}
+            resultados.append(resultado)
+            if not isinstance(cambio, dict):
+                resultado.update(success=False, error='Cambio inválido')
+                continue
+            recurso = cambio.get('recurso')
+            resultado.update(recurso=recurso, id=cambio.get('id'))
+            if recurso not in EDITABLES:
+                resultado.update(success=False, error='Recurso no editable')
+                continue
+            try:
+                objeto = objetos[recurso].get(int(cambio.get('id')))
+            except (TypeError, ValueError):
+                objeto = None
+            if objeto is None:
+                resultado.update(success=False, error='No encontrado')
+                continue
+
+            campos = cambio.get('campos')
+            if not isinstance(campos, dict) or not campos:
+                resultado.update(success=False, error='Sin campos para actualizar')
+                continue
+            no_editables = [nombre for nombre in campos if nombre not in EDITABLES[recurso]]
+            if no_editables:
+                resultado.update(success=False, error=f"Campos no editables: {', '.join(no_editables)}")
+                continue
+            try:
+                base = parse_datetime(str(cambio.get('actualizado') or ''))
+            except ValueError:
+                # Bien formado pero inexistente, p. ej. 30 de febrero
+                base = None
+            if base is None:
+                resultado.update(success=False, error='actualizado inválido')
+                continue
+
+            if _milisegundos(originales[(recurso, objeto.id)]) != _milisegundos(base):
+                resultado.update(
+                    success=False, conflicto=True, error='El objeto cambió en el servidor',
+                    actual=serializar(objeto, [(nombre, valor) for nombre, (_, valor) in RECURSOS[recurso][2].items()])
+                )
+                continue
+
+            modelo = RECURSOS[recurso][0]
+            try:
+                valores = {nombre: modelo._meta.get_field(nombre).clean(valor, objeto) for nombre, valor in campos.items()}
+            except ValidationError as e:
+                resultado.update(success=False, error='; '.join(e.messages))
+                continue
+
+            if recurso == 'activos' and 'estado' in valores:
+                estados_anteriores.setdefault(objeto.id, objeto.estado)
+            for nombre, valor in valores.items():
+                setattr(objeto, nombre, valor)
+            # bulk_update no aplica auto_now
+            objeto.actualizado = ahora
+            modificados[recurso][objeto.id] = objeto
+            campos_modificados[recurso].update(valores)
+            resultado.update(success=True, actualizado=ahora)
+
+        for recurso, por_id in modificados.items():
+            if por_id:
+                RECURSOS[recurso][0]._default_manager.bulk_update(
+                    list(por_id.values()), sorted(campos_modificados[recurso] | {'actualizado'})
+                )
+        invalidar_activos(modificados['activos'])
+        for area_id in {equipo.area_id for equipo in modificados['equipos'].values()}:
+            invalidar_area(area_id)
+
+    # Reglas de cambio de estado de los activos, una vez confirmada la subida
+    for activo_id, estado_anterior in estados_anteriores.items():
+        evaluar_alertas(modificados['activos'][activo_id], estado_anterior=estado_anterior)
+
+    return {
+        'aplicados': sum(len(por_id) for por_id in modificados.values()),
+        'conflictos': sum(1 for r in resultados if r.get('conflicto')),
+        'errores': sum(1 for r in resultados if not r['success'] and not r.get('conflicto')),
+        'resultados': resultados,
+    }
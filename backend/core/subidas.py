@@ -0,0 +1,151 @@
+"""
+Subidas fragmentadas y reanudables
+Protocolo para fotos térmicas y planos grandes sobre redes inestables:
+
+    POST /api/subidas/                      → crea la subida (destino, objeto_id, nombre, tipo, tamano)
+    PUT  /api/subidas/<id>/?offset=N        → escribe el cuerpo del request a partir del byte N
+    GET  /api/subidas/<id>/                 → offset actual, para reanudar tras un corte
+    POST /api/subidas/<id>/finalizar/       → entrega el archivo a subir_foto_termica / subir_plano_planta
+
+Cada fragmento se copia del request al archivo temporal en bloques, sin cargar
+el fragmento completo en memoria. Un fragmento solo se acepta en el offset
+recibido hasta el momento; si no coincide se responde 409 con el offset
+correcto. Las subidas abandonadas se borran con recolectar_media.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import SubidaFragmentada
+
+
+# Tamaño sugerido de fragmento y máximo aceptado por request
+TAMANO_FRAGMENTO = 2 * 1024 * 1024
+FRAGMENTO_MAXIMO = 16 * 1024 * 1024
+
+# Tamaño máximo del archivo completo por destino
+TAMANO_MAXIMO = {
+    'foto_termica': 25 * 1024 * 1024,
+    'plano_planta': 50 * 1024 * 1024,
+}
+
+# Bloque de copia del request al disco
+BLOQUE = 64 * 1024
+
+# Subidas sin actividad por más de este tiempo se descartan
+VIGENCIA = timedelta(hours=24)
+
+
+class DesfaseSubida(ValueError):
+    """El fragmento no empieza en el offset recibido hasta el momento"""
+
+    def __init__(self, recibido):
+        super().__init__(f'Se esperaba el offset {recibido}')
+        self.recibido = recibido
+
+
+def directorio_temporal():
+    directorio = getattr(settings, 'SUBIDAS_TEMP_DIR', None) or os.path.join(tempfile.gettempdir(), 'vyc_subidas')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def ruta_temporal(subida):
+    return os.path.join(directorio_temporal(), f'{subida.id}.parte')
+
+
+def crear_subida(usuario, destino, objeto_id, nombre_archivo, tipo_contenido, tamano_total, parametros=None):
+    """Registra la subida y crea su archivo temporal vacío"""
+    if destino not in TAMANO_MAXIMO:
+        raise ValueError('Destino inválido')
+    if not tipo_contenido.startswith('image/'):
+        raise ValueError('El archivo debe ser una imagen')
+    if not 0 < tamano_total <= TAMANO_MAXIMO[destino]:
+        raise ValueError(f'Tamaño inválido (máximo {TAMANO_MAXIMO[destino] // (1024 * 1024)}MB)')
+
+    subida = SubidaFragmentada.objects.create(
+        usuario=usuario,
+        destino=destino,
+        objeto_id=objeto_id,
+        nombre_archivo=os.path.basename(nombre_archivo)[:255] or 'imagen',
+        tipo_contenido=tipo_contenido[:100],
+        tamano_total=tamano_total,
+        parametros=parametros or {}
+    )
+    open(ruta_temporal(subida), 'wb').close()
+    return subida
+
+
+def escribir_fragmento(subida_id, offset, flujo, longitud):
+    """
+    Copia `longitud` bytes de `flujo` (el request) al archivo temporal a partir de
+    `offset`. Retorna la subida con el nuevo offset; DesfaseSubida si el offset no
+    es el esperado.
+    """
+    if longitud > FRAGMENTO_MAXIMO:
+        raise ValueError(f'Fragmento demasiado grande (máximo {FRAGMENTO_MAXIMO // (1024 * 1024)}MB)')
+
+    with transaction.atomic():
+        # La fila bloqueada serializa los fragmentos de una misma subida
+        subida = SubidaFragmentada.objects.select_for_update().get(id=subida_id)
+        if offset != subida.recibido:
+            raise DesfaseSubida(subida.recibido)
+        if offset + longitud > subida.tamano_total:
+            raise ValueError('El fragmento excede el tamaño declarado')
+
+        escritos = 0
+        with open(ruta_temporal(subida), 'r+b') as destino:
+            destino.seek(offset)
+            while escritos < longitud:
+                bloque = flujo.read(min(BLOQUE, longitud - escritos))
+                if not bloque:
+                    break
+                destino.write(bloque)
+                escritos += len(bloque)
+            # Lo escrito más allá del offset confirmado (un intento anterior cortado) se descarta
+            destino.truncate(offset + escritos)
+
+        subida.recibido = offset + escritos
+        subida.save(update_fields=['recibido', 'actualizado'])
+    return subida
+
+
+def archivo_subida(subida):
+    """Archivo completo de la subida, validado como imagen. El llamador debe cerrarlo."""
+    if subida.recibido != subida.tamano_total:
+        raise ValueError(f'Subida incompleta ({subida.recibido} de {subida.tamano_total} bytes)')
+
+    ruta = ruta_temporal(subida)
+    try:
+        with Image.open(ruta) as imagen:
+            imagen.verify()
+    except Image.DecompressionBombError:
+        raise ValueError('La imagen excede la resolución máxima permitida')
+    except (OSError, SyntaxError):
+        raise ValueError('El archivo no es una imagen válida')
+
+    archivo = File(open(ruta, 'rb'), name=subida.nombre_archivo)
+    archivo.content_type = subida.tipo_contenido
+    return archivo
+
+
+def descartar(subida):
+    try:
+        os.remove(ruta_temporal(subida))
+    except FileNotFoundError:
+        pass
+    subida.delete()
+
+
+def limpiar_abandonadas(vigencia=VIGENCIA):
+    """Descarta las subidas sin actividad dentro de `vigencia`. Retorna cuántas."""
+    abandonadas = list(SubidaFragmentada.objects.filter(actualizado__lt=timezone.now() - vigencia))
+    for subida in abandonadas:
+        descartar(subida)
+    return len(abandonadas)
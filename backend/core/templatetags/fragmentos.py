@@ -0,0 +1,61 @@
+"""
+Claves de caché de fragmentos de plantilla
+Las tablas de activos renderizan por fila un bloque grande (celdas editables,
+botones y modales); cada fila se cachea con {% cache %} bajo una clave que
+cambia cuando cambia algo de lo que muestra:
+
+    {% load cache fragmentos %}
+    {% clave_fila_activo activo as clave %}
+    {% cache 86400 fila_activo clave modulo %}...{% endcache %}
+
+Editar un activo vuelve a renderizar solo su fila; las demás salen de la caché.
+Las claves se arman con los datos ya cargados (select_related / prefetch), sin
+consultas adicionales.
+"""
+from django import template
+from django.db import models
+
+register = template.Library()
+
+
+def parte_clave(objeto):
+    """Texto que identifica la versión de un objeto dentro de una clave"""
+    if objeto is None:
+        return '-'
+    if isinstance(objeto, models.Model):
+        actualizado = getattr(objeto, 'actualizado', None)
+        return f"{objeto._meta.model_name}.{objeto.pk}@{actualizado.timestamp() if actualizado else ''}"
+    return str(objeto)
+
+
+@register.simple_tag
+def clave_fragmento(*objetos):
+    """
+    Clave de un fragmento que depende de `objetos`: modelos (por id y fecha de
+    actualización) o valores simples, p. ej. {% clave_fragmento equipo equipo.area as clave %}
+    """
+    return '|'.join(parte_clave(objeto) for objeto in objetos)
+
+
+def ultimo_analisis_termico(activo):
+    # Mismo análisis que muestra la fila (analisis_termicos.all|first), desde el prefetch
+    return next(iter(activo.analisis_termicos.all()), None)
+
+
+@register.simple_tag
+def clave_fila_activo(activo):
+    """
+    Clave de la fila de un activo en las tablas de activos: el activo, su equipo
+    y área (renombrarlos no toca el activo), el último análisis térmico (se
+    corrige en el mismo registro, por eso cuenta su fecha de actualización) y
+    la foto con sus miniaturas (se generan con update, sin tocar el activo).
+    """
+    miniaturas = activo.miniaturas or {}
+    return clave_fragmento(
+        activo,
+        activo.equipo,
+        activo.equipo.area,
+        ultimo_analisis_termico(activo),
+        activo.foto_termica.name or '',
+        miniaturas.get('original') or '',
+    )
@@ -0,0 +1,14 @@
+from django import template
+
+from core.miniaturas import url_miniatura
+
+register = template.Library()
+
+
+@register.simple_tag
+def miniatura(archivo, ancho, formato='webp'):
+    """
+    URL de la miniatura de una imagen, p. ej. {% miniatura activo.foto_termica 160 %}.
+    Mientras no se haya generado retorna la URL del original.
+    """
+    return url_miniatura(archivo, int(ancho), formato)
@@ -0,0 +1,189 @@
+"""
+Motor de tendencias de vibraciones y termografía
+Para cada activo resume la serie histórica (velocidad RMS de VibracionesAnalisis
+o temperatura máxima de TermografiaAnalisis): último valor, mínimo, máximo,
+promedio móvil exponencial y pendientes (todo el historial y muestras recientes).
+
+Todas las filas de la sucursal se leen en una sola consulta ordenada por
+(activo, fecha) y se agrupan con np.add.reduceat, así el cálculo es un solo
+recorrido vectorizado. El resultado se persiste en TendenciaActivo.
+"""
+import numpy as np
+from django.db import connection, transaction
+
+from .cache_sucursal import invalidar_alcance
+from .models import TendenciaActivo, TermografiaAnalisis, VibracionesAnalisis
+
+
+# Peso de la última muestra en el promedio móvil exponencial
+ALFA_EWMA = 0.3
+
+# Muestras usadas para la pendiente reciente
+VENTANA_RECIENTE = 5
+
+# Serie que se resume por tipo: (modelo, campo)
+SERIES = {
+    'vibraciones': (VibracionesAnalisis, 'velocidad_rms'),
+    'termografia': (TermografiaAnalisis, 'temperatura_maxima'),
+}
+
+
+def regresion_por_grupo(x, y, peso, inicios):
+    """
+    Mínimos cuadrados ponderados y = a + b·x para cada grupo contiguo que
+    comienza en inicios. peso 0 excluye la fila. Retorna (a, b, n) por grupo.
+    """
+    def suma(arreglo):
+        return np.add.reduceat(arreglo, inicios)
+
+    n = suma(peso)
+    sx, sy = suma(peso * x), suma(peso * y)
+    sxx, sxy = suma(peso * x * x), suma(peso * x * y)
+    denominador = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b = np.where(denominador > 0, (n * sxy - sx * sy) / denominador, 0.0)
+        a = np.where(n > 0, (sy - b * sx) / n, np.nan)
+    return a, b, n
+
+
+def agrupar(activos, fechas):
+    """
+    Índices de grupo de series ordenadas por (activo, fecha).
+    Retorna (ids, inicios, conteos, grupo, x) con x = días desde la primera
+    muestra de cada activo (mantiene la regresión bien condicionada).
+    """
+    dias = np.asarray(fechas, dtype='datetime64[D]').astype(np.int64).astype(np.float64)
+    ids, inicios, conteos = np.unique(np.asarray(activos), return_index=True, return_counts=True)
+    grupo = np.repeat(np.arange(ids.size), conteos)
+    return ids, inicios, conteos, grupo, dias - dias[inicios][grupo]
+
+
+def resumir_series(activos, fechas, valores, alfa=ALFA_EWMA, ventana=VENTANA_RECIENTE):
+    """
+    Resume series de varios activos concatenadas y ordenadas por (activo, fecha).
+    activos: arreglo de ids; fechas: datetime64[D]; valores: float.
+    Retorna un dict de arreglos, una posición por activo.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    dias = np.asarray(fechas, dtype='datetime64[D]')
+    ids, inicios, conteos, grupo, x = agrupar(activos, dias)
+    finales = inicios + conteos - 1
+    desde_final = finales[grupo] - np.arange(valores.size)
+
+    def suma(arreglo):
+        return np.add.reduceat(arreglo, inicios)
+
+    def pendiente(peso):
+        return regresion_por_grupo(x, valores, peso, inicios)[1]
+
+    todas = np.ones_like(valores)
+    recientes = (desde_final < ventana).astype(np.float64)
+
+    # EWMA cerrado: pesos (1-alfa)^k según la distancia k a la última muestra
+    pesos = (1 - alfa) ** desde_final
+    ewma = suma(pesos * valores) / suma(pesos)
+
+    ultimo = valores[finales]
+    anterior = np.where(conteos > 1, valores[np.maximum(finales - 1, 0)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tasa = np.where(anterior > 0, (ultimo - anterior) / anterior * 100, np.nan)
+
+    return {
+        'activo_id': ids,
+        'num_muestras': conteos,
+        'primera_fecha': dias[inicios],
+        'ultima_fecha': dias[finales],
+        'ultimo_valor': ultimo,
+        'valor_minimo': np.minimum.reduceat(valores, inicios),
+        'valor_maximo': np.maximum.reduceat(valores, inicios),
+        'ewma': ewma,
+        'pendiente': pendiente(todas),
+        'pendiente_reciente': pendiente(recientes),
+        'tasa_cambio': tasa,
+    }
+
+
+def filtrar_alcance(queryset, activos=None, sucursal=None):
+    """Limita un queryset con FK activo a una sucursal y/o un conjunto de activos"""
+    if sucursal is not None:
+        queryset = queryset.filter(activo__equipo__area__sucursal=sucursal)
+    if activos is not None:
+        queryset = queryset.filter(activo_id__in=activos)
+    return queryset
+
+
+def cargar_series(tipo, activos=None, sucursal=None):
+    """
+    Lee en una consulta las series de un tipo, ordenadas por (activo, fecha).
+    Retorna (activos_ids, fechas datetime64[D], valores) o None si no hay filas.
+    """
+    modelo, campo = SERIES[tipo]
+    filas = list(filtrar_alcance(modelo.objects.all(), activos, sucursal).exclude(
+        **{f'{campo}__isnull': True}
+    ).order_by('activo_id', 'fecha_muestreo', 'id').values_list('activo_id', 'fecha_muestreo', campo))
+    if not filas:
+        return None
+    activos_ids, fechas, valores = zip(*filas)
+    return (
+        np.array(activos_ids),
+        np.array(fechas, dtype='datetime64[D]'),
+        np.array(valores, dtype=np.float64),
+    )
+
+
+def calcular_tendencias(tipo, activos=None, sucursal=None):
+    """
+    Recalcula y persiste las tendencias de un tipo ('vibraciones' o 'termografia')
+    para una sucursal o un conjunto de activos. Retorna la cantidad de activos.
+    """
+    tendencias = filtrar_alcance(TendenciaActivo.objects.filter(tipo=tipo), activos, sucursal)
+    series = cargar_series(tipo, activos, sucursal)
+    if series is None:
+        tendencias.delete()
+        return 0
+
+    resumen = resumir_series(*series)
+
+    objetos = []
+    for i, activo_id in enumerate(resumen['activo_id'].tolist()):
+        tasa = resumen['tasa_cambio'][i]
+        objetos.append(TendenciaActivo(
+            activo_id=activo_id,
+            tipo=tipo,
+            num_muestras=int(resumen['num_muestras'][i]),
+            primera_fecha=resumen['primera_fecha'][i].item(),
+            ultima_fecha=resumen['ultima_fecha'][i].item(),
+            ultimo_valor=float(resumen['ultimo_valor'][i]),
+            valor_minimo=float(resumen['valor_minimo'][i]),
+            valor_maximo=float(resumen['valor_maximo'][i]),
+            ewma=round(float(resumen['ewma'][i]), 4),
+            pendiente=round(float(resumen['pendiente'][i]), 6),
+            pendiente_reciente=round(float(resumen['pendiente_reciente'][i]), 6),
+            tasa_cambio=None if np.isnan(tasa) else round(float(tasa), 2),
+        ))
+
+    opciones = {}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['activo', 'tipo']
+
+    with transaction.atomic():
+        # Activos que ya no tienen muestras pierden su tendencia
+        tendencias.exclude(activo_id__in=resumen['activo_id'].tolist()).delete()
+        TendenciaActivo.objects.bulk_create(
+            objetos,
+            batch_size=500,
+            update_conflicts=True,
+            update_fields=[
+                'num_muestras', 'primera_fecha', 'ultima_fecha', 'ultimo_valor',
+                'valor_minimo', 'valor_maximo', 'ewma', 'pendiente',
+                'pendiente_reciente', 'tasa_cambio', 'calculado',
+            ],
+            **opciones
+        )
+        invalidar_alcance(activos, sucursal)
+    return len(objetos)
+
+
+def calcular_tendencias_sucursal(sucursal):
+    """Recalcula las tendencias de vibraciones y termografía de una sucursal"""
+    return {tipo: calcular_tendencias(tipo, sucursal=sucursal) for tipo in SERIES}
@@ -0,0 +1,198 @@
+"""
+Teselas del plano de planta
+Los planos de aserraderos exportados de CAD pesan 10–30 MB; en vez de enviar
+la imagen completa se genera una pirámide de teselas (formato Deep Zoom) y el
+visor de la página de áreas solo descarga las teselas visibles en el zoom actual:
+
+    teselas/<sha256>/<nivel>/<columna>_<fila>.jpg
+
+El nivel máximo es la resolución original y cada nivel inferior tiene la mitad
+de ancho y alto, hasta el nivel en que el plano cabe en una sola tesela. La
+carpeta se nombra por el contenido del plano, así dos sucursales con el mismo
+plano la comparten y un plano nuevo nunca sirve teselas viejas desde caché.
+
+La generación corre tras el commit en el pool de core.miniaturas; mientras no
+termina, el visor muestra la miniatura de 1280 px. Las carpetas que ya no usa
+ninguna sucursal se borran con recolectar_media.
+"""
+import json
+import math
+import os
+import shutil
+import time
+import uuid
+
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .almacenamiento import almacenamiento_contenido, hash_contenido, hash_nombre
+from .cache_sucursal import invalidar_sucursal
+from .miniaturas import encolar
+
+
+DIRECTORIO = 'teselas'
+
+# Lado de cada tesela (px), sin solapamiento entre teselas vecinas
+TAMANO_TESELA = 256
+
+FORMATO = ('JPEG', 'jpg', {'quality': 85, 'optimize': True})
+
+
+def ruta_teselas(digest):
+    return almacenamiento_contenido.path(f'{DIRECTORIO}/{digest}')
+
+
+def niveles(ancho, alto):
+    """(nivel mínimo, nivel máximo) de la pirámide de una imagen"""
+    lado = max(ancho, alto, 1)
+    maximo = math.ceil(math.log2(lado))
+    minimo = maximo - max(0, math.ceil(math.log2(lado / TAMANO_TESELA)))
+    return minimo, maximo
+
+
+def construir_piramide(imagen, destino):
+    """Escribe las teselas de `imagen` en el directorio `destino`. Retorna la metadata."""
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode != 'RGB':
+        # JPEG no tiene transparencia: se aplana sobre blanco
+        rgba = imagen.convert('RGBA')
+        imagen = Image.new('RGB', rgba.size, 'white')
+        imagen.paste(rgba, mask=rgba.split()[-1])
+
+    ancho, alto = imagen.size
+    minimo, maximo = niveles(ancho, alto)
+    formato_pil, extension, opciones = FORMATO
+
+    for nivel in range(maximo, minimo - 1, -1):
+        directorio = os.path.join(destino, str(nivel))
+        os.makedirs(directorio)
+        for columna in range(math.ceil(imagen.width / TAMANO_TESELA)):
+            for fila in range(math.ceil(imagen.height / TAMANO_TESELA)):
+                x, y = columna * TAMANO_TESELA, fila * TAMANO_TESELA
+                tesela = imagen.crop((x, y, min(x + TAMANO_TESELA, imagen.width), min(y + TAMANO_TESELA, imagen.height)))
+                tesela.save(os.path.join(directorio, f'{columna}_{fila}.{extension}'), formato_pil, **opciones)
+        if nivel > minimo:
+            # Mitad de resolución (redondeando hacia arriba, como el visor)
+            imagen = imagen.reduce(2)
+
+    info = {
+        'ancho': ancho,
+        'alto': alto,
+        'tamano_tesela': TAMANO_TESELA,
+        'nivel_minimo': minimo,
+        'nivel_maximo': maximo,
+        'formato': extension,
+    }
+    with open(os.path.join(destino, 'info.json'), 'w') as f:
+        json.dump(info, f)
+    return info
+
+
+def teselas_de_archivo(archivo):
+    """Hash y metadata de la pirámide de un plano, generándola si no existe"""
+    digest = hash_nombre(archivo.name)
+    if digest is None:
+        with archivo.open('rb') as f:
+            digest = hash_contenido(f)
+
+    ruta = ruta_teselas(digest)
+    if not os.path.exists(os.path.join(ruta, 'info.json')):
+        # Se escribe en un directorio temporal y se renombra: el visor nunca ve
+        # una pirámide a medias y dos tareas del mismo plano no chocan
+        temporal = f'{ruta}.{uuid.uuid4().hex}.parcial'
+        try:
+            with archivo.open('rb') as f, Image.open(f) as imagen:
+                construir_piramide(imagen, temporal)
+            try:
+                os.rename(temporal, ruta)
+            except OSError:
+                # Otra tarea terminó primero (o quedó una carpeta incompleta sin info.json)
+                if os.path.exists(os.path.join(ruta, 'info.json')):
+                    shutil.rmtree(temporal)
+                else:
+                    shutil.rmtree(ruta, ignore_errors=True)
+                    os.rename(temporal, ruta)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    with open(os.path.join(ruta, 'info.json')) as f:
+        return digest, json.load(f)
+
+
+def generar_teselas(sucursal_id):
+    """
+    Genera la pirámide del plano actual de una sucursal y la registra.
+    Si el plano cambió mientras tanto no se registra nada (lo hará la tarea nueva).
+    """
+    from .models import Sucursal
+
+    sucursal = Sucursal.todos.filter(pk=sucursal_id).only('pk', 'plano_planta', 'teselas').first()
+    if sucursal is None:
+        return None
+    archivo = sucursal.plano_planta
+    anteriores = sucursal.teselas or {}
+
+    if not archivo:
+        if anteriores and Sucursal.todos.filter(pk=sucursal_id).update(teselas=None):
+            invalidar_sucursal(sucursal_id)
+        return None
+    if anteriores.get('original') == archivo.name:
+        return anteriores
+
+    digest, info = teselas_de_archivo(archivo)
+    teselas = {'original': archivo.name, 'hash': digest, **info}
+    if Sucursal.todos.filter(pk=sucursal_id, plano_planta=archivo.name).update(teselas=teselas):
+        # El JSON del visor (plano_sucursal) está cacheado por sucursal
+        invalidar_sucursal(sucursal_id)
+    return teselas
+
+
+def programar_teselas(sucursal):
+    """Encola la generación si el plano de la sucursal no coincide con sus teselas"""
+    original = (sucursal.teselas or {}).get('original')
+    if (sucursal.plano_planta.name or None) == original or (not sucursal.plano_planta and not sucursal.teselas):
+        return
+    pk = sucursal.pk
+    transaction.on_commit(lambda: encolar(generar_teselas, pk))
+
+
+def fuente_teselas(sucursal):
+    """Datos de la pirámide para el visor, o None si aún no está generada"""
+    teselas = sucursal.teselas or {}
+    if not sucursal.plano_planta or teselas.get('original') != sucursal.plano_planta.name:
+        return None
+    return {
+        'url': almacenamiento_contenido.url(f"{DIRECTORIO}/{teselas['hash']}/"),
+        'ancho': teselas['ancho'],
+        'alto': teselas['alto'],
+        'tamano_tesela': teselas['tamano_tesela'],
+        'nivel_minimo': teselas['nivel_minimo'],
+        'nivel_maximo': teselas['nivel_maximo'],
+        'formato': teselas['formato'],
+    }
+
+
+def recolectar_teselas(gracia, simular=False):
+    """
+    Borra las pirámides que no usa ninguna sucursal y las generaciones
+    interrumpidas, con fecha de modificación anterior a `gracia`. Retorna cuántas.
+    """
+    from .models import Sucursal
+
+    raiz = almacenamiento_contenido.path(DIRECTORIO)
+    if not os.path.isdir(raiz):
+        return 0
+    en_uso = {
+        teselas.get('hash')
+        for teselas in Sucursal.todos.exclude(teselas=None).values_list('teselas', flat=True)
+    }
+    antiguedad = time.time() - gracia.total_seconds()
+    borradas = 0
+    for nombre in os.listdir(raiz):
+        ruta = os.path.join(raiz, nombre)
+        if nombre in en_uso or os.path.getmtime(ruta) >= antiguedad:
+            continue
+        borradas += 1
+        if not simular:
+            shutil.rmtree(ruta, ignore_errors=True)
+    return borradas
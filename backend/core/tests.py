@@ -1,3 +1,1217 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .api import RECURSOS
+from .models import (
+    Activo, Area, Cliente, Eliminacion, Equipo, EventoAlerta, NotificacionAlerta, ReglaAlerta, Sucursal,
+    TermografiaAnalisis, VibracionesAnalisis,
+)
+
+
+class ApiLecturaTests(TestCase):
+    """API REST de lectura (core/api.py): una consulta por página, sparse fieldsets, cursor y ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('api', password='api')
+        for c in range(2):
+            cliente = Cliente.objects.create(nombre=f'Cliente {c}', email=f'c{c}@example.com', ruc_nit=f'ruc-{c}')
+            sucursal = Sucursal.objects.create(cliente=cliente, nombre=f'Sucursal {c}')
+            # Las áreas se crean con la sucursal
+            for area in sucursal.areas.all():
+                equipo = Equipo.objects.create(area=area, nombre=f'Equipo {area.nombre}')
+                for a in range(4):
+                    activo = Activo.objects.create(equipo=equipo, nombre=f'Activo {a}')
+                    for d in range(3):
+                        fecha = date(2024, 1, 1) + timedelta(days=d)
+                        TermografiaAnalisis.objects.create(activo=activo, fecha_muestreo=fecha, temperatura_maxima=40 + d)
+                        VibracionesAnalisis.objects.create(activo=activo, fecha_muestreo=fecha, velocidad_rms=1.5 + d)
+        cls.sucursal = Sucursal.objects.first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_una_consulta_por_pagina(self):
+        for recurso, (modelo, _, campos) in RECURSOS.items():
+            with self.subTest(recurso=recurso), self.assertNumQueries(1):
+                respuesta = self.client.get(f'/api/v1/{recurso}/', {'limite': 500})
+            self.assertEqual(respuesta.status_code, 200)
+            resultados = respuesta.json()['resultados']
+            self.assertEqual(len(resultados), modelo.objects.count())
+            self.assertEqual(set(resultados[0]), {'id', *campos})
+
+    def test_detalle_una_consulta(self):
+        activo = Activo.objects.first()
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(f'/api/v1/activos/{activo.id}/')
+        self.assertEqual(respuesta.json()['resultado']['nombre'], activo.nombre)
+        self.assertEqual(self.client.get('/api/v1/activos/0/').status_code, 404)
+
+    def test_sparse_fieldsets(self):
+        with self.assertNumQueries(1) as consultas:
+            respuesta = self.client.get('/api/v1/activos/', {'fields': 'nombre,estado_display'})
+        self.assertEqual(set(respuesta.json()['resultados'][0]), {'id', 'nombre', 'estado_display'})
+        # Solo se leen las columnas de los campos pedidos
+        self.assertNotIn('descripcion', consultas.captured_queries[0]['sql'])
+
+        respuesta = self.client.get('/api/v1/activos/', {'fields': 'nombre,inexistente'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_filtros(self):
+        respuesta = self.client.get('/api/v1/activos/', {'sucursal': self.sucursal.id, 'limite': 500})
+        esperados = Activo.objects.filter(equipo__area__sucursal=self.sucursal).count()
+        self.assertEqual(len(respuesta.json()['resultados']), esperados)
+        self.assertEqual(self.client.get('/api/v1/activos/', {'sucursal': 'x'}).status_code, 400)
+
+    def test_paginacion_cursor(self):
+        vistos = []
+        cursor = None
+        while True:
+            parametros = {'limite': 7, 'fields': 'fecha_muestreo'}
+            if cursor:
+                parametros['cursor'] = cursor
+            with self.assertNumQueries(1):
+                datos = self.client.get('/api/v1/termografias/', parametros).json()
+            vistos += [fila['id'] for fila in datos['resultados']]
+            cursor = datos['siguiente_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, list(TermografiaAnalisis.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get('/api/v1/termografias/', {'cursor': 'no-es-un-cursor'}).status_code, 400)
+
+    def test_etag(self):
+        respuesta = self.client.get('/api/v1/equipos/')
+        etag = respuesta['ETag']
+        respuesta = self.client.get('/api/v1/equipos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+        Equipo.objects.filter(id=Equipo.objects.first().id).update(nombre='Renombrado')
+        respuesta = self.client.get('/api/v1/equipos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_requiere_autenticacion(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/v1/clientes/').status_code, 403)
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.client.get('/api/v1/inexistente/').status_code, 404)
+
+
+class SincronizacionTests(TestCase):
+    """Sincronización incremental de dispositivos (core/sincronizacion.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('tablet', password='tablet')
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        cls.sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        cls.equipo = Equipo.objects.create(area=cls.sucursal.areas.first(), nombre='Equipo')
+        for a in range(5):
+            Activo.objects.create(equipo=cls.equipo, nombre=f'Activo {a}')
+        # Todo lo anterior quedó sincronizado hace rato (fuera del margen)
+        ayer = timezone.now() - timedelta(days=1)
+        for modelo in (Cliente, Sucursal, Sucursal.areas.field.model, Equipo, Activo):
+            modelo.objects.update(actualizado=ayer)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def bajar(self, marca=None, **parametros):
+        if marca:
+            parametros['marca'] = marca
+        respuesta = self.client.get('/api/v1/sync/', parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_bajada_incremental(self):
+        datos = self.bajar(sucursal=self.sucursal.id)
+        self.assertTrue(datos['completo'])
+        self.assertEqual(len(datos['cambios']['activos']), 5)
+        self.assertEqual(len(datos['cambios']['clientes']), 1)
+
+        datos = self.bajar(datos['marca'], sucursal=self.sucursal.id)
+        self.assertEqual(datos['cambios']['activos'], [])
+
+        activo = Activo.objects.first()
+        activo.estado = 'alarma'
+        activo.save()
+        datos = self.bajar(datos['marca'], sucursal=self.sucursal.id)
+        self.assertEqual([fila['id'] for fila in datos['cambios']['activos']], [activo.id])
+
+        activo_id = activo.id
+        activo.delete()
+        datos = self.bajar(datos['marca'])
+        self.assertEqual(datos['eliminados'], {'activos': [activo_id]})
+
+        # La cascada deja solo la lápida del origen
+        Equipo.objects.get(id=self.equipo.id).delete()
+        datos = self.bajar(datos['marca'])
+        # (la lápida del activo se reenvía: está dentro del margen)
+        self.assertEqual(datos['eliminados']['equipos'], [self.equipo.id])
+        self.assertEqual(Eliminacion.objects.count(), 2)
+
+    def test_bajada_por_paginas(self):
+        vistos = []
+        marca = None
+        for _ in range(10):
+            datos = self.bajar(marca, limite=2)
+            vistos += [fila['id'] for fila in datos['cambios']['activos']]
+            marca = datos['marca']
+            if datos['completo']:
+                break
+        self.assertTrue(datos['completo'])
+        self.assertEqual(sorted(vistos), sorted(Activo.objects.values_list('id', flat=True)))
+
+    def test_subida_con_conflictos(self):
+        fila, otra = self.bajar()['cambios']['activos'][:2]
+        cambio = {'recurso': 'activos', 'id': fila['id'], 'actualizado': fila['actualizado'], 'campos': {'estado': 'alarma'}}
+
+        datos = self.client.post('/api/v1/sync/', {'cambios': [cambio]}, format='json').json()
+        self.assertEqual(datos['aplicados'], 1)
+        self.assertEqual(Activo.objects.get(id=fila['id']).estado, 'alarma')
+
+        # Misma versión base: el objeto ya cambió en el servidor
+        cambio['campos'] = {'estado': 'bueno'}
+        datos = self.client.post('/api/v1/sync/', {'cambios': [cambio]}, format='json').json()
+        self.assertEqual(datos['conflictos'], 1)
+        self.assertEqual(datos['resultados'][0]['actual']['estado'], 'alarma')
+
+        invalidos = [
+            {'recurso': 'activos', 'id': otra['id'], 'actualizado': otra['actualizado'], 'campos': {'estado': 'inexistente'}},
+            {'recurso': 'activos', 'id': otra['id'], 'actualizado': otra['actualizado'], 'campos': {'nombre': 'x'}},
+            {'recurso': 'clientes', 'id': 1, 'actualizado': otra['actualizado'], 'campos': {'nombre': 'x'}},
+        ]
+        datos = self.client.post('/api/v1/sync/', {'cambios': invalidos}, format='json').json()
+        self.assertEqual((datos['aplicados'], datos['errores']), (0, 3))
+        self.assertEqual(Activo.objects.get(id=otra['id']).estado, otra['estado'])
+
+    def test_actualizado_inexistente(self):
+        fila, otra = self.bajar()['cambios']['activos'][:2]
+        cambios = [
+            {'recurso': 'activos', 'id': fila['id'], 'actualizado': '2024-02-30T10:00:00Z', 'campos': {'estado': 'alarma'}},
+            {'recurso': 'activos', 'id': otra['id'], 'actualizado': otra['actualizado'], 'campos': {'estado': 'alarma'}},
+        ]
+        respuesta = self.client.post('/api/v1/sync/', {'cambios': cambios}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['resultados'][0]['error'], 'actualizado inválido')
+        # El resto del lote se aplica
+        self.assertEqual(datos['aplicados'], 1)
+
+    def test_marca_invalida(self):
+        self.assertEqual(self.client.get('/api/v1/sync/', {'marca': 'no-es-una-marca'}).status_code, 400)
+
+
+class BorradoLogicoTests(TestCase):
+    """Archivo de clientes, sucursales, áreas, equipos y activos (Model.objects / Model.todos)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('archivo', password='archivo')
+        cls.cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        cls.sucursal = Sucursal.objects.create(cliente=cls.cliente, nombre='Sucursal')
+        cls.area = cls.sucursal.areas.first()
+        cls.equipo = Equipo.objects.create(area=cls.area, nombre='Equipo')
+        for a in range(3):
+            activo = Activo.objects.create(equipo=cls.equipo, nombre=f'Activo {a}')
+            TermografiaAnalisis.objects.create(activo=activo, fecha_muestreo=date(2024, 1, 1), temperatura_maxima=40)
+
+    def test_archivar_en_cascada(self):
+        self.sucursal.archivar()
+        self.assertFalse(Sucursal.objects.filter(id=self.sucursal.id).exists())
+        self.assertEqual(Area.objects.filter(sucursal=self.sucursal).count(), 0)
+        self.assertEqual(Activo.objects.count(), 0)
+        self.assertEqual(Activo.todos.archivados().count(), 3)
+        # El cliente sigue vigente y los análisis se conservan
+        self.assertTrue(Cliente.objects.filter(id=self.cliente.id).exists())
+        self.assertEqual(TermografiaAnalisis.objects.count(), 3)
+
+        Sucursal.todos.filter(id=self.sucursal.id).restaurar()
+        self.assertEqual(Activo.objects.count(), 3)
+        self.assertEqual(Activo.todos.exclude(archivado=None).count(), 0)
+
+    def test_restaurar_solo_lo_archivado_junto(self):
+        eliminado = Activo.objects.first()
+        eliminado.archivar()
+        self.sucursal.archivar()
+
+        self.sucursal.restaurar()
+        self.assertEqual(Activo.objects.count(), 2)
+        self.assertFalse(Activo.todos.get(id=eliminado.id).activo)
+
+    def test_eliminar_archiva(self):
+        self.client.force_login(self.usuario)
+        url = reverse('eliminar_equipo_vibraciones', args=[self.cliente.id, self.sucursal.id, self.area.id, self.equipo.id])
+        self.client.get(url)
+        self.assertFalse(Equipo.todos.get(id=self.equipo.id).activo)
+        self.assertEqual(Activo.objects.filter(equipo=self.equipo).count(), 0)
+
+        # Crear otro con el mismo nombre reutiliza la fila archivada en vez de chocar
+        # con unique_together; sus activos eliminados no vuelven
+        url = reverse('crear_equipo_vibraciones', args=[self.cliente.id, self.sucursal.id, self.area.id])
+        self.client.post(url, {'nombre': 'Equipo', 'estado': 'bueno', 'clase_maquina': 'clase_ii', 'activo': 'on'})
+        self.assertEqual(list(Equipo.objects.values_list('id', flat=True)), [self.equipo.id])
+        self.assertIsNone(Equipo.objects.get().archivado)
+        self.assertEqual(Activo.objects.filter(equipo=self.equipo).count(), 0)
+
+    def test_reutilizar_sucursal(self):
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('eliminar_sucursal_vibraciones', args=[self.cliente.id, self.sucursal.id]))
+        self.client.post(reverse('crear_sucursal_vibraciones', args=[self.cliente.id]), {'nombre': 'Sucursal', 'activo': 'on'})
+        # Vuelve con sus áreas fijas, vacías
+        self.assertEqual(Area.objects.filter(sucursal=self.sucursal).count(), 3)
+        self.assertEqual(Equipo.objects.count(), 0)
+
+    def test_purgar_archivados(self):
+        # Desactivado desde el formulario: sin cascada
+        Equipo.todos.filter(id=self.equipo.id).update(activo=False)
+        call_command('purgar_archivados', stdout=StringIO())
+        self.assertEqual(Activo.objects.count(), 0)
+        self.assertEqual(Equipo.todos.count(), 1)
+
+        equipo = Equipo.todos.get()
+        self.assertIsNotNone(equipo.archivado)
+        self.assertEqual(set(Activo.todos.values_list('archivado', flat=True)), {equipo.archivado})
+
+        # Una escritura posterior (p. ej. miniaturas) no reinicia el plazo
+        Equipo.todos.update(archivado=timezone.now() - timedelta(days=120))
+        Activo.todos.update(archivado=timezone.now() - timedelta(days=120), actualizado=timezone.now())
+        call_command('purgar_archivados', '--dias', '90', '--simular', stdout=StringIO())
+        self.assertEqual(Equipo.todos.count(), 1)
+        call_command('purgar_archivados', '--dias', '90', stdout=StringIO())
+        self.assertEqual(Equipo.todos.count(), 0)
+        self.assertEqual(Activo.todos.count(), 0)
+        self.assertEqual(TermografiaAnalisis.objects.count(), 0)
+        self.assertEqual(list(Eliminacion.objects.values_list('recurso', 'objeto_id')), [('equipos', self.equipo.id)])
+
+
+class FormasOndaTests(TestCase):
+    """Muestras diarias de vibraciones desde formas de onda (core/espectro.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor', rpm=1480)
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_ejes_subidos_por_separado(self):
+        from .espectro import procesar_formas_onda
+        from .formas_onda import guardar_forma_onda
+
+        fs = 5000
+        t = np.arange(fs) / fs
+        captura = timezone.make_aware(datetime(2024, 3, 1, 10, 0))
+        velocidades = {}
+        # Un request por eje, como la subida desde la app; el mayor es el vertical
+        for minuto, (eje, amplitud) in enumerate((('horizontal', 0.02), ('vertical', 0.05), ('axial', 0.01))):
+            forma = guardar_forma_onda(
+                self.activo, amplitud * np.sin(2 * np.pi * 50 * t), fs,
+                captura + timedelta(minutes=minuto), eje=eje, unidad='g'
+            )
+            velocidades[eje] = procesar_formas_onda([forma])[forma.id]['velocidad_rms']
+
+        muestra = VibracionesAnalisis.objects.get(activo=self.activo)
+        self.assertEqual(muestra.velocidad_rms, max(velocidades.values()))
+        self.assertEqual(muestra.velocidad_rms, velocidades['vertical'])
+        self.assertEqual(muestra.hora_muestreo.minute, 1)
+        self.assertEqual(muestra.formas_onda.count(), 3)
+
+    def test_fecha_captura_invalida(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_login(User.objects.create_user('terreno', password='terreno'))
+        archivo = SimpleUploadedFile('senal.csv', b'0.1,0.2,0.3,0.2')
+        respuesta = self.client.post(reverse('subir_forma_onda', args=[self.activo.id]), {
+            'archivo': archivo, 'frecuencia_muestreo': '5000', 'fecha_captura': '2024-13-45',
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'success': False, 'error': 'fecha_captura inválida'})
+
+
+
+class AlmacenamientoContenidoTests(TestCase):
+    """Almacenamiento por contenido, conteo de referencias y recolección (core/almacenamiento.py)"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def cliente_con_logo(self, nombre, contenido):
+        from django.core.files.base import ContentFile
+
+        cliente = Cliente.objects.create(nombre=nombre, email=f'{nombre}@example.com', ruc_nit=nombre)
+        cliente.logo.save('logo.png', ContentFile(contenido))
+        return cliente
+
+    def test_contenido_duplicado(self):
+        from .almacenamiento import hash_nombre, nombres_en_disco
+        from .models import ArchivoContenido
+
+        uno = self.cliente_con_logo('Uno', b'mismo logo')
+        dos = self.cliente_con_logo('Dos', b'mismo logo')
+        self.assertEqual(uno.logo.name, dos.logo.name)
+        self.assertEqual(ArchivoContenido.objects.get().referencias, 2)
+        self.assertEqual(len(nombres_en_disco(hash_nombre(uno.logo.name))), 1)
+
+    def test_reemplazo_y_borrado_liberan(self):
+        from django.core.files.base import ContentFile
+        from .models import ArchivoContenido
+
+        uno = self.cliente_con_logo('Uno', b'mismo logo')
+        dos = self.cliente_con_logo('Dos', b'mismo logo')
+        compartido = ArchivoContenido.objects.get()
+
+        uno.logo.delete(save=False)
+        uno.logo.save('nuevo.png', ContentFile(b'otro logo'))
+        compartido.refresh_from_db()
+        self.assertEqual(compartido.referencias, 1)
+
+        dos.delete()
+        compartido.refresh_from_db()
+        self.assertEqual(compartido.referencias, 0)
+
+    def test_periodo_de_gracia(self):
+        from .almacenamiento import almacenamiento_contenido, recolectar
+        from .models import ArchivoContenido
+
+        cliente = self.cliente_con_logo('Uno', b'logo')
+        nombre = cliente.logo.name
+        cliente.delete()
+
+        # Recién liberado: una subida en curso aún podría usarlo
+        self.assertEqual(recolectar()['archivos'], 0)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+        ArchivoContenido.objects.update(ultimo_uso=timezone.now() - timedelta(hours=25))
+        self.assertEqual(recolectar()['archivos'], 1)
+        self.assertFalse(almacenamiento_contenido.exists(nombre))
+        self.assertFalse(ArchivoContenido.objects.exists())
+
+    def test_simular_no_modifica_nada(self):
+        from .almacenamiento import almacenamiento_contenido
+        from .models import ArchivoContenido
+
+        vigente = self.cliente_con_logo('Uno', b'logo vigente')
+        sin_uso = self.cliente_con_logo('Dos', b'logo sin uso')
+        nombre = sin_uso.logo.name
+        sin_uso.delete()
+        ArchivoContenido.objects.filter(nombre=nombre).update(ultimo_uso=timezone.now() - timedelta(days=2))
+        # Conteo desfasado que el recuento corregiría
+        ArchivoContenido.objects.filter(nombre=vigente.logo.name).update(referencias=5)
+        antes = list(ArchivoContenido.objects.order_by('id').values_list('hash', 'referencias', 'ultimo_uso'))
+
+        salida = StringIO()
+        call_command('recolectar_media', '--simular', stdout=salida)
+        self.assertIn('1 archivos se borrarían', salida.getvalue())
+        self.assertEqual(list(ArchivoContenido.objects.order_by('id').values_list('hash', 'referencias', 'ultimo_uso')), antes)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+
+class SubidasFragmentadasTests(TestCase):
+    """Subidas fragmentadas y reanudables (core/subidas.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('subidas', password='subidas')
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+
+    def setUp(self):
+        temporal = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temporal, ignore_errors=True)
+        ajustes = override_settings(SUBIDAS_TEMP_DIR=temporal)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.usuario)
+
+    def iniciar(self, tamano):
+        datos = self.client.post(reverse('iniciar_subida'), {
+            'destino': 'foto_termica', 'objeto_id': self.activo.id,
+            'nombre': 'foto.png', 'tipo': 'image/png', 'tamano': tamano,
+        }).json()
+        return datos['subida_id']
+
+    def enviar(self, url, offset, contenido):
+        return self.client.put(f'{url}?offset={offset}', contenido, content_type='application/octet-stream')
+
+    def test_reanudar_desde_el_offset(self):
+        url = reverse('fragmento_subida', args=[self.iniciar(10)])
+        self.assertEqual(self.enviar(url, 0, b'abcd').json()['offset'], 4)
+
+        # Reintento de un fragmento ya confirmado: 409 con el offset correcto
+        respuesta = self.enviar(url, 0, b'abcd')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['offset'], 4)
+
+        self.assertEqual(self.client.get(url).json()['offset'], 4)
+        datos = self.enviar(url, 4, b'efghij').json()
+        self.assertEqual((datos['offset'], datos['completa']), (10, True))
+
+    def test_fragmento_cortado_se_trunca(self):
+        from .models import SubidaFragmentada
+        from .subidas import escribir_fragmento, ruta_temporal
+
+        subida = SubidaFragmentada.objects.get(id=self.iniciar(10))
+        escribir_fragmento(subida.id, 0, BytesIO(b'abcd'), 4)
+        # Un intento anterior cortado dejó bytes sin confirmar tras el offset
+        with open(ruta_temporal(subida), 'ab') as parte:
+            parte.write(b'xxxxxx')
+
+        # Llegan solo 2 de los 6 bytes anunciados
+        subida = escribir_fragmento(subida.id, 4, BytesIO(b'ef'), 6)
+        self.assertEqual(subida.recibido, 6)
+        with open(ruta_temporal(subida), 'rb') as parte:
+            self.assertEqual(parte.read(), b'abcdef')
+
+    def test_finalizar_destino_eliminado(self):
+        subida_id = self.iniciar(10)
+        Activo.objects.filter(id=self.activo.id).delete()
+        respuesta = self.client.post(reverse('finalizar_subida', args=[subida_id]))
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class CacheSucursalTests(TestCase):
+    """Caché por sucursal con versión (core/cache_sucursal.py)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_version_sube_solo_al_confirmar(self):
+        from .cache_sucursal import invalidar_sucursal, version
+
+        inicial = version('sucursal', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_sucursal(1)
+            self.assertEqual(version('sucursal', 1), inicial)
+        self.assertEqual(version('sucursal', 1), inicial + 1)
+
+        # Una transacción revertida no invalida nada
+        with self.captureOnCommitCallbacks() as pendientes:
+            with self.assertRaises(ValueError), transaction.atomic():
+                invalidar_sucursal(1)
+                raise ValueError
+        self.assertEqual(pendientes, [])
+        self.assertEqual(version('sucursal', 1), inicial + 1)
+
+    def test_respuesta_cacheada(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .cache_sucursal import respuesta_cacheada
+
+        llamadas = []
+
+        @respuesta_cacheada()
+        def vista(request, sucursal_id):
+            llamadas.append(request.method)
+            return HttpResponse('ok', status=404 if len(llamadas) == 1 else 200)
+
+        fabrica = RequestFactory()
+        # Solo se guardan las respuestas 200 de GET
+        self.assertEqual(vista(fabrica.get('/x/'), sucursal_id=1).status_code, 404)
+        self.assertEqual(vista(fabrica.get('/x/'), sucursal_id=1).status_code, 200)
+        self.assertEqual(vista(fabrica.get('/x/'), sucursal_id=1).status_code, 200)
+        vista(fabrica.post('/x/'), sucursal_id=1)
+        vista(fabrica.post('/x/'), sucursal_id=1)
+        self.assertEqual(llamadas, ['GET', 'GET', 'POST', 'POST'])
+
+
+class ClaveFilaActivoTests(TestCase):
+    """Clave de caché de la fila de un activo (core/templatetags/fragmentos.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import AnalisisTermico
+
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+        cls.otro = Activo.objects.create(equipo=equipo, nombre='Bomba')
+        cls.analisis = AnalisisTermico.objects.create(activo=cls.activo, temperatura_maxima=40)
+
+    def clave(self, activo):
+        from .templatetags.fragmentos import clave_fila_activo
+
+        # Como en la tabla: equipo y área por select_related, análisis por prefetch
+        activo = Activo.objects.select_related('equipo__area').prefetch_related('analisis_termicos').get(id=activo.id)
+        with self.assertNumQueries(0):
+            return clave_fila_activo(activo)
+
+    def test_cambia_con_lo_que_muestra_la_fila(self):
+        inicial = self.clave(self.activo)
+        self.assertEqual(self.clave(self.activo), inicial)
+
+        area = Area.objects.get(id=self.activo.equipo.area_id)
+        area.save()
+        tras_area = self.clave(self.activo)
+        self.assertNotEqual(tras_area, inicial)
+
+        self.analisis.temperatura_maxima = 70
+        self.analisis.save()
+        self.assertNotEqual(self.clave(self.activo), tras_area)
+
+    def test_editar_otro_activo_no_la_cambia(self):
+        inicial = self.clave(self.activo)
+        self.otro.nombre = 'Bomba 2'
+        self.otro.save()
+        self.assertEqual(self.clave(self.activo), inicial)
+
+
+class RutaMuestreoTests(TestCase):
+    """Planificador de rutas de muestreo (core/rutas.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import MuestreoActivo
+
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        cls.sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        caldera = Equipo.objects.create(area=cls.sucursal.areas.get(nombre='caldera'), nombre='Caldera')
+        aserradero = Equipo.objects.create(area=cls.sucursal.areas.get(nombre='aserradero'), nombre='Sierra')
+        cls.vencido = Activo.objects.create(equipo=caldera, nombre='Bomba', intervalo_muestreo_dias=30)
+        Activo.objects.create(equipo=aserradero, nombre='A sin muestreo', intervalo_muestreo_dias=30)
+        proximo = Activo.objects.create(equipo=aserradero, nombre='B próximo', intervalo_muestreo_dias=30)
+        al_dia = Activo.objects.create(equipo=aserradero, nombre='C al día', intervalo_muestreo_dias=30)
+        for activo, fechas in (
+            (cls.vencido, [date(2024, 1, 1), date(2024, 2, 1)]),
+            (proximo, [date(2024, 2, 20)]),
+            (al_dia, [date(2024, 3, 10)]),
+        ):
+            for fecha in fechas:
+                MuestreoActivo.objects.create(activo=activo, fecha_muestreo=fecha)
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def activos(self, ruta):
+        return [
+            (area['area'], activo['activo'], activo['estado'])
+            for area in ruta['areas'] for equipo in area['equipos'] for activo in equipo['activos']
+        ]
+
+    def test_clasificacion_y_orden(self):
+        from .rutas import planificar_ruta
+
+        ruta = planificar_ruta(self.sucursal, hoy=date(2024, 3, 15))
+        self.assertEqual(self.activos(ruta), [
+            ('aserradero', 'A sin muestreo', 'sin_muestreo'),
+            ('aserradero', 'B próximo', 'proximo'),
+            ('caldera', 'Bomba', 'vencido'),
+        ])
+        self.assertEqual(ruta['totales'], {'sin_muestreo': 1, 'vencido': 1, 'proximo': 1})
+        bomba = ruta['areas'][-1]['equipos'][0]['activos'][0]
+        self.assertEqual((bomba['proximo_muestreo'], bomba['dias_atraso']), ('2024-03-02', 13))
+
+    def test_nuevo_muestreo_invalida_la_cache(self):
+        from .models import MuestreoActivo
+        from .rutas import planificar_ruta
+
+        hoy = date(2024, 3, 15)
+        self.assertEqual(planificar_ruta(self.sucursal, hoy=hoy)['totales']['vencido'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            MuestreoActivo.objects.create(activo=self.vencido, fecha_muestreo=hoy)
+        self.assertEqual(planificar_ruta(self.sucursal, hoy=hoy)['totales']['vencido'], 0)
+
+
+class HistoricoTermicoTests(TestCase):
+    """Histórico de termografías enlazado a la foto del activo (core/historico_termico.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_registrar_enlaza_la_foto(self):
+        from django.core.files.base import ContentFile
+        from .historico_termico import registrar_termografia
+        from .models import ArchivoContenido
+
+        activo = Activo.objects.get(id=self.activo.id)
+        activo.foto_termica.save('foto.jpg', ContentFile(b'primera foto'))
+        primera = activo.foto_termica.name
+        registro = registrar_termografia(activo, 'alarma', 60, 45, 20, porcentaje_zona_alerta=10, porcentaje_zona_critica=5)
+
+        # Misma imagen, una referencia más y ningún byte copiado
+        self.assertEqual(registro.imagen_termica.name, primera)
+        self.assertEqual(ArchivoContenido.objects.get().referencias, 2)
+        self.assertEqual((registro.resultado, registro.porcentaje_zona_buena), ('alerta', 85))
+
+        # Corregir las temperaturas el mismo día actualiza la misma fila
+        registrar_termografia(activo, 'emergencia', 80, 50, 20)
+        self.assertEqual(TermografiaAnalisis.objects.get().resultado, 'critico')
+
+        # Reemplazar la foto agrega una fila y el histórico conserva la anterior
+        activo.foto_termica.delete(save=False)
+        activo.foto_termica.save('foto.jpg', ContentFile(b'segunda foto'))
+        registrar_termografia(activo, 'bueno', 40, 30, 20)
+        self.assertEqual(
+            list(TermografiaAnalisis.objects.order_by('id').values_list('imagen_termica', flat=True)),
+            [primera, activo.foto_termica.name]
+        )
+        self.assertEqual(ArchivoContenido.objects.get(nombre=primera).referencias, 1)
+
+
+def imagen_png(ancho, alto, modo='RGB'):
+    """Bytes de una imagen PNG de prueba"""
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new(modo, (ancho, alto), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class MiniaturasTests(TestCase):
+    """Miniaturas WebP/JPEG junto al original (core/miniaturas.py)"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_generar_miniaturas(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from PIL import Image
+        from .miniaturas import ANCHOS, generar_miniaturas, url_miniatura
+
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        cliente.logo.save('logo.png', ContentFile(imagen_png(900, 300, 'RGBA')))
+        # Mientras no existen se usa el original
+        self.assertEqual(url_miniatura(cliente.logo, 160), cliente.logo.url)
+
+        miniaturas = generar_miniaturas(Cliente, cliente.pk, 'logo')
+        self.assertEqual(miniaturas['original'], cliente.logo.name)
+        for formato in ('webp', 'jpeg'):
+            self.assertEqual(set(miniaturas[formato]), {str(ancho) for ancho in ANCHOS})
+        with default_storage.open(miniaturas['jpeg']['160']) as f, Image.open(f) as imagen:
+            self.assertEqual((imagen.size, imagen.mode), ((160, 53), 'RGB'))
+        # La imagen nunca se agranda
+        with default_storage.open(miniaturas['webp']['1280']) as f, Image.open(f) as imagen:
+            self.assertEqual(imagen.size, (900, 300))
+
+        cliente.refresh_from_db()
+        self.assertEqual(url_miniatura(cliente.logo, 120), default_storage.url(miniaturas['webp']['160']))
+        self.assertEqual(url_miniatura(cliente.logo, 500, 'jpeg'), default_storage.url(miniaturas['jpeg']['640']))
+
+
+class TeselasPlanoTests(TestCase):
+    """Pirámide de teselas del plano de planta (core/teselas.py)"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_piramide_compartida(self):
+        from django.core.files.base import ContentFile
+        from .teselas import fuente_teselas, generar_teselas, ruta_teselas
+
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursales = []
+        for nombre in ('Norte', 'Sur'):
+            sucursal = Sucursal.objects.create(cliente=cliente, nombre=nombre)
+            sucursal.plano_planta.save('plano.png', ContentFile(imagen_png(600, 300)))
+            sucursales.append(sucursal)
+        norte, sur = (generar_teselas(sucursal.pk) for sucursal in sucursales)
+
+        # 600×300 → niveles 10 (3×2 teselas de 256), 9 (2×1) y 8 (1×1)
+        self.assertEqual((norte['nivel_minimo'], norte['nivel_maximo']), (8, 10))
+        ruta = ruta_teselas(norte['hash'])
+        self.assertEqual(
+            {nivel: len(os.listdir(os.path.join(ruta, str(nivel)))) for nivel in (8, 9, 10)},
+            {8: 1, 9: 2, 10: 6}
+        )
+        # El mismo plano en dos sucursales usa una sola carpeta
+        self.assertEqual(sur['hash'], norte['hash'])
+
+        sucursales[0].refresh_from_db()
+        self.assertEqual(fuente_teselas(sucursales[0])['ancho'], 600)
+
+class ListadoTotalVibracionesTests(TestCase):
+    """Listado total de equipos de vibraciones, paginado por activos (core/listados.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('listado', password='listado')
+        cls.cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        cls.sucursal = Sucursal.objects.create(cliente=cls.cliente, nombre='Sucursal')
+        area = cls.sucursal.areas.get(nombre='aserradero')
+        for nombre in ('B con activos', 'D con activos'):
+            equipo = Equipo.objects.create(area=area, nombre=nombre)
+            for a in range(3):
+                Activo.objects.create(equipo=equipo, nombre=f'Activo {a}')
+        for nombre in ('A vacío', 'C vacío'):
+            Equipo.objects.create(area=area, nombre=nombre)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_equipos_sin_activos(self):
+        url = reverse('equipos_totales_vibraciones', args=[self.cliente.id, self.sucursal.id])
+        respuesta = self.client.get(url)
+        self.assertEqual(
+            [equipo.nombre for equipo in respuesta.context['equipos']],
+            ['A vacío', 'B con activos', 'C vacío', 'D con activos']
+        )
+        self.assertContains(respuesta, 'Sin activos registrados en este equipo', count=2)
+        self.assertNotContains(respuesta, 'No hay equipos registrados')
+
+    def test_equipos_sin_activos_en_la_ultima_pagina(self):
+        url = reverse('listado_activos_sucursal', args=[self.sucursal.id])
+        datos = self.client.get(url, {'modulo': 'vibraciones', 'limite': 4}).json()
+        self.assertNotIn('Sin activos registrados', datos['html'])
+        datos = self.client.get(url, {'modulo': 'vibraciones', 'limite': 4, 'cursor': datos['siguiente_cursor']}).json()
+        self.assertIsNone(datos['siguiente_cursor'])
+        self.assertEqual(datos['html'].count('Sin activos registrados en este equipo'), 2)
+        # Con filtro de estado los equipos sin activos no aplican
+        datos = self.client.get(url, {'modulo': 'vibraciones', 'estado': 'alarma'}).json()
+        self.assertNotIn('Sin activos registrados', datos['html'])
+
+
+
+    def test_consultas_no_crecen_con_los_equipos(self):
+        # Una sucursal con un equipo y otra con cinco, cada activo con muestras
+        otra = Sucursal.objects.create(cliente=self.cliente, nombre='Otra sucursal')
+        for sucursal, cantidad in ((self.sucursal, 1), (otra, 5)):
+            area = sucursal.areas.get(nombre='elaborado')
+            for e in range(cantidad):
+                equipo = Equipo.objects.create(area=area, nombre=f'Equipo {e}')
+                for a in range(2):
+                    activo = Activo.objects.create(equipo=equipo, nombre=f'Activo {a}')
+                    for dia in (1, 2):
+                        VibracionesAnalisis.objects.create(activo=activo, fecha_muestreo=date(2024, 3, dia))
+
+        for nombre, argumentos in (
+            ('equipos_vibraciones', lambda s: [self.cliente.id, s.id, s.areas.get(nombre='elaborado').id]),
+            ('equipos_totales_vibraciones', lambda s: [self.cliente.id, s.id]),
+        ):
+            chica = reverse(nombre, args=argumentos(self.sucursal))
+            grande = reverse(nombre, args=argumentos(otra))
+            # Con las cachés de sucursal ya cargadas
+            self.client.get(chica)
+            self.client.get(grande)
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.get(chica)
+            with self.assertNumQueries(len(consultas)):
+                respuesta = self.client.get(grande)
+            self.assertEqual(len(respuesta.context['equipos']), 5)
+
+class MuestrasVibracionTests(TestCase):
+    """Una muestra por activo y fecha (agregar_muestra_vibracion y restricción única)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('muestras', password='muestras')
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+
+    def test_agregar_muestra_retorna_id(self):
+        self.client.force_login(self.usuario)
+        url = reverse('agregar_muestra_vibracion', args=[self.activo.id])
+        datos = {'fecha': '2024-03-01', 'velocidad_rms': '2.5', 'aceleracion': '1', 'resultado': 'bueno'}
+        primera = self.client.post(url, datos).json()
+
+        # Como en MySQL: el upsert no retorna ids
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            segunda = self.client.post(url, {**datos, 'velocidad_rms': '3.5'}).json()
+        muestra = VibracionesAnalisis.objects.get()
+        self.assertEqual(primera['muestra_id'], muestra.id)
+        self.assertEqual(segunda['muestra_id'], muestra.id)
+        self.assertEqual(muestra.velocidad_rms, 3.5)
+
+    def test_ingesta_con_errores_por_fila(self):
+        self.client.force_login(self.usuario)
+        csv = (
+            'activo,fecha,velocidad_rms,aceleracion\n'
+            f'{self.activo.id},2024-03-01,2.5,1\n'
+            f'{self.activo.id},2024-03-02,nan,1\n'
+            f'{self.activo.id},2024-03-03,2.7,inf\n'
+            f'{self.activo.id},03/04/2024,2.8,1\n'
+            '999999,2024-03-05,2.9,1\n'
+            f'{self.activo.id},2024-03-06,"3,1",1\n'
+        )
+        datos = self.client.post(reverse('ingestar_muestras_vibracion'), csv, content_type='text/csv').json()
+
+        # Las filas válidas se guardan; cada inválida se informa con su número
+        self.assertEqual((datos['filas'], datos['guardadas']), (6, 2))
+        self.assertEqual([e['fila'] for e in datos['errores']], [2, 3, 4, 5])
+        self.assertIn('no encontrado', datos['errores'][-1]['error'])
+        self.assertEqual(
+            list(VibracionesAnalisis.objects.order_by('fecha_muestreo').values_list('velocidad_rms', flat=True)),
+            [2.5, 3.1]
+        )
+
+    def test_restriccion_unica(self):
+        VibracionesAnalisis.objects.create(activo=self.activo, fecha_muestreo=date(2024, 3, 1))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VibracionesAnalisis.objects.create(activo=self.activo, fecha_muestreo=date(2024, 3, 1))
+
+
+class MigracionMuestrasDuplicadasTests(TransactionTestCase):
+    """Limpieza de duplicados previa a la restricción única (migración 0022)"""
+
+    def test_eliminar_duplicados(self):
+        from django.apps import apps
+
+        migracion = importlib.import_module('core.migrations.0022_vibracionesanalisis_activo_fecha_unica')
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+
+        # Tabla como antes de la migración, sin la restricción
+        restriccion, = VibracionesAnalisis._meta.constraints
+        with mock.patch.object(VibracionesAnalisis._meta, 'constraints', []), connection.schema_editor() as editor:
+            editor.remove_constraint(VibracionesAnalisis, restriccion)
+        for velocidad in (1.0, 2.0, 3.0):
+            VibracionesAnalisis.objects.create(activo=activo, fecha_muestreo=date(2024, 3, 1), velocidad_rms=velocidad)
+        VibracionesAnalisis.objects.create(activo=activo, fecha_muestreo=date(2024, 3, 2), velocidad_rms=4.0)
+
+        with connection.schema_editor() as editor:
+            migracion.eliminar_duplicados(apps, editor)
+            editor.add_constraint(VibracionesAnalisis, restriccion)
+
+        # Queda la más reciente (mayor id) de cada (activo, fecha)
+        self.assertEqual(
+            sorted(VibracionesAnalisis.objects.values_list('fecha_muestreo', 'velocidad_rms')),
+            [(date(2024, 3, 1), 3.0), (date(2024, 3, 2), 4.0)]
+        )
+
+
+
+class LineaTiempoTests(TestCase):
+    """Línea de tiempo unificada con paginación keyset (core/linea_tiempo.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import AnalisisTermico, MuestreoActivo
+
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+        # Vibraciones y muestreos comparten fechas: el empate se resuelve por (tipo, id)
+        for dia in (1, 2, 3):
+            VibracionesAnalisis.objects.create(activo=cls.activo, fecha_muestreo=date(2024, 3, dia), velocidad_rms=dia)
+            MuestreoActivo.objects.create(activo=cls.activo, fecha_muestreo=date(2024, 3, dia))
+        TermografiaAnalisis.objects.create(activo=cls.activo, fecha_muestreo=date(2024, 3, 2))
+        AnalisisTermico.objects.create(activo=cls.activo)
+
+    def test_una_consulta_por_pagina(self):
+        from .linea_tiempo import linea_tiempo
+
+        with self.assertNumQueries(1):
+            eventos, cursor = linea_tiempo([self.activo.id], limite=3)
+        with self.assertNumQueries(1):
+            linea_tiempo([self.activo.id], cursor=cursor, limite=3)
+        self.assertEqual(len(eventos), 3)
+
+    def test_cursor_con_fechas_empatadas(self):
+        from .linea_tiempo import linea_tiempo
+
+        completa, _ = linea_tiempo([self.activo.id])
+        self.assertEqual(len(completa), 8)
+        # Páginas de a uno cortan entre eventos de distinto tipo con la misma fecha
+        paginada, cursor = [], None
+        while True:
+            eventos, cursor = linea_tiempo([self.activo.id], cursor=cursor, limite=1)
+            paginada += eventos
+            if cursor is None:
+                break
+        self.assertEqual(paginada, completa)
+        self.assertEqual(
+            [(e['fecha'], e['tipo']) for e in completa[1:6]],
+            [('2024-03-03', 'vibraciones'), ('2024-03-03', 'muestreo'),
+             ('2024-03-02', 'vibraciones'), ('2024-03-02', 'termografia'), ('2024-03-02', 'muestreo')]
+        )
+
+class ConexionCaida(locmem.EmailBackend):
+    """Servidor SMTP que rechaza la conexión"""
+
+    def send_messages(self, mensajes):
+        raise ConnectionRefusedError('SMTP no disponible')
+
+
+class AlertasTests(TestCase):
+    """Reglas de alerta y entrega de la bandeja de salida (core/alertas.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente', email='c@example.com', ruc_nit='ruc')
+        sucursal = Sucursal.objects.create(cliente=cliente, nombre='Sucursal')
+        equipo = Equipo.objects.create(area=sucursal.areas.first(), nombre='Equipo')
+        cls.activo = Activo.objects.create(equipo=equipo, nombre='Motor')
+        cls.regla = ReglaAlerta.objects.create(
+            cliente=cliente, nombre='Vibración alta', tipo='umbral', metrica='velocidad_rms',
+            valor=4.0, destinatarios='mantencion@example.com', minutos_antirrebote=0
+        )
+
+    def disparar(self):
+        from .alertas import evaluar_alertas
+        return evaluar_alertas(self.activo, valores={'velocidad_rms': 5.0})
+
+    def test_dispara_en_el_flanco(self):
+        from .alertas import evaluar_alertas
+
+        self.assertEqual(len(self.disparar()), 1)
+        # La condición se mantiene: no se repite
+        self.assertEqual(evaluar_alertas(self.activo, valores={'velocidad_rms': 6.0}), [])
+        self.assertEqual(evaluar_alertas(self.activo, valores={'velocidad_rms': 2.0}), [])
+        # Vuelve a cruzar el umbral: nuevo evento, agrupado en la misma notificación
+        self.assertEqual(len(self.disparar()), 1)
+        self.assertEqual(EventoAlerta.objects.count(), 2)
+        self.assertEqual(NotificacionAlerta.objects.get().eventos.count(), 2)
+
+    def test_ingesta_masiva(self):
+        from .ingesta_vibraciones import ingestar_muestras
+
+        # Se evalúa una vez por activo con su última muestra (la del 2 de marzo)
+        ingestar_muestras([
+            {'activo': self.activo.id, 'fecha': '2024-03-02', 'velocidad_rms': '5.5', 'aceleracion': '1'},
+            {'activo': self.activo.id, 'fecha': '2024-03-01', 'velocidad_rms': '1.0', 'aceleracion': '1'},
+        ])
+        evento = EventoAlerta.objects.get()
+        self.assertEqual(evento.valor, 5.5)
+        self.assertEqual(evento.notificacion.estado, 'pendiente')
+
+    def test_entrega(self):
+        from .alertas import AGRUPACION, entregar_notificaciones
+
+        self.disparar()
+        # Dentro de la ventana de agrupación aún no se envía
+        self.assertEqual(entregar_notificaciones()['enviadas'], 0)
+
+        ahora = timezone.now() + AGRUPACION + timedelta(seconds=1)
+        self.assertEqual(entregar_notificaciones(ahora=ahora), {'enviadas': 1, 'fallidas': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['mantencion@example.com'])
+        self.assertIn('Vibración alta', mail.outbox[0].subject)
+        notificacion = NotificacionAlerta.objects.get()
+        self.assertEqual(notificacion.estado, 'enviada')
+        self.assertIsNotNone(notificacion.enviado)
+
+        self.assertEqual(entregar_notificaciones(ahora=ahora)['enviadas'], 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reintento(self):
+        from .alertas import AGRUPACION, REINTENTO_BASE, entregar_notificaciones
+
+        self.disparar()
+        ahora = timezone.now() + AGRUPACION + timedelta(seconds=1)
+        self.assertEqual(entregar_notificaciones(conexion=ConexionCaida(), ahora=ahora), {'enviadas': 0, 'fallidas': 1})
+        notificacion = NotificacionAlerta.objects.get()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('pendiente', 1))
+        self.assertIn('SMTP no disponible', notificacion.ultimo_error)
+
+        # Espera exponencial antes del reintento
+        self.assertEqual(entregar_notificaciones(ahora=ahora)['enviadas'], 0)
+        self.assertEqual(entregar_notificaciones(ahora=ahora + REINTENTO_BASE * 2 + timedelta(seconds=1))['enviadas'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(NotificacionAlerta.objects.get().estado, 'enviada')
+
+    def test_cambio_de_estado_en_lote_y_sincronizacion(self):
+        ReglaAlerta.objects.create(
+            cliente=self.regla.cliente, nombre='Pasa a alarma', tipo='cambio_estado',
+            estado_destino='alarma', minutos_antirrebote=0
+        )
+        otro = Activo.objects.create(equipo=self.activo.equipo, nombre='Reductor')
+        usuario = User.objects.create_user('alertas', password='alertas')
+
+        self.client.force_login(usuario)
+        cambios = [{'activo_id': self.activo.id, 'estado': 'alarma'}, {'activo_id': otro.id, 'observaciones': 'ok'}]
+        self.client.post(reverse('actualizar_activos_lote'), json.dumps({'cambios': cambios}), content_type='application/json')
+        self.assertEqual(list(EventoAlerta.objects.values_list('activo_id', flat=True)), [self.activo.id])
+
+        api = APIClient()
+        api.force_authenticate(usuario)
+        otro.refresh_from_db()
+        cambio = {'recurso': 'activos', 'id': otro.id, 'actualizado': otro.actualizado.isoformat(), 'campos': {'estado': 'alarma'}}
+        self.assertEqual(api.post('/api/v1/sync/', {'cambios': [cambio]}, format='json').json()['aplicados'], 1)
+        self.assertEqual(EventoAlerta.objects.filter(activo=otro).count(), 1)
+
+
+class EspectroTests(SimpleTestCase):
+    """Métricas de espectro con señales sintéticas (core/espectro.py)"""
+
+    def test_seno_50_hz(self):
+        from .espectro import calcular_metricas
+
+        fs = 5000
+        t = np.arange(2 * fs) / fs
+        # Velocidad de 5 mm/s de pico a 50 Hz: RMS 5/√2, desplazamiento RMS = v / (2πf)
+        senal = 5.0 * np.sin(2 * np.pi * 50 * t)
+        metricas, = calcular_metricas(senal[None, :], fs, unidad='mm_s', rpm=[3000])
+
+        self.assertAlmostEqual(metricas['velocidad_rms'], 5 / np.sqrt(2), delta=0.01)
+        self.assertAlmostEqual(metricas['rms_senal'], 5 / np.sqrt(2), delta=0.01)
+        self.assertAlmostEqual(metricas['factor_cresta'], np.sqrt(2), delta=0.01)
+        self.assertEqual(metricas['frecuencia_dominante'], 50.0)
+        self.assertAlmostEqual(metricas['desplazamiento_rms'], 5 / np.sqrt(2) / (2 * np.pi * 50) * 1000, delta=0.15)
+        # Toda la energía está en 1× (3000 RPM = 50 Hz)
+        self.assertAlmostEqual(metricas['bandas']['1x'], metricas['velocidad_rms'], delta=0.01)
+        self.assertLess(metricas['bandas']['2x'], 0.01)
+
+
+class SeveridadTests(SimpleTestCase):
+    """Clasificación ISO 10816 (core/severidad.py)"""
+
+    def test_limites_de_zona(self):
+        from .severidad import LIMITES_ZONA, clasificar_velocidad, clasificar_velocidades
+
+        limite_b, limite_c, limite_d = LIMITES_ZONA['clase_ii']
+        # El límite pertenece a la zona inferior
+        self.assertEqual(clasificar_velocidad(limite_c, 'clase_ii'), 'observacion')
+        self.assertEqual(clasificar_velocidad(limite_c + 0.01, 'clase_ii'), 'alarma')
+        self.assertEqual(clasificar_velocidad(limite_b, 'clase_ii'), 'bueno')
+        self.assertEqual(clasificar_velocidad(limite_d + 0.01, 'clase_ii'), 'falla')
+        # La misma velocidad según la clase de máquina; sin clase se usa la por defecto
+        self.assertEqual(
+            list(clasificar_velocidades([4.0, 4.0, 4.0, 0, np.nan], ['clase_i', 'clase_iv', None, 'clase_ii', 'clase_ii'])),
+            ['alarma', 'observacion', 'alarma', 'sin_medicion', 'sin_medicion']
+        )
+
+
+class RodamientosTests(SimpleTestCase):
+    """Espectro de envolvente (core/rodamientos.py)"""
+
+    def test_pico_bpfo(self):
+        from .rodamientos import UMBRAL_DB, espectro_envolvente, picos_en_bandas
+
+        fs = 20000
+        t = np.arange(fs) / fs
+        bpfo = 87.3
+        # Resonancia de 3 kHz modulada por los impactos de la pista externa, con ruido
+        ruido = np.random.default_rng(0).normal(0, 0.05, t.size)
+        senal = (1 + 0.8 * np.cos(2 * np.pi * bpfo * t)) * np.sin(2 * np.pi * 3000 * t) + ruido
+
+        frecuencias, amplitud = espectro_envolvente(senal[None, :], fs)
+        centros = np.array([[bpfo, 2 * bpfo, np.nan]])
+        pico, frecuencia_pico = picos_en_bandas(frecuencias, amplitud, centros)
+
+        self.assertAlmostEqual(frecuencia_pico[0, 0], bpfo, delta=1.0)
+        self.assertAlmostEqual(pico[0, 0], 0.8, delta=0.1)
+        self.assertTrue(np.isnan(pico[0, 2]))
+        piso = np.median(amplitud[0, 1:int(3 * bpfo)])
+        self.assertGreater(20 * np.log10(pico[0, 0] / piso), UMBRAL_DB)
+
+
+class TendenciasTests(SimpleTestCase):
+    """Resumen de series (core/tendencias.py)"""
+
+    def test_resumen_por_activo(self):
+        from .tendencias import resumir_series
+
+        fechas = np.array(['2024-01-01', '2024-01-11', '2024-01-21', '2024-01-01', '2024-01-02'], dtype='datetime64[D]')
+        resumen = resumir_series([1, 1, 1, 2, 2], fechas, [1.0, 2.0, 3.0, 5.0, 4.0])
+
+        self.assertEqual(list(resumen['activo_id']), [1, 2])
+        self.assertEqual(list(resumen['num_muestras']), [3, 2])
+        # 1 por cada 10 días y -1 por día
+        np.testing.assert_allclose(resumen['pendiente'], [0.1, -1.0])
+        np.testing.assert_allclose(resumen['tasa_cambio'], [50.0, -20.0])
+        self.assertEqual(list(resumen['valor_maximo']), [3.0, 5.0])
+
+
+class PrediccionTests(SimpleTestCase):
+    """Ajuste de degradación y días hasta el umbral (core/prediccion.py)"""
+
+    def test_cruce_lineal_y_exponencial(self):
+        from .prediccion import ajustar_degradacion
+
+        dias = np.arange(6)
+        fechas = np.concatenate([np.datetime64('2024-01-01') + dias] * 2)
+        lineal = 1.0 + dias          # cruza 10 en el día 9
+        exponencial = 2.0 ** dias    # cruza 64 en el día 6
+        umbrales = {1: 10.0, 2: 64.0}
+
+        ajuste = ajustar_degradacion(
+            np.repeat([1, 2], dias.size), fechas, np.concatenate([lineal, exponencial]),
+            lambda ids: np.array([umbrales[i] for i in ids])
+        )
+        self.assertEqual(list(ajuste['modelo']), ['lineal', 'exponencial'])
+        # Última muestra en el día 5
+        self.assertEqual(list(ajuste['dias_restantes']), [4.0, 1.0])
+        np.testing.assert_allclose(ajuste['r2'], [1.0, 1.0])
+
+    def test_sin_tendencia_creciente(self):
+        from .prediccion import ajustar_degradacion
+
+        fechas = np.datetime64('2024-01-01') + np.arange(5)
+        ajuste = ajustar_degradacion(np.ones(5, dtype=int), fechas, [3.0, 2.5, 2.0, 1.5, 1.0], lambda ids: np.array([4.5]))
+        self.assertTrue(np.isnan(ajuste['dias_restantes'][0]))
+
+
+class AnomaliasTests(SimpleTestCase):
+    """Z-score robusto (core/anomalias.py)"""
+
+    def test_valor_atipico(self):
+        from .anomalias import UMBRAL_Z, evaluar_muestras
+
+        velocidades = [1.0, 1.1, 0.9, 1.0, 1.05, 0.95, 1.0, 5.0]
+        fechas = np.datetime64('2024-01-01') + np.arange(len(velocidades))
+        z_historico, z_hermanos, anomalia = evaluar_muestras(np.ones(8, dtype=int), np.ones(8, dtype=int), fechas, velocidades)
+
+        self.assertEqual(list(anomalia), [False] * 7 + [True])
+        self.assertGreater(z_historico[-1], UMBRAL_Z)
+        # Un solo activo por fecha: no hay hermanos con qué comparar
+        self.assertTrue(np.isnan(z_hermanos).all())
+
+    def test_historial_insuficiente(self):
+        from .anomalias import evaluar_muestras
+
+        fechas = np.datetime64('2024-01-01') + np.arange(3)
+        z_historico, _, anomalia = evaluar_muestras([1, 1, 1], [1, 1, 1], fechas, [1.0, 1.0, 9.0])
+        self.assertTrue(np.isnan(z_historico).all())
+        self.assertFalse(anomalia.any())
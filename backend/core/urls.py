@@ -20,8 +20,14 @@ from .views import (
     actualizar_estado_equipo, actualizar_observacion_equipo, actualizar_estado_activo, actualizar_observacion_activo, actualizar_descripcion_activo, agregar_muestra_vibracion,
     subir_foto_termica, eliminar_foto_termica, obtener_analisis_termico, guardar_temperaturas_activo, guardar_fecha_muestreo, obtener_ultima_fecha_muestreo, configuracion, upload_profile_photo, save_config, subir_plano_planta, subir_logo_cliente,
     guardar_fecha_muestreo_equipo, obtener_ultima_fecha_muestreo_equipo,
+    listado_activos_sucursal, actualizar_activos_lote, ingestar_muestras_vibracion,
+    subir_forma_onda, datos_forma_onda, procesar_formas_onda_vibracion, reclasificar_vibraciones_sucursal,
+    rodamientos_activo, analisis_rodamientos_equipo, calcular_tendencias_vibraciones_termografias,
+    predicciones_sucursal, ruta_muestreo_sucursal, linea_tiempo_activos,
+    iniciar_subida, fragmento_subida, finalizar_subida, plano_sucursal, punto_plano,
 )
 from .views_debug import test_upload_sin_autenticacion
+from . import api
 
 urlpatterns = [
     path("", welcome, name="welcome"),
@@ -116,10 +122,23 @@ urlpatterns = [
     path("api/equipo/<int:equipo_id>/actualizar-observacion/", actualizar_observacion_equipo, name="actualizar_observacion_equipo"),
     path("api/equipo/<int:equipo_id>/guardar-fecha-muestreo/", guardar_fecha_muestreo_equipo, name="guardar_fecha_muestreo_equipo"),
     path("api/equipo/<int:equipo_id>/obtener-ultima-fecha/", obtener_ultima_fecha_muestreo_equipo, name="obtener_ultima_fecha_muestreo_equipo"),
+    path("api/activos/actualizar-lote/", actualizar_activos_lote, name="actualizar_activos_lote"),
     path("api/activo/<int:activo_id>/actualizar-estado/", actualizar_estado_activo, name="actualizar_estado_activo"),
     path("api/activo/<int:activo_id>/actualizar-observacion/", actualizar_observacion_activo, name="actualizar_observacion_activo"),
     path("api/activo/<int:activo_id>/actualizar-descripcion/", actualizar_descripcion_activo, name="actualizar_descripcion_activo"),
     path("api/activo/<int:activo_id>/agregar-muestra-vibracion/", agregar_muestra_vibracion, name="agregar_muestra_vibracion"),
+    path("api/vibraciones/ingesta/", ingestar_muestras_vibracion, name="ingestar_muestras_vibracion"),
+    path("api/sucursal/<int:sucursal_id>/reclasificar-vibraciones/", reclasificar_vibraciones_sucursal, name="reclasificar_vibraciones_sucursal"),
+    path("api/sucursal/<int:sucursal_id>/calcular-tendencias/", calcular_tendencias_vibraciones_termografias, name="calcular_tendencias_sucursal"),
+    path("api/sucursal/<int:sucursal_id>/predicciones/", predicciones_sucursal, name="predicciones_sucursal"),
+    path("api/sucursal/<int:sucursal_id>/ruta-muestreo/", ruta_muestreo_sucursal, name="ruta_muestreo_sucursal"),
+    path("api/activo/<int:activo_id>/forma-onda/", subir_forma_onda, name="subir_forma_onda"),
+    path("api/forma-onda/<int:forma_id>/datos/", datos_forma_onda, name="datos_forma_onda"),
+    path("api/activo/<int:activo_id>/linea-tiempo/", linea_tiempo_activos, name="linea_tiempo_activo"),
+    path("api/activos/linea-tiempo/", linea_tiempo_activos, name="linea_tiempo_activos"),
+    path("api/activo/<int:activo_id>/rodamientos/", rodamientos_activo, name="rodamientos_activo"),
+    path("api/equipo/<int:equipo_id>/analisis-rodamientos/", analisis_rodamientos_equipo, name="analisis_rodamientos_equipo"),
+    path("api/vibraciones/procesar-formas-onda/", procesar_formas_onda_vibracion, name="procesar_formas_onda_vibracion"),
     path("api/activo/<int:activo_id>/guardar-fecha-muestreo/", guardar_fecha_muestreo, name="guardar_fecha_muestreo"),
     path("api/activo/<int:activo_id>/obtener-ultima-fecha/", obtener_ultima_fecha_muestreo, name="obtener_ultima_fecha_muestreo"),
     path("api/activo/<int:activo_id>/subir-foto-termica/", subir_foto_termica, name="subir_foto_termica"),
@@ -127,8 +146,19 @@ urlpatterns = [
     path("api/activo/<int:activo_id>/obtener-analisis/", obtener_analisis_termico, name="obtener_analisis_termico"),
     path("api/activo/<int:activo_id>/guardar-temperaturas/", guardar_temperaturas_activo, name="guardar_temperaturas_activo"),
     path("api/sucursal/<int:sucursal_id>/subir-plano/", subir_plano_planta, name="subir_plano_planta"),
+    path("api/sucursal/<int:sucursal_id>/plano/", plano_sucursal, name="plano_sucursal"),
+    path("api/sucursal/<int:sucursal_id>/plano/puntos/<int:activo_id>/", punto_plano, name="punto_plano"),
+    path("api/subidas/", iniciar_subida, name="iniciar_subida"),
+    path("api/subidas/<uuid:subida_id>/", fragmento_subida, name="fragmento_subida"),
+    path("api/subidas/<uuid:subida_id>/finalizar/", finalizar_subida, name="finalizar_subida"),
+    path("api/sucursal/<int:sucursal_id>/activos/", listado_activos_sucursal, name="listado_activos_sucursal"),
     path("api/cliente/<int:cliente_id>/subir-logo/", subir_logo_cliente, name="subir_logo_cliente"),
     
+    # API REST de lectura (core/api.py)
+    path("api/v1/sync/", api.sincronizar, name="api_sincronizar"),
+    path("api/v1/<str:recurso>/", api.listado, name="api_listado"),
+    path("api/v1/<str:recurso>/<int:objeto_id>/", api.detalle, name="api_detalle"),
+    
     # DEBUG: Endpoint de prueba sin autenticación
     path("api/debug/activo/<int:activo_id>/test-upload/", test_upload_sin_autenticacion, name="test_upload_debug"),
     
@@ -4,12 +4,32 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.template.loader import render_to_string
+from django.db import models, transaction
+from django.utils import timezone
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import Cliente, Sucursal, Area, Equipo, Activo, MuestreoActivo, TermografiaAnalisis, VibracionesAnalisis
+from .models import Cliente, Sucursal, Area, Equipo, Activo, MuestreoActivo, TermografiaAnalisis, VibracionesAnalisis, FormaOnda, Rodamiento, TendenciaActivo, PrediccionActivo
 from .forms import ClienteForm, SucursalForm, AreaForm, EquipoForm, ActivoForm, ExcelUploadForm
 from .excel_parser import ExcelEquiposParser
+from .ingesta_vibraciones import ingestar_muestras, leer_csv, upsert_muestras
+from .espectro import procesar_formas_onda
+from .severidad import reclasificar_sucursal
+from .rodamientos import analizar_rodamientos_equipo
+from .tendencias import calcular_tendencias, calcular_tendencias_sucursal
+from .prediccion import calcular_predicciones_sucursal
+from .anomalias import detectar_anomalias
+from .alertas import evaluar_alertas
+from .historico_termico import registrar_termografia, matriz_historico
+from .cache_sucursal import cacheado, invalidar_activos, respuesta_cacheada
+from .rutas import planificar_ruta, HORIZONTE_PROXIMOS
+from .linea_tiempo import linea_tiempo, FUENTES as FUENTES_LINEA_TIEMPO
+from .formas_onda import guardar_forma_onda, leer_senal_subida, tramo_senal, reducir_para_grafico, MAX_PUNTOS_GRAFICO
+from .listados import (
+    activos_sucursal, filtrar_activos, filtros_desde_request, paginar_activos,
+    obtener_limite, agrupar_por_equipo, equipos_sin_activos, serializar_activo, CursorInvalido,
+)
 import tempfile
 import json
 import csv
@@ -29,6 +49,34 @@ def ordenar_areas(areas):
     return sorted(areas, key=lambda a: AREA_ORDER.get(a.nombre, 999))
 
 
+def prefetch_activos_vibraciones():
+    """
+    Prefetch del árbol equipo → activos vigentes (ordenados por nombre en la BD),
+    cada activo con su última muestra de vibraciones.
+    Deja `equipo.activos_vigentes` y `activo.ultimas_muestras_vibracion` (0 o 1 elemento),
+    de modo que el listado completo se resuelve en un número fijo de consultas.
+    """
+    activos = Activo.objects.filter(activo=True).order_by('nombre').prefetch_related(
+        prefetch_ultima_muestra_vibracion()
+    )
+    return models.Prefetch('activos', queryset=activos, to_attr='activos_vigentes')
+
+
+def prefetch_ultima_muestra_vibracion():
+    """Prefetch de la última muestra de vibraciones de cada activo en `activo.ultimas_muestras_vibracion`"""
+    ultima_muestra = VibracionesAnalisis.objects.order_by('-fecha_muestreo', '-id')[:1]
+    return models.Prefetch('analisis_vibraciones_historico', queryset=ultima_muestra, to_attr='ultimas_muestras_vibracion')
+
+
+def prefetch_tendencia(tipo):
+    """Prefetch del resumen de tendencia (TendenciaActivo) del tipo indicado en activo.tendencia"""
+    return models.Prefetch(
+        'tendencias',
+        queryset=TendenciaActivo.objects.filter(tipo=tipo),
+        to_attr='tendencia'
+    )
+
+
 def welcome(request):
     """Página de bienvenida y login del portal"""
     if request.method == "POST":
@@ -137,7 +185,7 @@ def editar_cliente_vibraciones(request, cliente_id):
 def eliminar_cliente_vibraciones(request, cliente_id):
     """Eliminar cliente desde módulo de vibraciones"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
-    cliente.delete()
+    cliente.archivar()
     return redirect('vibraciones')
 
 
@@ -201,7 +249,7 @@ def editar_cliente_termografias(request, cliente_id):
 def eliminar_cliente_termografias(request, cliente_id):
     """Eliminar cliente desde módulo de termografías"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
-    cliente.delete()
+    cliente.archivar()
     return redirect('termografias')
 
 
@@ -210,7 +258,8 @@ def eliminar_cliente_termografias(request, cliente_id):
 def sucursales_vibraciones(request, cliente_id):
     """Página de sucursales para vibraciones"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
-    sucursales = cliente.sucursales.filter(activo=True).order_by('nombre')
+    sucursales = cacheado('cliente', cliente.id, 'sucursales',
+                          lambda: list(cliente.sucursales.filter(activo=True).order_by('nombre')))
     context = {
         'user': request.user,
         'cliente': cliente,
@@ -232,6 +281,8 @@ def crear_sucursal_vibraciones(request, cliente_id):
         if form.is_valid():
             sucursal = form.save(commit=False)
             sucursal.cliente = cliente
+            # Una sucursal eliminada con el mismo nombre se restaura
+            sucursal.reutilizar_archivado('cliente', 'nombre')
             sucursal.save()
             return redirect('sucursales_vibraciones', cliente_id=cliente_id)
     else:
@@ -275,7 +326,7 @@ def eliminar_sucursal_vibraciones(request, cliente_id, sucursal_id):
     """Eliminar sucursal desde módulo de vibraciones"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
-    sucursal.delete()
+    sucursal.archivar()
     return redirect('sucursales_vibraciones', cliente_id=cliente_id)
 
 
@@ -284,7 +335,8 @@ def eliminar_sucursal_vibraciones(request, cliente_id, sucursal_id):
 def sucursales_termografias(request, cliente_id):
     """Página de sucursales para termografías"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
-    sucursales = cliente.sucursales.filter(activo=True).order_by('nombre')
+    sucursales = cacheado('cliente', cliente.id, 'sucursales',
+                          lambda: list(cliente.sucursales.filter(activo=True).order_by('nombre')))
     context = {
         'user': request.user,
         'cliente': cliente,
@@ -306,6 +358,8 @@ def crear_sucursal_termografias(request, cliente_id):
         if form.is_valid():
             sucursal = form.save(commit=False)
             sucursal.cliente = cliente
+            # Una sucursal eliminada con el mismo nombre se restaura
+            sucursal.reutilizar_archivado('cliente', 'nombre')
             sucursal.save()
             return redirect('sucursales_termografias', cliente_id=cliente_id)
     else:
@@ -349,7 +403,7 @@ def eliminar_sucursal_termografias(request, cliente_id, sucursal_id):
     """Eliminar sucursal desde módulo de termografías"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
-    sucursal.delete()
+    sucursal.archivar()
     return redirect('sucursales_termografias', cliente_id=cliente_id)
 
 
@@ -359,8 +413,7 @@ def areas_vibraciones(request, cliente_id, sucursal_id):
     """Página de áreas para vibraciones"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
-    areas = sucursal.areas.filter(activo=True)
-    areas = ordenar_areas(areas)
+    areas = cacheado('sucursal', sucursal.id, 'areas', lambda: ordenar_areas(sucursal.areas.filter(activo=True)))
     context = {
         'user': request.user,
         'cliente': cliente,
@@ -375,33 +428,25 @@ def areas_vibraciones(request, cliente_id, sucursal_id):
 
 @login_required(login_url='login')
 def equipos_totales_vibraciones(request, cliente_id, sucursal_id):
-    """Página de TODOS los equipos de una sucursal (sin filtro de área)"""
-    from django.db.models import Case, When
-    
+    """Página de TODOS los equipos de una sucursal (sin filtro de área), paginada por activos"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     
-    # Obtener todos los equipos de la sucursal (a través de áreas)
-    # Ordenar por el orden definido en AREA_CHOICES: aserradero, elaborado, caldera
-    equipos = Equipo.objects.filter(
-        area__sucursal=sucursal,
-        activo=True
-    ).select_related(
-        'area'
-    ).annotate(
-        area_orden=Case(
-            When(area__nombre='aserradero', then=0),
-            When(area__nombre='elaborado', then=1),
-            When(area__nombre='caldera', then=2),
-            default=3,
-            output_field=models.IntegerField()
-        )
-    ).order_by('area_orden', 'nombre')
+    # Activos de la sucursal ordenados por área (aserradero, elaborado, caldera), equipo y nombre.
+    # Solo se renderiza la primera página; el resto se carga incrementalmente vía listado_activos_sucursal
+    filtros = filtros_desde_request(request)
+    activos = filtrar_activos(activos_sucursal(sucursal), **filtros).prefetch_related(
+        prefetch_ultima_muestra_vibracion()
+    )
+    activos_pagina, siguiente_cursor = paginar_activos(activos)
+    # Los equipos sin activos se muestran (con su fila "Sin activos") en la última página
+    sin_activos = equipos_sin_activos(sucursal, **filtros) if siguiente_cursor is None else ()
+    equipos = agrupar_por_equipo(activos_pagina, sin_activos)
     
     # Calcular estadísticas
     areas = Area.objects.filter(sucursal=sucursal).distinct().count()
-    equipos_count = equipos.count()
-    activos_count = Activo.objects.filter(equipo__area__sucursal=sucursal, activo=True).count()
+    equipos_count = Equipo.objects.filter(area__sucursal=sucursal, activo=True).count()
+    activos_count = activos.count()
     
     context = {
         'user': request.user,
@@ -414,7 +459,11 @@ def equipos_totales_vibraciones(request, cliente_id, sucursal_id):
         'es_listado_total': True,  # Bandera para indicar que es un listado total
         'total_areas': areas,
         'total_equipos': equipos_count,
-        'total_activos': activos_count
+        'total_activos': activos_count,
+        'siguiente_cursor': siguiente_cursor,
+        'filtros': filtros,
+        'estado_choices': Activo.ESTADO_CHOICES,
+        'area_choices': Area.AREA_CHOICES,
     }
     return render(request, 'core/equipos.html', context)
 
@@ -451,7 +500,7 @@ def eliminar_area_vibraciones(request, cliente_id, sucursal_id, area_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
-    area.delete()
+    area.archivar()
     return redirect('areas_vibraciones', cliente_id=cliente_id, sucursal_id=sucursal_id)
 
 
@@ -461,8 +510,7 @@ def areas_termografias(request, cliente_id, sucursal_id):
     """Página de áreas para termografías"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
-    areas = sucursal.areas.filter(activo=True)
-    areas = ordenar_areas(areas)
+    areas = cacheado('sucursal', sucursal.id, 'areas', lambda: ordenar_areas(sucursal.areas.filter(activo=True)))
     context = {
         'user': request.user,
         'cliente': cliente,
@@ -477,29 +525,15 @@ def areas_termografias(request, cliente_id, sucursal_id):
 
 @login_required(login_url='login')
 def activos_totales_termografias(request, cliente_id, sucursal_id):
-    """Página de TODOS los activos de una sucursal (sin filtro de área)"""
-    from django.db.models import Case, When
-    
+    """Página de TODOS los activos de una sucursal (sin filtro de área), paginada"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     
-    # Obtener todos los activos de la sucursal (a través de equipos)
-    # Ordenar por el orden definido en AREA_CHOICES: aserradero, elaborado, caldera
-    activos = Activo.objects.filter(
-        equipo__area__sucursal=sucursal,
-        activo=True
-    ).select_related(
-        'equipo',
-        'equipo__area'
-    ).annotate(
-        area_orden=Case(
-            When(equipo__area__nombre='aserradero', then=0),
-            When(equipo__area__nombre='elaborado', then=1),
-            When(equipo__area__nombre='caldera', then=2),
-            default=3,
-            output_field=models.IntegerField()
-        )
-    ).order_by('area_orden', 'equipo__nombre', 'nombre')
+    # Activos de la sucursal ordenados por área (aserradero, elaborado, caldera), equipo y nombre.
+    # Solo se renderiza la primera página; el resto se carga incrementalmente vía listado_activos_sucursal
+    filtros = filtros_desde_request(request)
+    activos = filtrar_activos(activos_sucursal(sucursal), **filtros).prefetch_related('analisis_termicos')
+    activos_pagina, siguiente_cursor = paginar_activos(activos)
     
     # Calcular estadísticas
     areas = Area.objects.filter(sucursal=sucursal).distinct().count()
@@ -510,7 +544,7 @@ def activos_totales_termografias(request, cliente_id, sucursal_id):
         'user': request.user,
         'cliente': cliente,
         'sucursal': sucursal,
-        'activos': activos,
+        'activos': activos_pagina,
         'modulo': 'termografias',
         'titulo': f'Todos los Activos - {sucursal.nombre}',
         'descripcion': 'Listado total de todos los activos monitorados en esta planta',
@@ -518,7 +552,10 @@ def activos_totales_termografias(request, cliente_id, sucursal_id):
         'total_areas': areas,
         'total_equipos': equipos,
         'total_activos': activos_count,
-        'modulo': 'termografias'
+        'siguiente_cursor': siguiente_cursor,
+        'filtros': filtros,
+        'estado_choices': Activo.ESTADO_CHOICES,
+        'area_choices': Area.AREA_CHOICES,
     }
     return render(request, 'core/activos.html', context)
 
@@ -555,7 +592,7 @@ def eliminar_area_termografias(request, cliente_id, sucursal_id, area_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
-    area.delete()
+    area.archivar()
     return redirect('areas_termografias', cliente_id=cliente_id, sucursal_id=sucursal_id)
 
 
@@ -564,6 +601,66 @@ def health(request):
     return Response({"status": "ok", "service": "vyc-predictivo-cloud"})
 
 
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+def listado_activos_sucursal(request, sucursal_id):
+    """
+    Listado paginado de los activos de una sucursal (JSON)
+    Parámetros GET: cursor, limite, estado, area, q.
+    Con modulo=vibraciones|termografias incluye además las filas renderizadas (html)
+    para que los listados totales las agreguen a la tabla.
+    """
+    sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+    modulo = request.GET.get('modulo', '')
+    
+    try:
+        filtros = filtros_desde_request(request)
+        activos = filtrar_activos(activos_sucursal(sucursal), **filtros)
+        if modulo == 'vibraciones':
+            activos = activos.prefetch_related(prefetch_ultima_muestra_vibracion())
+        elif modulo == 'termografias':
+            activos = activos.prefetch_related('analisis_termicos')
+        
+        try:
+            pagina, siguiente_cursor = paginar_activos(
+                activos,
+                cursor=request.GET.get('cursor') or None,
+                limite=obtener_limite(request.GET.get('limite'))
+            )
+        except CursorInvalido:
+            return JsonResponse({'success': False, 'error': 'Cursor inválido'}, status=400)
+        
+        data = {
+            'success': True,
+            'activos': [serializar_activo(activo) for activo in pagina],
+            'siguiente_cursor': siguiente_cursor,
+        }
+        
+        if modulo in ('vibraciones', 'termografias'):
+            try:
+                desde = max(0, int(request.GET.get('desde', 0)))
+            except ValueError:
+                desde = 0
+            context = {
+                'cliente': sucursal.cliente,
+                'sucursal': sucursal,
+                'modulo': modulo,
+                'desde': desde,
+            }
+            if modulo == 'vibraciones':
+                sin_activos = equipos_sin_activos(sucursal, **filtros) if siguiente_cursor is None else ()
+                context['equipos'] = agrupar_por_equipo(pagina, sin_activos)
+                template = 'core/partials/filas_equipos_vibraciones.html'
+            else:
+                context['activos'] = pagina
+                template = 'core/partials/filas_activos.html'
+            data['html'] = render_to_string(template, context, request=request)
+        
+        return JsonResponse(data)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 # EQUIPOS - VIBRACIONES
 @login_required(login_url='login')
 def equipos_vibraciones(request, cliente_id, sucursal_id, area_id):
@@ -571,7 +668,11 @@ def equipos_vibraciones(request, cliente_id, sucursal_id, area_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
-    equipos = area.equipos.filter(activo=True).order_by('nombre')
+    equipos = area.equipos.filter(activo=True).select_related(
+        'area'
+    ).prefetch_related(
+        prefetch_activos_vibraciones()
+    ).order_by('nombre')
     
     context = {
         'user': request.user,
@@ -598,6 +699,8 @@ def crear_equipo_vibraciones(request, cliente_id, sucursal_id, area_id):
         if form.is_valid():
             equipo = form.save(commit=False)
             equipo.area = area
+            # Un equipo eliminado con el mismo nombre se restaura
+            equipo.reutilizar_archivado('area', 'nombre')
             equipo.save()
             return redirect('equipos_vibraciones', cliente_id=cliente_id, sucursal_id=sucursal_id, area_id=area_id)
     else:
@@ -649,7 +752,7 @@ def eliminar_equipo_vibraciones(request, cliente_id, sucursal_id, area_id, equip
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
     equipo = get_object_or_404(Equipo, id=equipo_id, area=area)
-    equipo.delete()
+    equipo.archivar()
     return redirect('equipos_vibraciones', cliente_id=cliente_id, sucursal_id=sucursal_id, area_id=area_id)
 
 
@@ -661,7 +764,7 @@ def activos_vibraciones(request, cliente_id, sucursal_id, area_id, equipo_id):
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
     equipo = get_object_or_404(Equipo, id=equipo_id, area=area)
-    activos = equipo.activos.filter(activo=True).order_by('nombre')
+    activos = equipo.activos.filter(activo=True).select_related('equipo__area').prefetch_related('analisis_termicos').order_by('nombre')
     
     context = {
         'user': request.user,
@@ -757,7 +860,7 @@ def eliminar_activo_vibraciones(request, cliente_id, sucursal_id, area_id, equip
     # Verificar si viene del listado total
     es_listado_total = request.GET.get('listado_total') == '1'
     
-    activo.delete()
+    activo.archivar()
     
     # Redirigir al listado total si viene de allí, sino a activos por área
     if es_listado_total:
@@ -895,7 +998,7 @@ def equipos_termografias(request, cliente_id, sucursal_id, area_id):
     activos = Activo.objects.filter(
         equipo__area=area,
         activo=True
-    ).select_related('equipo', 'equipo__area').order_by('equipo__nombre', 'nombre')
+    ).select_related('equipo', 'equipo__area').prefetch_related('analisis_termicos').order_by('equipo__nombre', 'nombre')
     
     context = {
         'user': request.user,
@@ -922,6 +1025,8 @@ def crear_equipo_termografias(request, cliente_id, sucursal_id, area_id):
         if form.is_valid():
             equipo = form.save(commit=False)
             equipo.area = area
+            # Un equipo eliminado con el mismo nombre se restaura
+            equipo.reutilizar_archivado('area', 'nombre')
             equipo.save()
             return redirect('equipos_termografias', cliente_id=cliente_id, sucursal_id=sucursal_id, area_id=area_id)
     else:
@@ -973,7 +1078,7 @@ def eliminar_equipo_termografias(request, cliente_id, sucursal_id, area_id, equi
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
     equipo = get_object_or_404(Equipo, id=equipo_id, area=area)
-    equipo.delete()
+    equipo.archivar()
     return redirect('equipos_termografias', cliente_id=cliente_id, sucursal_id=sucursal_id, area_id=area_id)
 
 
@@ -985,7 +1090,7 @@ def activos_termografias(request, cliente_id, sucursal_id, area_id, equipo_id):
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
     equipo = get_object_or_404(Equipo, id=equipo_id, area=area)
-    activos = equipo.activos.filter(activo=True).order_by('nombre')
+    activos = equipo.activos.filter(activo=True).select_related('equipo__area').prefetch_related('analisis_termicos').order_by('nombre')
     
     context = {
         'user': request.user,
@@ -1069,7 +1174,7 @@ def eliminar_activo_termografias(request, cliente_id, sucursal_id, area_id, equi
     area = get_object_or_404(Area, id=area_id, sucursal=sucursal)
     equipo = get_object_or_404(Equipo, id=equipo_id, area=area)
     activo = get_object_or_404(Activo, id=activo_id, equipo=equipo)
-    activo.delete()
+    activo.archivar()
     return redirect('activos_termografias', cliente_id=cliente_id, sucursal_id=sucursal_id, area_id=area_id, equipo_id=equipo_id)
 
 
@@ -1106,7 +1211,7 @@ def eliminar_activo_total_termografias(request, cliente_id, sucursal_id, activo_
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     activo = get_object_or_404(Activo, id=activo_id, equipo__area__sucursal=sucursal)
-    activo.delete()
+    activo.archivar()
     return redirect('activos_totales_termografias', cliente_id=cliente_id, sucursal_id=sucursal_id)
 
 
@@ -1143,7 +1248,7 @@ def eliminar_activo_total_vibraciones(request, cliente_id, sucursal_id, activo_i
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     activo = get_object_or_404(Activo, id=activo_id, equipo__area__sucursal=sucursal)
-    activo.delete()
+    activo.archivar()
     return redirect('equipos_totales_vibraciones', cliente_id=cliente_id, sucursal_id=sucursal_id)
 
 
@@ -1294,8 +1399,10 @@ def actualizar_estado_activo(request, activo_id):
         nuevo_estado = request.POST.get('estado')
         
         if nuevo_estado in dict(Activo.ESTADO_CHOICES):
+            estado_anterior = activo.estado
             activo.estado = nuevo_estado
             activo.save()
+            evaluar_alertas(activo, estado_anterior=estado_anterior)
             return JsonResponse({
                 'success': True,
                 'estado': activo.get_estado_display()
@@ -1358,6 +1465,118 @@ def actualizar_descripcion_activo(request, activo_id):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+# Máximo de cambios aceptados por request en la actualización masiva
+MAX_CAMBIOS_LOTE = 1000
+
+
+@require_http_methods(["POST"])
+@login_required
+def actualizar_activos_lote(request):
+    """
+    Actualiza estado/observaciones/descripción de muchos activos en una sola request.
+    Body JSON: {"cambios": [{"activo_id": 1, "estado": "bueno", "observaciones": "...", "descripcion": "..."}, ...]}
+    Los cambios válidos se aplican con bulk_update en una transacción; se retorna el resultado por ítem.
+    """
+    try:
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+        
+        cambios = data.get('cambios') if isinstance(data, dict) else data
+        if not isinstance(cambios, list) or not cambios:
+            return JsonResponse({'success': False, 'error': 'Se requiere una lista de cambios'}, status=400)
+        if len(cambios) > MAX_CAMBIOS_LOTE:
+            return JsonResponse({'success': False, 'error': f'Máximo {MAX_CAMBIOS_LOTE} cambios por request'}, status=400)
+        
+        estados_validos = dict(Activo.ESTADO_CHOICES)
+        max_observaciones = Activo._meta.get_field('observaciones').max_length
+        
+        ids = []
+        for cambio in cambios:
+            if isinstance(cambio, dict):
+                try:
+                    ids.append(int(cambio.get('activo_id')))
+                except (TypeError, ValueError):
+                    pass
+        activos = Activo.objects.in_bulk(ids)
+        
+        resultados = []
+        modificados = {}
+        estados_anteriores = {}
+        campos = set()
+        ahora = timezone.now()
+        
+        for indice, cambio in enumerate(cambios):
+            if not isinstance(cambio, dict):
+                resultados.append({'indice': indice, 'success': False, 'error': 'Cambio inválido'})
+                continue
+            
+            activo_id = cambio.get('activo_id')
+            try:
+                activo = activos.get(int(activo_id))
+            except (TypeError, ValueError):
+                activo = None
+            if activo is None:
+                resultados.append({'indice': indice, 'activo_id': activo_id, 'success': False, 'error': 'Activo no encontrado'})
+                continue
+            
+            estado = cambio.get('estado')
+            observaciones = cambio.get('observaciones')
+            descripcion = cambio.get('descripcion')
+            
+            if estado is None and observaciones is None and descripcion is None:
+                resultados.append({'indice': indice, 'activo_id': activo.id, 'success': False, 'error': 'Sin campos para actualizar'})
+                continue
+            if estado is not None and estado not in estados_validos:
+                resultados.append({'indice': indice, 'activo_id': activo.id, 'success': False, 'error': 'Estado inválido'})
+                continue
+            if observaciones is not None and len(str(observaciones)) > max_observaciones:
+                resultados.append({'indice': indice, 'activo_id': activo.id, 'success': False, 'error': f'Observaciones exceden {max_observaciones} caracteres'})
+                continue
+            
+            if estado is not None:
+                # El primero: un activo puede venir más de una vez en el lote
+                estados_anteriores.setdefault(activo.id, activo.estado)
+                activo.estado = estado
+                campos.add('estado')
+            if observaciones is not None:
+                activo.observaciones = str(observaciones)
+                campos.add('observaciones')
+            if descripcion is not None:
+                activo.descripcion = str(descripcion)
+                campos.add('descripcion')
+            
+            # bulk_update no aplica auto_now
+            activo.actualizado = ahora
+            modificados[activo.id] = activo
+            resultados.append({
+                'indice': indice,
+                'activo_id': activo.id,
+                'success': True,
+                'estado': activo.get_estado_display(),
+                'observacion': activo.observaciones,
+                'descripcion': activo.descripcion,
+            })
+        
+        if modificados:
+            with transaction.atomic():
+                Activo.objects.bulk_update(list(modificados.values()), sorted(campos | {'actualizado'}))
+                invalidar_activos(modificados)
+            # Reglas de cambio de estado, como en actualizar_estado_activo
+            for activo_id, estado_anterior in estados_anteriores.items():
+                evaluar_alertas(modificados[activo_id], estado_anterior=estado_anterior)
+        
+        return JsonResponse({
+            'success': True,
+            'actualizados': len(modificados),
+            'errores': sum(1 for r in resultados if not r['success']),
+            'resultados': resultados,
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 @require_http_methods(["POST"])
 @login_required
 def agregar_muestra_vibracion(request, activo_id):
@@ -1392,15 +1611,28 @@ def agregar_muestra_vibracion(request, activo_id):
             activo.save()
         
         # Crear o actualizar muestra (en caso de que ya exista para esa fecha)
-        muestra, created = VibracionesAnalisis.objects.update_or_create(
+        muestra = VibracionesAnalisis(
             activo=activo,
             fecha_muestreo=fecha,
-            defaults={
-                'velocidad_rms': float(velocidad_rms) if velocidad_rms else 0,
-                'aceleracion': float(aceleracion) if aceleracion else 0,
-                'resultado': resultado,
-                'observaciones': observaciones
-            }
+            velocidad_rms=float(velocidad_rms) if velocidad_rms else 0,
+            aceleracion=float(aceleracion) if aceleracion else 0,
+            resultado=resultado,
+            observaciones=observaciones
+        )
+        upsert_muestras(
+            [muestra],
+            campos=['velocidad_rms', 'aceleracion', 'resultado', 'observaciones', 'actualizado']
+        )
+        # MySQL no retorna el id en un upsert
+        muestra.id = VibracionesAnalisis.objects.filter(
+            activo=activo, fecha_muestreo=fecha
+        ).values_list('id', flat=True).get()
+        calcular_tendencias('vibraciones', activos=[activo.id])
+        detectar_anomalias(activos=[activo.id])
+        evaluar_alertas(
+            activo,
+            valores={'velocidad_rms': muestra.velocidad_rms, 'aceleracion': muestra.aceleracion},
+            series=['vibraciones']
         )
         
         return JsonResponse({
@@ -1413,6 +1645,386 @@ def agregar_muestra_vibracion(request, activo_id):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@require_http_methods(["POST"])
+@login_required
+def ingestar_muestras_vibracion(request):
+    """
+    Ingesta masiva de muestras de vibraciones desde colectores.
+    Acepta JSON ({"muestras": [...]} o lista) o CSV (body text/csv o archivo 'archivo').
+    """
+    try:
+        if 'archivo' in request.FILES:
+            filas = leer_csv(request.FILES['archivo'])
+        elif request.content_type == 'text/csv':
+            filas = leer_csv(request.body)
+        else:
+            try:
+                data = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+            filas = data.get('muestras') if isinstance(data, dict) else data
+        
+        if not isinstance(filas, list) or not filas:
+            return JsonResponse({'success': False, 'error': 'No se recibieron muestras'}, status=400)
+        
+        resumen = ingestar_muestras(filas)
+        return JsonResponse({'success': True, **resumen})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+def reclasificar_vibraciones_sucursal(request, sucursal_id):
+    """Reclasifica por severidad ISO 10816 todas las muestras de vibraciones de la sucursal"""
+    try:
+        sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+        cambios = reclasificar_sucursal(sucursal)
+        return JsonResponse({
+            'success': True,
+            'actualizadas': sum(cambios.values()),
+            'por_resultado': cambios,
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+def calcular_tendencias_vibraciones_termografias(request, sucursal_id):
+    """Recalcula las tendencias de vibraciones y termografía de todos los activos de la sucursal"""
+    try:
+        sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+        return JsonResponse({'success': True, 'activos': calcular_tendencias_sucursal(sucursal)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET", "POST"])
+@login_required
+@respuesta_cacheada()
+def predicciones_sucursal(request, sucursal_id):
+    """
+    GET: activos de la sucursal con cruce de umbral pronosticado, del más próximo al más lejano.
+    Parámetros: tipo (vibraciones/termografia), dias (horizonte máximo), confianza (mínima).
+    POST: recalcula los pronósticos de la sucursal.
+    """
+    try:
+        sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+        
+        if request.method == 'POST':
+            return JsonResponse({'success': True, 'activos': calcular_predicciones_sucursal(sucursal)})
+        
+        predicciones = PrediccionActivo.objects.filter(
+            activo__equipo__area__sucursal=sucursal,
+            activo__activo=True,
+            fecha_cruce__isnull=False
+        ).select_related('activo__equipo__area').order_by('fecha_cruce', '-confianza')
+        
+        try:
+            if request.GET.get('tipo'):
+                predicciones = predicciones.filter(tipo=request.GET['tipo'])
+            if request.GET.get('dias'):
+                predicciones = predicciones.filter(dias_restantes__lte=int(request.GET['dias']))
+            if request.GET.get('confianza'):
+                predicciones = predicciones.filter(confianza__gte=float(request.GET['confianza']))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Filtros inválidos'}, status=400)
+        
+        return JsonResponse({
+            'success': True,
+            'predicciones': [{
+                'activo_id': p.activo_id,
+                'activo': p.activo.nombre,
+                'equipo': p.activo.equipo.nombre,
+                'area': p.activo.equipo.area.nombre,
+                'tipo': p.tipo,
+                'modelo': p.modelo,
+                'valor_actual': p.valor_actual,
+                'umbral': p.umbral,
+                'fecha_cruce': p.fecha_cruce.isoformat(),
+                'dias_restantes': p.dias_restantes,
+                'confianza': p.confianza,
+                'r2': p.r2,
+                'num_muestras': p.num_muestras,
+            } for p in predicciones]
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+def subir_forma_onda(request, activo_id):
+    """
+    Sube la forma de onda de una captura (archivo 'archivo': .npy, .csv o binario float32).
+    Parámetros: frecuencia_muestreo (Hz), fecha_captura (ISO), eje, unidad, rpm, muestra_id.
+    """
+    try:
+        from datetime import datetime
+        
+        activo = get_object_or_404(Activo, id=activo_id)
+        
+        if 'archivo' not in request.FILES:
+            return JsonResponse({'success': False, 'error': 'Archivo requerido'}, status=400)
+        
+        eje = request.POST.get('eje', 'horizontal')
+        unidad = request.POST.get('unidad', 'g')
+        if eje not in dict(FormaOnda.EJE_CHOICES) or unidad not in dict(FormaOnda.UNIDAD_CHOICES):
+            return JsonResponse({'success': False, 'error': 'Eje o unidad inválidos'}, status=400)
+        
+        try:
+            frecuencia_muestreo = float(request.POST.get('frecuencia_muestreo', ''))
+            rpm = float(request.POST['rpm']) if request.POST.get('rpm') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Frecuencia de muestreo o RPM inválidos'}, status=400)
+        
+        fecha_captura = timezone.now()
+        if request.POST.get('fecha_captura'):
+            try:
+                fecha_captura = datetime.fromisoformat(request.POST['fecha_captura'])
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'fecha_captura inválida'}, status=400)
+            if timezone.is_naive(fecha_captura):
+                fecha_captura = timezone.make_aware(fecha_captura)
+        
+        muestra = None
+        if request.POST.get('muestra_id'):
+            muestra = get_object_or_404(VibracionesAnalisis, id=request.POST['muestra_id'], activo=activo)
+        
+        try:
+            forma = guardar_forma_onda(
+                activo,
+                leer_senal_subida(request.FILES['archivo']),
+                frecuencia_muestreo,
+                fecha_captura,
+                eje=eje,
+                unidad=unidad,
+                rpm=rpm,
+                muestra=muestra
+            )
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        
+        # Calcular métricas y completar la muestra de vibraciones del día
+        metricas = procesar_formas_onda([forma])
+        
+        return JsonResponse({
+            'success': True,
+            'forma_onda_id': forma.id,
+            'num_puntos': forma.num_puntos,
+            'duracion': forma.duracion,
+            'metricas': metricas.get(forma.id),
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+def procesar_formas_onda_vibracion(request):
+    """
+    Recalcula métricas de espectro para varias formas de onda.
+    JSON: {"formas_onda": [ids]} o {"activo_id": id, "pendientes": true}
+    """
+    try:
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+        
+        formas = FormaOnda.objects.all()
+        if data.get('formas_onda'):
+            formas = formas.filter(id__in=data['formas_onda'])
+        elif data.get('activo_id'):
+            formas = formas.filter(activo_id=data['activo_id'])
+        else:
+            return JsonResponse({'success': False, 'error': 'Indique formas_onda o activo_id'}, status=400)
+        if data.get('pendientes'):
+            formas = formas.filter(metricas__isnull=True)
+        
+        metricas = procesar_formas_onda(formas)
+        return JsonResponse({
+            'success': True,
+            'procesadas': len(metricas),
+            'metricas': {str(forma_id): valores for forma_id, valores in metricas.items()},
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET", "POST"])
+@login_required
+def rodamientos_activo(request, activo_id):
+    """
+    GET: rodamientos del activo con sus frecuencias de falla.
+    POST (JSON): {"rpm": 1480, "rodamientos": [{designacion, ubicacion, num_elementos,
+    diametro_elemento, diametro_primitivo, angulo_contacto}, ...]} reemplaza los rodamientos.
+    """
+    try:
+        activo = get_object_or_404(Activo, id=activo_id)
+        
+        if request.method == 'POST':
+            try:
+                data = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+            
+            rodamientos = []
+            for item in data.get('rodamientos', []):
+                rodamiento = Rodamiento(
+                    activo=activo,
+                    designacion=str(item.get('designacion', '')).strip(),
+                    ubicacion=item.get('ubicacion') or 'lado_acople',
+                    num_elementos=item.get('num_elementos'),
+                    diametro_elemento=item.get('diametro_elemento'),
+                    diametro_primitivo=item.get('diametro_primitivo'),
+                    angulo_contacto=item.get('angulo_contacto') or 0,
+                )
+                try:
+                    rodamiento.full_clean(exclude=['activo'])
+                except ValidationError as e:
+                    return JsonResponse({'success': False, 'error': e.message_dict}, status=400)
+                rodamientos.append(rodamiento)
+            
+            with transaction.atomic():
+                if 'rpm' in data:
+                    activo.rpm = float(data['rpm']) if data['rpm'] else None
+                    activo.save(update_fields=['rpm', 'actualizado'])
+                activo.rodamientos.all().delete()
+                Rodamiento.objects.bulk_create(rodamientos)
+                invalidar_activos([activo.id])
+        
+        return JsonResponse({
+            'success': True,
+            'rpm': activo.rpm,
+            'rodamientos': [
+                {
+                    'id': r.id,
+                    'designacion': r.designacion,
+                    'ubicacion': r.ubicacion,
+                    'num_elementos': r.num_elementos,
+                    'diametro_elemento': r.diametro_elemento,
+                    'diametro_primitivo': r.diametro_primitivo,
+                    'angulo_contacto': r.angulo_contacto,
+                    'ordenes_falla': {k: round(v, 4) for k, v in r.ordenes_falla().items()},
+                    'frecuencias_falla': (
+                        {k: round(v, 2) for k, v in r.frecuencias_falla(activo.rpm).items()}
+                        if activo.rpm else None
+                    ),
+                }
+                for r in activo.rodamientos.all()
+            ],
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+def analisis_rodamientos_equipo(request, equipo_id):
+    """Análisis de envolvente (BPFO, BPFI, BSF, FTF) de las últimas capturas de todos los activos del equipo"""
+    try:
+        equipo = get_object_or_404(Equipo, id=equipo_id)
+        resultados = analizar_rodamientos_equipo(equipo)
+        return JsonResponse({
+            'success': True,
+            'analizadas': len(resultados),
+            'alertas': sum(1 for r in resultados.values() if r['alerta']),
+            'formas_onda': {str(forma_id): resultado for forma_id, resultado in resultados.items()},
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@login_required
+def linea_tiempo_activos(request, activo_id=None):
+    """
+    Eventos de medición de uno o varios activos (vibraciones, termografía, análisis
+    térmicos y muestreos) en un solo flujo ordenado por fecha descendente.
+    Parámetros GET: activos (ids separados por coma, si no viene en la URL),
+    tipos (separados por coma), cursor, limite.
+    """
+    try:
+        try:
+            if activo_id is not None:
+                activos_ids = [activo_id]
+            else:
+                activos_ids = [int(i) for i in request.GET.get('activos', '').split(',') if i.strip()]
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Lista de activos inválida'}, status=400)
+        
+        activos = {
+            activo.id: activo
+            for activo in Activo.objects.filter(id__in=activos_ids).only('id', 'nombre', 'foto_termica')
+        }
+        if not activos:
+            return JsonResponse({'success': False, 'error': 'Activo no encontrado'}, status=404)
+        
+        tipos = [t for t in request.GET.get('tipos', '').split(',') if t.strip()]
+        if any(t not in FUENTES_LINEA_TIEMPO for t in tipos):
+            return JsonResponse({'success': False, 'error': 'Tipo de evento inválido'}, status=400)
+        
+        try:
+            eventos, siguiente_cursor = linea_tiempo(
+                list(activos),
+                tipos=tipos,
+                cursor=request.GET.get('cursor') or None,
+                limite=obtener_limite(request.GET.get('limite'))
+            )
+        except CursorInvalido:
+            return JsonResponse({'success': False, 'error': 'Cursor inválido'}, status=400)
+        
+        return JsonResponse({
+            'success': True,
+            'activos': {
+                activo.id: {
+                    'nombre': activo.nombre,
+                    'foto_termica': activo.foto_termica.url if activo.foto_termica else None,
+                } for activo in activos.values()
+            },
+            'eventos': eventos,
+            'siguiente_cursor': siguiente_cursor,
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@login_required
+def datos_forma_onda(request, forma_id):
+    """
+    Tramo de una forma de onda para graficar, reducido a max_puntos.
+    Parámetros GET opcionales: inicio y fin (segundos), max_puntos.
+    """
+    try:
+        forma = get_object_or_404(FormaOnda, id=forma_id)
+        
+        try:
+            inicio = float(request.GET['inicio']) if request.GET.get('inicio') else None
+            fin = float(request.GET['fin']) if request.GET.get('fin') else None
+            max_puntos = min(int(request.GET.get('max_puntos', MAX_PUNTOS_GRAFICO)), 50000)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Parámetros inválidos'}, status=400)
+        
+        t0, tramo = tramo_senal(forma, inicio, fin)
+        indices, valores = reducir_para_grafico(tramo, max(2, max_puntos))
+        
+        return JsonResponse({
+            'success': True,
+            'frecuencia_muestreo': forma.frecuencia_muestreo,
+            'unidad': forma.unidad,
+            'eje': forma.eje,
+            'num_puntos': forma.num_puntos,
+            'puntos_tramo': int(tramo.shape[0]),
+            'tiempo': (t0 + indices / forma.frecuencia_muestreo).round(6).tolist(),
+            'valores': valores.tolist(),
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 def guardar_fecha_muestreo(request, activo_id):
     """Guarda o actualiza la fecha de muestreo de un activo via AJAX"""
     try:
@@ -1441,6 +2053,26 @@ def guardar_fecha_muestreo(request, activo_id):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@require_http_methods(["GET"])
+@login_required
+def ruta_muestreo_sucursal(request, sucursal_id):
+    """
+    Ruta de muestreo de la sucursal: activos sin muestreo, vencidos o por vencer,
+    por área (aserradero → elaborado → caldera) y equipo. Parámetro: horizonte (días).
+    """
+    try:
+        sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+        
+        try:
+            horizonte = int(request.GET.get('horizonte', HORIZONTE_PROXIMOS))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Horizonte inválido'}, status=400)
+        
+        return JsonResponse({'success': True, **planificar_ruta(sucursal, horizonte=max(0, horizonte))})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 def obtener_ultima_fecha_muestreo(request, activo_id):
     """Obtiene la última fecha de muestreo de un activo"""
     try:
@@ -1468,11 +2100,8 @@ def subir_foto_termica(request, activo_id):
     """Sube una foto térmica para un activo y la analiza automáticamente"""
     import logging
     logger = logging.getLogger(__name__)
-    from .analisis_termico import AnalizadorTermico
     
     try:
-        from .models import AnalisisTermico
-        
         activo = get_object_or_404(Activo, id=activo_id)
         
         if 'foto' not in request.FILES:
@@ -1489,94 +2118,120 @@ def subir_foto_termica(request, activo_id):
         if not archivo.content_type.startswith('image/'):
             return JsonResponse({'success': False, 'error': 'El archivo debe ser una imagen'}, status=400)
         
-        # Si es nueva muestra, guardar análisis anterior
-        analisis_anterior = None
-        if es_nueva_muestra:
-            try:
-                analisis_anterior = AnalisisTermico.objects.get(activo=activo)
-                logger.info(f"✅ Análisis anterior preservado en histórico")
-            except AnalisisTermico.DoesNotExist:
-                logger.info(f"ℹ️ No hay análisis anterior para preservar")
-        
-        # Eliminar foto anterior si existe (pero preservar análisis si es nueva muestra)
-        if activo.foto_termica:
-            activo.foto_termica.delete()
-        
-        # Guardar nueva foto
-        activo.foto_termica = archivo
-        activo.save()
-        logger.info(f"✅ Foto guardada correctamente")
-        
-        # Intentar analizar - si falla, devolvemos la foto sin análisis
+        return procesar_foto_termica(activo, archivo, es_nueva_muestra)
+    except Exception as e:
+        logger.error(f"Error subiendo foto térmica: {str(e)}", exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def procesar_foto_termica(activo, archivo, es_nueva_muestra=False):
+    """
+    Guarda la foto térmica de un activo, la analiza y actualiza su estado.
+    Compartido por la subida directa (subir_foto_termica) y la fragmentada (finalizar_subida).
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    from .analisis_termico import AnalizadorTermico
+    from .models import AnalisisTermico
+    activo_id = activo.id
+    
+    # El análisis anterior ya quedó en el histórico (TermografiaAnalisis) al subirse
+    if es_nueva_muestra:
+        if AnalisisTermico.objects.filter(activo=activo).exists():
+            logger.info(f"✅ Análisis anterior preservado en histórico")
+        else:
+            logger.info(f"ℹ️ No hay análisis anterior para preservar")
+
+    # Eliminar foto anterior si existe (pero preservar análisis si es nueva muestra)
+    if activo.foto_termica:
+        activo.foto_termica.delete()
+
+    # Guardar nueva foto
+    activo.foto_termica = archivo
+    activo.save()
+    logger.info(f"✅ Foto guardada correctamente")
+
+    # Intentar analizar - si falla, devolvemos la foto sin análisis
+    resultado_analisis = None
+    try:
+        analizador = AnalizadorTermico()
+        logger.info(f">>> LLAMANDO analizar_imagen({activo.foto_termica})")
+        resultado_analisis = analizador.analizar_imagen(activo.foto_termica)
+        logger.info(f">>> RESULTADO COMPLETO: {resultado_analisis}")
+    except Exception as ocr_error:
+        logger.error(f">>> EXCEPCION EN OCR: {str(ocr_error)}", exc_info=True)
+        # Sin OCR, devolver valores por defecto
         resultado_analisis = None
-        try:
-            analizador = AnalizadorTermico()
-            logger.info(f">>> LLAMANDO analizar_imagen({activo.foto_termica})")
-            resultado_analisis = analizador.analizar_imagen(activo.foto_termica)
-            logger.info(f">>> RESULTADO COMPLETO: {resultado_analisis}")
-            print(f">>> RESULTADO COMPLETO (PRINT): {resultado_analisis}")
-        except Exception as ocr_error:
-            logger.error(f">>> EXCEPCION EN OCR: {str(ocr_error)}", exc_info=True)
-            print(f">>> EXCEPCION EN OCR (PRINT): {str(ocr_error)}")
-            # Sin OCR, devolver valores por defecto
-            resultado_analisis = None
-        
-        # Si OCR falló, retornar con análisis null pero foto guardada
-        if resultado_analisis is None or 'error' in resultado_analisis:
-            logger.info(f"✅ Foto subida. Ingresa los valores manualmente en el modal.")
-            return JsonResponse({
-                'success': True,
-                'foto_url': activo.foto_termica.url,
-                'mensaje': 'Foto subida correctamente. Por favor ingresa los valores manualmente.',
-                'error_analisis': 'OCR no disponible - Ingresa los valores de temperatura en el modal',
-                'analisis': None
-            })
-        
-        # 🔄 IMPORTANTE: Ahora usamos ForeignKey en lugar de OneToOne
-        # Esto permite crear MÚLTIPLES AnalisisTermico por Activo (histórico)
-        # Siempre creamos un nuevo registro en lugar de actualizar
-        analisis = AnalisisTermico.objects.create(
-            activo=activo,
-            temperatura_promedio=resultado_analisis['temperatura_promedio'],
-            temperatura_maxima=resultado_analisis['temperatura_maxima'],
-            temperatura_minima=resultado_analisis['temperatura_minima'],
-            rango_minimo=resultado_analisis['rango_minimo'],
-            rango_maximo=resultado_analisis['rango_maximo'],
-            porcentaje_zona_critica=resultado_analisis['porcentaje_zona_critica'],
-            porcentaje_zona_alerta=resultado_analisis['porcentaje_zona_alerta'],
-            porcentaje_zona_caliente=resultado_analisis['porcentaje_zona_caliente'],
-            estado=resultado_analisis['estado'],
-        )
-        creado = True
-        logger.info(f"✅ Nuevo AnalisisTermico creado (ID: {analisis.id}) para activo {activo_id}")
-        logger.info(f"   Temperatura máxima: {resultado_analisis['temperatura_maxima']}°C")
-        logger.info(f"   Estado: {resultado_analisis['estado']}")
-        
-        # Actualizar el estado del Activo con el estado del análisis
-        activo.estado = resultado_analisis['estado']
-        activo.save()
-        logger.info(f"✅ Estado del activo {activo_id} actualizado a: {resultado_analisis['estado']}")
-        
-        response_data = {
+
+    # Si OCR falló, retornar con análisis null pero foto guardada
+    if resultado_analisis is None or 'error' in resultado_analisis:
+        logger.info(f"✅ Foto subida. Ingresa los valores manualmente en el modal.")
+        return JsonResponse({
             'success': True,
             'foto_url': activo.foto_termica.url,
-            'mensaje': 'Foto subida y analizada correctamente',
-            'analisis': {
-                'temperatura_promedio': resultado_analisis['temperatura_promedio'],
-                'temperatura_maxima': resultado_analisis['temperatura_maxima'],
-                'temperatura_minima': resultado_analisis['temperatura_minima'],
-                'porcentaje_zona_critica': resultado_analisis['porcentaje_zona_critica'],
-                'porcentaje_zona_alerta': resultado_analisis['porcentaje_zona_alerta'],
-                'porcentaje_zona_caliente': resultado_analisis['porcentaje_zona_caliente'],
-                'estado': resultado_analisis['estado'],
-                'mensaje': resultado_analisis['mensaje']
-            }
+            'mensaje': 'Foto subida correctamente. Por favor ingresa los valores manualmente.',
+            'error_analisis': 'OCR no disponible - Ingresa los valores de temperatura en el modal',
+            'analisis': None
+        })
+
+    # 🔄 IMPORTANTE: Ahora usamos ForeignKey en lugar de OneToOne
+    # Esto permite crear MÚLTIPLES AnalisisTermico por Activo (histórico)
+    # Siempre creamos un nuevo registro en lugar de actualizar
+    analisis = AnalisisTermico.objects.create(
+        activo=activo,
+        temperatura_promedio=resultado_analisis['temperatura_promedio'],
+        temperatura_maxima=resultado_analisis['temperatura_maxima'],
+        temperatura_minima=resultado_analisis['temperatura_minima'],
+        rango_minimo=resultado_analisis['rango_minimo'],
+        rango_maximo=resultado_analisis['rango_maximo'],
+        porcentaje_zona_critica=resultado_analisis['porcentaje_zona_critica'],
+        porcentaje_zona_alerta=resultado_analisis['porcentaje_zona_alerta'],
+        porcentaje_zona_caliente=resultado_analisis['porcentaje_zona_caliente'],
+        estado=resultado_analisis['estado'],
+    )
+    creado = True
+    logger.info(f"✅ Nuevo AnalisisTermico creado (ID: {analisis.id}) para activo {activo_id}")
+    logger.info(f"   Temperatura máxima: {resultado_analisis['temperatura_maxima']}°C")
+    logger.info(f"   Estado: {resultado_analisis['estado']}")
+
+    # Instantánea en el histórico de termografías (la imagen se referencia, no se copia)
+    registrar_termografia(
+        activo,
+        resultado_analisis['estado'],
+        analisis.temperatura_maxima,
+        analisis.temperatura_promedio,
+        analisis.temperatura_minima,
+        porcentaje_zona_alerta=analisis.porcentaje_zona_alerta,
+        porcentaje_zona_critica=analisis.porcentaje_zona_critica,
+    )
+    
+    # Actualizar el estado del Activo con el estado del análisis
+    estado_anterior = activo.estado
+    activo.estado = resultado_analisis['estado']
+    activo.save()
+    evaluar_alertas(activo, estado_anterior=estado_anterior, valores={
+        'temperatura_maxima': analisis.temperatura_maxima,
+        'temperatura_promedio': analisis.temperatura_promedio,
+    }, series=('termografia',))
+    logger.info(f"✅ Estado del activo {activo_id} actualizado a: {resultado_analisis['estado']}")
+
+    response_data = {
+        'success': True,
+        'foto_url': activo.foto_termica.url,
+        'mensaje': 'Foto subida y analizada correctamente',
+        'analisis': {
+            'temperatura_promedio': resultado_analisis['temperatura_promedio'],
+            'temperatura_maxima': resultado_analisis['temperatura_maxima'],
+            'temperatura_minima': resultado_analisis['temperatura_minima'],
+            'porcentaje_zona_critica': resultado_analisis['porcentaje_zona_critica'],
+            'porcentaje_zona_alerta': resultado_analisis['porcentaje_zona_alerta'],
+            'porcentaje_zona_caliente': resultado_analisis['porcentaje_zona_caliente'],
+            'estado': resultado_analisis['estado'],
+            'mensaje': resultado_analisis['mensaje']
         }
-        logger.info(f"📤 Enviando respuesta JSON con análisis: {response_data}")
-        return JsonResponse(response_data)
-    except Exception as e:
-        logger.error(f"Error subiendo foto térmica: {str(e)}", exc_info=True)
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    }
+    logger.info(f"📤 Enviando respuesta JSON con análisis: {response_data}")
+    return JsonResponse(response_data)
 
 
 @require_http_methods(["POST"])
@@ -1594,12 +2249,11 @@ def eliminar_foto_termica(request, activo_id):
         activo = get_object_or_404(Activo, id=activo_id)
         logger.info(f"🗑️ Eliminando foto térmica del activo {activo_id}")
         
-        # Eliminar análisis asociado
-        try:
-            analisis = AnalisisTermico.objects.get(activo=activo)
-            analisis.delete()
+        # Eliminar análisis asociados (el histórico en TermografiaAnalisis se conserva)
+        eliminados, _ = AnalisisTermico.objects.filter(activo=activo).delete()
+        if eliminados:
             logger.info(f"✅ Análisis eliminado")
-        except AnalisisTermico.DoesNotExist:
+        else:
             logger.info(f"ℹ️ No hay análisis para eliminar")
         
         # Eliminar archivo de foto
@@ -1713,8 +2367,8 @@ def guardar_temperaturas_activo(request, activo_id):
         
         logger.info(f"Guardando temperaturas para activo {activo_id}: Prom={temperatura_promedio}, Min={temperatura_minima}, Max={temperatura_maxima}")
         
-        # Obtener o crear el análisis térmico
-        analisis, created = AnalisisTermico.objects.get_or_create(activo=activo)
+        # Corregir el análisis térmico más reciente (cada foto crea uno nuevo) o crearlo
+        analisis = AnalisisTermico.objects.filter(activo=activo).order_by('-creado').first() or AnalisisTermico(activo=activo)
         
         # Actualizar los valores de temperatura detectada
         analisis.temperatura_promedio = temperatura_promedio
@@ -1750,9 +2404,25 @@ def guardar_temperaturas_activo(request, activo_id):
         
         analisis.save()
         
+        # Valores corregidos a mano: actualizan la instantánea de la foto actual en el histórico
+        registrar_termografia(
+            activo,
+            analisis.estado,
+            temperatura_maxima,
+            temperatura_promedio,
+            temperatura_minima,
+            porcentaje_zona_alerta=analisis.porcentaje_zona_alerta,
+            porcentaje_zona_critica=analisis.porcentaje_zona_critica,
+        )
+        
         # 🔴 IMPORTANTE: Actualizar también el estado del Activo para que se refleje en la tabla
+        estado_anterior = activo.estado
         activo.estado = analisis.estado
         activo.save()
+        evaluar_alertas(activo, estado_anterior=estado_anterior, valores={
+            'temperatura_maxima': temperatura_maxima,
+            'temperatura_promedio': temperatura_promedio,
+        }, series=('termografia',))
         
         logger.info(f"✅ Temperaturas guardadas exitosamente para activo {activo_id}, estado={analisis.estado}")
         
@@ -1907,24 +2577,237 @@ def subir_plano_planta(request, sucursal_id):
         if not archivo.content_type.startswith('image/'):
             return JsonResponse({'success': False, 'error': 'El archivo debe ser una imagen'}, status=400)
         
-        # Validar tamaño máximo (5MB)
+        # Validar tamaño máximo (5MB); los planos más grandes usan la subida fragmentada
         if archivo.size > 5 * 1024 * 1024:
             return JsonResponse({'success': False, 'error': 'El archivo es demasiado grande (máximo 5MB)'}, status=400)
         
-        # Eliminar archivo anterior si existe
-        if sucursal.plano_planta:
-            sucursal.plano_planta.delete()
+        return guardar_plano_planta(sucursal, archivo)
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def guardar_plano_planta(sucursal, archivo):
+    """Reemplaza el plano de la planta (subida directa y fragmentada)"""
+    # Eliminar archivo anterior si existe
+    if sucursal.plano_planta:
+        sucursal.plano_planta.delete()
+    
+    # Guardar nuevo archivo
+    sucursal.plano_planta = archivo
+    sucursal.save()
+    
+    return JsonResponse({
+        'success': True,
+        'message': 'Plano de planta subido exitosamente',
+        'image_url': sucursal.plano_planta.url
+    })
+
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+@respuesta_cacheada()
+def plano_sucursal(request, sucursal_id):
+    """
+    Plano de la sucursal para el visor (JSON): pirámide de teselas (o la
+    miniatura mientras se genera) y los activos ubicados con su estado actual.
+    Con activos=1 incluye además todos los activos de la sucursal, para ubicarlos.
+    """
+    from .models import PuntoPlano
+    from .miniaturas import url_miniatura
+    from .teselas import fuente_teselas
+    
+    sucursal = get_object_or_404(Sucursal, id=sucursal_id)
+    
+    try:
+        puntos = PuntoPlano.objects.filter(sucursal=sucursal).select_related('activo__equipo').order_by('id')
+        data = {
+            'success': True,
+            'teselas': fuente_teselas(sucursal),
+            'imagen_url': url_miniatura(sucursal.plano_planta, 1280),
+            'puntos': [{
+                'activo_id': punto.activo_id,
+                'nombre': punto.activo.nombre,
+                'equipo': punto.activo.equipo.nombre,
+                'estado': punto.activo.estado,
+                'estado_display': punto.activo.get_estado_display(),
+                'x': punto.x,
+                'y': punto.y,
+            } for punto in puntos],
+        }
+        if request.GET.get('activos') == '1':
+            data['activos'] = [
+                {'id': activo_id, 'nombre': nombre, 'equipo': equipo}
+                for activo_id, nombre, equipo in Activo.objects.filter(
+                    equipo__area__sucursal=sucursal, activo=True
+                ).order_by('equipo__nombre', 'nombre').values_list('id', 'nombre', 'equipo__nombre')
+            ]
+        return JsonResponse(data)
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST", "DELETE"])
+@login_required(login_url='login')
+def punto_plano(request, sucursal_id, activo_id):
+    """
+    Ubica un activo en el plano de su sucursal (POST x, y como fracción 0–1 del
+    ancho y alto del plano) o lo quita del plano (DELETE).
+    """
+    from .models import PuntoPlano
+    
+    activo = get_object_or_404(Activo, id=activo_id, equipo__area__sucursal_id=sucursal_id)
+    
+    try:
+        if request.method == 'DELETE':
+            PuntoPlano.objects.filter(activo=activo).delete()
+            return JsonResponse({'success': True})
         
-        # Guardar nuevo archivo
-        sucursal.plano_planta = archivo
-        sucursal.save()
+        try:
+            x = float(request.POST.get('x', ''))
+            y = float(request.POST.get('y', ''))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Coordenadas inválidas'}, status=400)
+        if not (0 <= x <= 1 and 0 <= y <= 1):
+            return JsonResponse({'success': False, 'error': 'Las coordenadas deben estar entre 0 y 1'}, status=400)
+        
+        PuntoPlano.objects.update_or_create(
+            activo=activo,
+            defaults={'sucursal_id': sucursal_id, 'x': x, 'y': y}
+        )
+        return JsonResponse({
+            'success': True,
+            'punto': {
+                'activo_id': activo.id,
+                'nombre': activo.nombre,
+                'equipo': activo.equipo.nombre,
+                'estado': activo.estado,
+                'estado_display': activo.get_estado_display(),
+                'x': x,
+                'y': y,
+            }
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required(login_url='login')
+def iniciar_subida(request):
+    """
+    Crea una subida fragmentada (ver core/subidas.py).
+    Parámetros: destino (foto_termica/plano_planta), objeto_id, nombre, tipo, tamano
+    y, para fotos térmicas, nueva_muestra.
+    """
+    from .subidas import crear_subida, TAMANO_FRAGMENTO
+    
+    try:
+        try:
+            destino = request.POST.get('destino', '')
+            objeto_id = int(request.POST.get('objeto_id', ''))
+            tamano = int(request.POST.get('tamano', ''))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'objeto_id y tamano son obligatorios'}, status=400)
+        
+        modelos_destino = {'foto_termica': Activo, 'plano_planta': Sucursal}
+        if destino not in modelos_destino:
+            return JsonResponse({'success': False, 'error': 'Destino inválido'}, status=400)
+        if not modelos_destino[destino].objects.filter(id=objeto_id).exists():
+            return JsonResponse({'success': False, 'error': 'Destino no encontrado'}, status=404)
+        
+        parametros = {}
+        if destino == 'foto_termica':
+            parametros['nueva_muestra'] = request.POST.get('nueva_muestra', 'false').lower() == 'true'
+        
+        try:
+            subida = crear_subida(
+                request.user, destino, objeto_id,
+                request.POST.get('nombre', ''), request.POST.get('tipo', ''), tamano, parametros
+            )
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
         
         return JsonResponse({
             'success': True,
-            'message': 'Plano de planta subido exitosamente',
-            'image_url': sucursal.plano_planta.url
+            'subida_id': str(subida.id),
+            'offset': 0,
+            'tamano_fragmento': TAMANO_FRAGMENTO,
+        }, status=201)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET", "PUT"])
+@login_required(login_url='login')
+def fragmento_subida(request, subida_id):
+    """
+    GET: offset recibido hasta el momento (para reanudar).
+    PUT ?offset=N: escribe el cuerpo del request como fragmento a partir del byte N.
+    Responde 409 con el offset correcto si N no coincide.
+    """
+    from .models import SubidaFragmentada
+    from .subidas import escribir_fragmento, DesfaseSubida
+    
+    subida = get_object_or_404(SubidaFragmentada, id=subida_id, usuario=request.user)
+    
+    try:
+        if request.method == 'PUT':
+            try:
+                offset = int(request.GET.get('offset', ''))
+                longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'Parámetro offset inválido'}, status=400)
+            
+            try:
+                subida = escribir_fragmento(subida.id, offset, request, longitud)
+            except DesfaseSubida as e:
+                return JsonResponse({'success': False, 'error': str(e), 'offset': e.recibido}, status=409)
+            except ValueError as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        
+        return JsonResponse({
+            'success': True,
+            'offset': subida.recibido,
+            'tamano': subida.tamano_total,
+            'completa': subida.recibido == subida.tamano_total,
         })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required(login_url='login')
+def finalizar_subida(request, subida_id):
+    """Entrega la subida completa a su destino; responde lo mismo que la subida directa"""
+    from .models import SubidaFragmentada
+    from .subidas import archivo_subida, descartar
+    
+    subida = get_object_or_404(SubidaFragmentada, id=subida_id, usuario=request.user)
+    # Fuera del try: un destino eliminado entretanto es 404, no 500
+    if subida.destino == 'foto_termica':
+        destino = get_object_or_404(Activo, id=subida.objeto_id)
+    else:
+        destino = get_object_or_404(Sucursal, id=subida.objeto_id)
     
+    try:
+        try:
+            archivo = archivo_subida(subida)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'offset': subida.recibido}, status=400)
+        
+        try:
+            if subida.destino == 'foto_termica':
+                respuesta = procesar_foto_termica(destino, archivo, subida.parametros.get('nueva_muestra', False))
+            else:
+                respuesta = guardar_plano_planta(destino, archivo)
+        finally:
+            archivo.close()
+        
+        if respuesta.status_code == 200:
+            descartar(subida)
+        return respuesta
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -1999,51 +2882,69 @@ def historico_vibraciones(request, cliente_id, sucursal_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     
-    # Obtener todos los activos de la sucursal con su último análisis
-    # Ordenar por área (aserradero, elaborado, caldera), luego equipo, luego activo
-    activos = Activo.objects.filter(
-        equipo__area__sucursal=sucursal,
-        activo=True
-    ).select_related(
-        'equipo',
-        'equipo__area'
-    ).annotate(
-        area_orden=Case(
-            When(equipo__area__nombre='aserradero', then=0),
-            When(equipo__area__nombre='elaborado', then=1),
-            When(equipo__area__nombre='caldera', then=2),
-            default=3,
-            output_field=models.IntegerField()
+    def construir():
+        # Obtener todos los activos de la sucursal con su último análisis
+        # Ordenar por área (aserradero, elaborado, caldera), luego equipo, luego activo
+        activos = Activo.objects.filter(
+            equipo__area__sucursal=sucursal,
+            activo=True
+        ).select_related(
+            'equipo',
+            'equipo__area'
+        ).annotate(
+            area_orden=Case(
+                When(equipo__area__nombre='aserradero', then=0),
+                When(equipo__area__nombre='elaborado', then=1),
+                When(equipo__area__nombre='caldera', then=2),
+                default=3,
+                output_field=models.IntegerField()
+            )
+        ).order_by('area_orden', 'equipo__nombre', 'nombre').prefetch_related(
+            prefetch_tendencia('vibraciones'),
+            # La tabla recorre las muestras de cada activo; quedan dentro de lo cacheado
+            'analisis_vibraciones_historico'
         )
-    ).order_by('area_orden', 'equipo__nombre', 'nombre')
-    
-    # Construir lista de activos con su último análisis
-    datos_historico = []
-    ultima_fecha = None
-    
-    for activo in activos:
-        # Obtener el último análisis de vibraciones de este activo
-        ultimo_analisis = VibracionesAnalisis.objects.filter(
-            activo=activo
-        ).order_by('-fecha_muestreo').first()
-        
-        fila = {
-            'numero': len(datos_historico) + 1,
-            'area': activo.equipo.area,
-            'equipo': activo.equipo,
-            'activo': activo,
-            'ultimo_analisis': ultimo_analisis
-        }
         
-        # Guardar la fecha más reciente para mostrar en el encabezado
-        if ultimo_analisis and (ultima_fecha is None or ultimo_analisis.fecha_muestreo > ultima_fecha):
-            ultima_fecha = ultimo_analisis.fecha_muestreo
+        # Construir lista de activos con su último análisis
+        datos_historico = []
+        ultima_fecha = None
         
-        datos_historico.append(fila)
-    
-    # Calcular estadísticas
-    equipos_count = Equipo.objects.filter(area__sucursal=sucursal, activo=True).distinct().count()
-    activos_count = len(datos_historico)
+        for activo in activos:
+            # Obtener el último análisis de vibraciones de este activo
+            ultimo_analisis = max(
+                activo.analisis_vibraciones_historico.all(),
+                key=lambda analisis: analisis.fecha_muestreo,
+                default=None
+            )
+        
+            fila = {
+                'numero': len(datos_historico) + 1,
+                'area': activo.equipo.area,
+                'equipo': activo.equipo,
+                'activo': activo,
+                'ultimo_analisis': ultimo_analisis,
+                'tendencia': activo.tendencia[0] if activo.tendencia else None,
+            }
+        
+            # Guardar la fecha más reciente para mostrar en el encabezado
+            if ultimo_analisis and (ultima_fecha is None or ultimo_analisis.fecha_muestreo > ultima_fecha):
+                ultima_fecha = ultimo_analisis.fecha_muestreo
+        
+            datos_historico.append(fila)
+        
+        # Calcular estadísticas
+        equipos_count = Equipo.objects.filter(area__sucursal=sucursal, activo=True).distinct().count()
+        activos_count = len(datos_historico)
+        
+        return {
+            'datos_historico': datos_historico,
+            'ultima_fecha': ultima_fecha,
+            'total_equipos': equipos_count,
+            'total_activos': activos_count,
+        }
+        
+    # Se reconstruye solo cuando cambian los datos de la sucursal (core.cache_sucursal)
+    datos = cacheado('sucursal', sucursal.id, 'historico_vibraciones', construir)
     
     context = {
         'user': request.user,
@@ -2052,10 +2953,7 @@ def historico_vibraciones(request, cliente_id, sucursal_id):
         'modulo': 'vibraciones',
         'titulo': f'Histórico de Vibraciones - {sucursal.nombre}',
         'descripcion': 'Visualiza el historial de análisis de todos los activos',
-        'datos_historico': datos_historico,
-        'ultima_fecha': ultima_fecha,
-        'total_equipos': equipos_count,
-        'total_activos': activos_count,
+        **datos,
     }
     return render(request, 'core/vibraciones/historico.html', context)
 
@@ -2070,78 +2968,85 @@ def historico_termografias(request, cliente_id, sucursal_id):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     sucursal = get_object_or_404(Sucursal, id=sucursal_id, cliente=cliente)
     
-    # Obtener todos los activos de la sucursal
-    activos = Activo.objects.filter(
-        equipo__area__sucursal=sucursal,
-        activo=True
-    ).select_related(
-        'equipo',
-        'equipo__area'
-    ).order_by('equipo__area__nombre', 'equipo__nombre', 'nombre')
-    
-    # Obtener todas las fechas de análisis únicos de todos los activos
-    fechas = TermografiaAnalisis.objects.filter(
-        activo__equipo__area__sucursal=sucursal
-    ).values_list('fecha_muestreo', flat=True).distinct().order_by('-fecha_muestreo')
-    
-    # Construir matriz: activo -> fecha -> análisis
-    datos_historico = []
-    for activo in activos:
-        fila = {
-            'activo': activo,
-            'area': activo.equipo.area,
-            'equipo': activo.equipo,
-            'analisis_por_fecha': {}
-        }
+    def construir():
+        # Obtener todos los activos de la sucursal
+        activos = Activo.objects.filter(
+            equipo__area__sucursal=sucursal,
+            activo=True
+        ).select_related(
+            'equipo',
+            'equipo__area'
+        ).order_by('equipo__area__nombre', 'equipo__nombre', 'nombre').prefetch_related(
+            prefetch_tendencia('termografia')
+        )
         
-        # Para cada fecha, obtener el análisis de este activo
-        for fecha in fechas:
-            try:
-                analisis = TermografiaAnalisis.objects.get(
-                    activo=activo,
-                    fecha_muestreo=fecha
-                )
-                fila['analisis_por_fecha'][fecha] = analisis
-            except TermografiaAnalisis.DoesNotExist:
-                fila['analisis_por_fecha'][fecha] = None
+        # Todos los análisis de la sucursal en una consulta (el último de cada activo y fecha)
+        fechas, ultimo_por_celda = matriz_historico(sucursal)
         
-        datos_historico.append(fila)
-    
-    # Serializar datos para JSON (para Chart.js)
-    import json
-    from decimal import Decimal
-    
-    fechas_list = [str(f) for f in fechas]
-    
-    # Convertir datos_historico a estructura serializable
-    datos_json = []
-    for item in datos_historico:
-        analisis_json = {}
-        for fecha, analisis in item['analisis_por_fecha'].items():
-            if analisis:
-                analisis_json[str(fecha)] = {
-                    'temperatura_maxima': float(analisis.temperatura_maxima) if analisis.temperatura_maxima else 0,
-                    'temperatura_minima': float(analisis.temperatura_minima) if analisis.temperatura_minima else 0,
-                    'resultado': analisis.resultado,
-                }
-            else:
-                analisis_json[str(fecha)] = None
+        # Construir matriz: activo -> fecha -> análisis
+        datos_historico = []
+        for activo in activos:
+            celdas = [ultimo_por_celda.get((activo.id, fecha)) for fecha in fechas]
+            fila = {
+                'activo': activo,
+                'area': activo.equipo.area,
+                'equipo': activo.equipo,
+                'analisis_por_fecha': dict(zip(fechas, celdas)),
+                'celdas': celdas,
+                'tendencia': activo.tendencia[0] if activo.tendencia else None,
+            }
+            datos_historico.append(fila)
         
-        datos_json.append({
-            'activo': {
-                'id': item['activo'].id,
-                'nombre': item['activo'].nombre,
-            },
-            'equipo': {
-                'id': item['equipo'].id,
-                'nombre': item['equipo'].nombre,
-            },
-            'area': {
-                'id': item['area'].id,
-                'nombre': item['area'].nombre,
-            },
-            'analisis_por_fecha': analisis_json
-        })
+        # Serializar datos para JSON (para Chart.js)
+        import json
+        from decimal import Decimal
+        
+        fechas_list = [str(f) for f in fechas]
+        
+        # Convertir datos_historico a estructura serializable
+        datos_json = []
+        for item in datos_historico:
+            analisis_json = {}
+            for fecha, analisis in item['analisis_por_fecha'].items():
+                if analisis:
+                    analisis_json[str(fecha)] = {
+                        'temperatura_maxima': float(analisis.temperatura_maxima) if analisis.temperatura_maxima else 0,
+                        'temperatura_minima': float(analisis.temperatura_minima) if analisis.temperatura_minima else 0,
+                        'resultado': analisis.resultado,
+                    }
+                else:
+                    analisis_json[str(fecha)] = None
+        
+            datos_json.append({
+                'activo': {
+                    'id': item['activo'].id,
+                    'nombre': item['activo'].nombre,
+                },
+                'equipo': {
+                    'id': item['equipo'].id,
+                    'nombre': item['equipo'].nombre,
+                },
+                'area': {
+                    'id': item['area'].id,
+                    'nombre': item['area'].nombre,
+                },
+                'analisis_por_fecha': analisis_json,
+                'tendencia': {
+                    'ewma': item['tendencia'].ewma,
+                    'pendiente_reciente': item['tendencia'].pendiente_reciente,
+                    'direccion': item['tendencia'].direccion,
+                } if item['tendencia'] else None,
+            })
+        
+        return {
+            'datos_historico': datos_historico,
+            'fechas': fechas,
+            'datos_historico_json': json.dumps(datos_json),
+            'fechas_json': json.dumps(fechas_list),
+        }
+    
+    # Se reconstruye solo cuando cambian los datos de la sucursal (core.cache_sucursal)
+    datos = cacheado('sucursal', sucursal.id, 'historico_termografias', construir)
     
     context = {
         'user': request.user,
@@ -2150,10 +3055,7 @@ def historico_termografias(request, cliente_id, sucursal_id):
         'modulo': 'termografias',
         'titulo': f'Histórico de Termografías - {sucursal.nombre}',
         'descripcion': 'Visualiza el historial de todos los análisis de termografías',
-        'datos_historico': datos_historico,
-        'fechas': fechas,
-        'datos_historico_json': json.dumps(datos_json),
-        'fechas_json': json.dumps(fechas_list),
+        **datos,
     }
     return render(request, 'core/termografias/historico.html', context)
 
@@ -2163,6 +3065,7 @@ def historico_termografias(request, cliente_id, sucursal_id):
 # ============================================================================
 
 @login_required(login_url='login')
+@respuesta_cacheada()
 def exportar_historico_vibraciones_csv(request, cliente_id, sucursal_id):
     """Exportar histórico de vibraciones a CSV"""
     import csv
@@ -2223,6 +3126,7 @@ def exportar_historico_vibraciones_csv(request, cliente_id, sucursal_id):
 
 
 @login_required(login_url='login')
+@respuesta_cacheada()
 def exportar_historico_termografias_csv(request, cliente_id, sucursal_id):
     """Exportar histórico de termografías a CSV"""
     import csv
@@ -2239,9 +3143,7 @@ def exportar_historico_termografias_csv(request, cliente_id, sucursal_id):
         'equipo__area__nombre', 'equipo__nombre', 'nombre'
     )
     
-    fechas = TermografiaAnalisis.objects.filter(
-        activo__equipo__area__sucursal=sucursal
-    ).values_list('fecha_muestreo', flat=True).distinct().order_by('-fecha_muestreo')
+    fechas, ultimo_por_celda = matriz_historico(sucursal)
     
     # Crear respuesta CSV
     response = HttpResponse(content_type='text/csv')
@@ -2266,14 +3168,10 @@ def exportar_historico_termografias_csv(request, cliente_id, sucursal_id):
         ]
         
         for fecha in fechas:
-            try:
-                analisis = TermografiaAnalisis.objects.get(
-                    activo=activo,
-                    fecha_muestreo=fecha
-                )
-                valor = f"{analisis.get_resultado_display()} ({analisis.temperatura_maxima}°C)"
-                fila.append(valor)
-            except TermografiaAnalisis.DoesNotExist:
+            analisis = ultimo_por_celda.get((activo.id, fecha))
+            if analisis:
+                fila.append(f"{analisis.get_resultado_display()} ({analisis.temperatura_maxima}°C)")
+            else:
                 fila.append("—")
         
         writer.writerow(fila)
@@ -2283,6 +3181,7 @@ def exportar_historico_termografias_csv(request, cliente_id, sucursal_id):
 
 
 @login_required(login_url='login')
+@respuesta_cacheada()
 def exportar_historico_vibraciones_pdf(request, cliente_id, sucursal_id):
     """Exportar histórico de vibraciones a PDF"""
     try:
@@ -2398,6 +3297,7 @@ def exportar_historico_vibraciones_pdf(request, cliente_id, sucursal_id):
 
 
 @login_required(login_url='login')
+@respuesta_cacheada()
 def exportar_historico_termografias_pdf(request, cliente_id, sucursal_id):
     """Exportar histórico de termografías a PDF"""
     try:
@@ -2420,9 +3320,7 @@ def exportar_historico_termografias_pdf(request, cliente_id, sucursal_id):
             'equipo__area__nombre', 'equipo__nombre', 'nombre'
         )
         
-        fechas = TermografiaAnalisis.objects.filter(
-            activo__equipo__area__sucursal=sucursal
-        ).values_list('fecha_muestreo', flat=True).distinct().order_by('-fecha_muestreo')
+        fechas, ultimo_por_celda = matriz_historico(sucursal)
         
         # Crear PDF en memoria
         buffer = BytesIO()
@@ -2467,14 +3365,10 @@ def exportar_historico_termografias_pdf(request, cliente_id, sucursal_id):
                    activo.nombre]
             
             for fecha in fechas:
-                try:
-                    analisis = TermografiaAnalisis.objects.get(
-                        activo=activo,
-                        fecha_muestreo=fecha
-                    )
-                    valor = f"{analisis.get_resultado_display()}\n{analisis.temperatura_maxima}°C"
-                    fila.append(valor)
-                except TermografiaAnalisis.DoesNotExist:
+                analisis = ultimo_por_celda.get((activo.id, fecha))
+                if analisis:
+                    fila.append(f"{analisis.get_resultado_display()}\n{analisis.temperatura_maxima}°C")
+                else:
                     fila.append("—")
             
             data.append(fila)